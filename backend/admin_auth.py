@@ -0,0 +1,20 @@
+"""
+PARS - Admin Authentication
+Shared guard for /admin endpoints. Requests must send the token configured in
+PARS_ADMIN_TOKEN as the X-Admin-Token header; without a configured token the
+admin endpoints stay disabled.
+"""
+
+import hmac
+import os
+
+from fastapi import Header, HTTPException
+
+ADMIN_TOKEN = os.getenv("PARS_ADMIN_TOKEN", "")
+
+
+def require_admin(x_admin_token: str = Header(default="")):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=503, detail="Admin endpoints disabled (PARS_ADMIN_TOKEN not set)")
+    if not hmac.compare_digest(x_admin_token.encode("utf-8"), ADMIN_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
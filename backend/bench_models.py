@@ -0,0 +1,186 @@
+"""
+PARS - Model Microbenchmarks
+Times each stage of TriageModel.predict and dept_service routing in isolation
+across batch sizes, using rows sampled from patients_data.csv, and writes the
+results as JSON so runs can be compared release to release.
+
+Run with:
+  python bench_models.py --output bench.json
+  python bench_models.py --batch-sizes 1,64,4096 --repeats 20 --stages keras_predict,similarity
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from contextlib import redirect_stdout
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "patients_data.csv")
+DEFAULT_BATCH_SIZES = [1, 4, 16, 64, 256, 1024, 4096]
+
+MODEL_STAGES = ["build_frame", "preprocess", "keras_predict", "guardrails"]
+NLP_STAGES = ["encode", "similarity"]
+
+# CSV column -> PatientInput field
+CSV_RENAMES = {
+    "Temp": "Temperature",
+    "History_Diabetes": "Diabetes",
+    "History_Hypertension": "Hypertension",
+    "History_Heart_Disease": "Heart_Disease",
+}
+
+
+def load_records(csv_path: str, count: int, seed: int) -> list:
+    """Samples `count` rows (with replacement if needed) as PatientInput-style dicts."""
+    df = pd.read_csv(csv_path)
+    df = df.sample(n=count, replace=count > len(df), random_state=seed)
+    df = df.rename(columns=CSV_RENAMES)
+    fields = [
+        "Age", "Gender", "Heart_Rate", "Systolic_BP", "Diastolic_BP", "O2_Saturation",
+        "Temperature", "Respiratory_Rate", "Pain_Score", "GCS_Score", "Arrival_Mode",
+        "Diabetes", "Hypertension", "Heart_Disease", "Chief_Complaint",
+    ]
+    records = df[fields].to_dict(orient="records")
+    for record in records:
+        for flag in ("Diabetes", "Hypertension", "Heart_Disease"):
+            record[flag] = bool(record[flag])
+    return records
+
+
+def time_stage(fn, repeats: int) -> list:
+    fn()  # warm-up (graph tracing, lazy allocations)
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter_ns()
+        fn()
+        samples.append((time.perf_counter_ns() - start) / 1e6)
+    return samples
+
+
+def summarize(stage: str, batch_size: int, samples: list) -> dict:
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    median = statistics.median(ordered)
+    return {
+        "stage": stage,
+        "batch_size": batch_size,
+        "repeats": len(samples),
+        "median_ms": round(median, 4),
+        "p95_ms": round(p95, 4),
+        "min_ms": round(ordered[0], 4),
+        "per_row_us": round(median * 1000 / batch_size, 3),
+    }
+
+
+def model_stage_fns(triage, batch: list) -> dict:
+    frame = triage.build_frame(batch)
+    features = triage.preprocessor.transform(frame)
+    return {
+        "build_frame": lambda: triage.build_frame(batch),
+        "preprocess": lambda: triage.preprocessor.transform(frame),
+        "keras_predict": lambda: triage.model.predict(features, verbose=0, batch_size=len(batch)),
+        "guardrails": lambda: [triage.critical_reasons(record) for record in batch],
+    }
+
+
+def nlp_stage_fns(dept_service, batch: list) -> dict:
+    from sentence_transformers import util
+
+    encoder = dept_service.get_active_model()
+    dept_embeddings = dept_service.DEPT_EMBEDDINGS_MAP[encoder]
+    complaints = [record.get("Chief_Complaint") or "" for record in batch]
+    embeddings = encoder.encode(complaints, convert_to_tensor=True)
+    return {
+        "encode": lambda: encoder.encode(complaints, convert_to_tensor=True, batch_size=min(len(batch), 256)),
+        "similarity": lambda: util.cos_sim(embeddings, dept_embeddings).argmax(dim=1),
+    }
+
+
+def environment() -> dict:
+    env = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+    for module in ("tensorflow", "torch", "sklearn", "sentence_transformers"):
+        if module in sys.modules:
+            env[module] = getattr(sys.modules[module], "__version__", None)
+    return env
+
+
+def run_benchmarks(stages: list, batch_sizes: list, records: list, repeats: int) -> list:
+    """Loads the models the requested stages need and times every stage at each batch size."""
+    triage = None
+    if any(s in MODEL_STAGES for s in stages):
+        from ml_service import TriageModel
+        triage = TriageModel()
+
+    dept_service = None
+    if any(s in NLP_STAGES for s in stages):
+        import dept_service
+
+    results = []
+    for batch_size in batch_sizes:
+        batch = records[:batch_size]
+        fns = {}
+        if triage is not None:
+            fns.update(model_stage_fns(triage, batch))
+        if dept_service is not None and dept_service.get_active_model() is not None:
+            fns.update(nlp_stage_fns(dept_service, batch))
+
+        for stage in stages:
+            if stage not in fns:
+                continue
+            result = summarize(stage, batch_size, time_stage(fns[stage], repeats))
+            results.append(result)
+            print(f"[PARS] {stage:>14} batch={batch_size:<5} median={result['median_ms']:.3f} ms",
+                  file=sys.stderr)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage microbenchmarks for TriageModel and dept_service")
+    parser.add_argument("--csv", default=DEFAULT_CSV)
+    parser.add_argument("--batch-sizes", default=",".join(str(b) for b in DEFAULT_BATCH_SIZES))
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--stages", default=",".join(MODEL_STAGES + NLP_STAGES))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    batch_sizes = [int(b) for b in args.batch_sizes.split(",")]
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = set(stages) - set(MODEL_STAGES + NLP_STAGES)
+    if unknown:
+        parser.error(f"Unknown stages: {', '.join(sorted(unknown))}")
+
+    records = load_records(args.csv, max(batch_sizes), args.seed)
+
+    # The services log with print(); keep stdout for the JSON report only
+    with redirect_stdout(sys.stderr):
+        results = run_benchmarks(stages, batch_sizes, records, args.repeats)
+
+    report = {"environment": environment(), "csv": os.path.basename(args.csv), "results": results}
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+        print(f"[PARS] Wrote {len(results)} results to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+PARS - CPU Budget
+Sizes the TensorFlow, torch and BLAS/OpenMP thread pools from the CPUs this
+worker may actually use, instead of letting every runtime assume it owns the
+whole machine.
+
+The budget is the container's CPU limit (cgroup v2 cpu.max or v1 CFS quota),
+capped by the scheduler affinity mask, divided across the API worker
+processes. Set PARS_WORKERS to the same N as `uvicorn --workers N`; without it
+the count is read from the server's --workers / -w argument (uvicorn workers
+inherit the parent's argv), then WEB_CONCURRENCY, else 1.
+PARS_CPU_THREADS overrides the whole calculation.
+
+TensorFlow (triage scoring) and torch (routing) run concurrently on the
+/predict stage pool, so a worker's budget is divided between them rather than
+given to each: torch gets PARS_CPU_TORCH_SHARE (default 0.5) of the threads,
+TensorFlow the rest, each at least one.
+
+configure() must run before numpy/TensorFlow/torch are imported: the native
+pools read their environment variables at load time. apply_frameworks() then
+sets the same counts through the framework APIs for anything already loaded.
+With PARS_CPU_PIN=1 each API worker also claims a slot and pins itself to its
+own slice of the allowed cores; the inference sidecar is never pinned
+(configure(pin=False)), so it does not take an API worker's slot.
+"""
+
+import math
+import os
+import sys
+
+# Env vars read by the native thread pools when their libraries load
+THREAD_ENV_VARS = [
+    "OPENBLAS_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+]
+# torch's intra-op pool (OpenMP / MKL) and TensorFlow's get their share only
+TORCH_ENV_VARS = ["OMP_NUM_THREADS", "MKL_NUM_THREADS"]
+TF_ENV_VARS = ["TF_NUM_INTRAOP_THREADS"]
+SLOT_LOCK_DIR = os.getenv("PARS_CPU_SLOT_DIR", "/tmp")
+
+
+def _read(path: str):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def cgroup_cpu_limit():
+    """CPUs allowed by the cgroup quota, or None when unlimited / not in a cgroup."""
+    # cgroup v2: "<quota> <period>" or "max <period>"
+    cpu_max = _read("/sys/fs/cgroup/cpu.max")
+    if cpu_max:
+        quota, _, period = cpu_max.partition(" ")
+        if quota != "max" and period:
+            return int(quota) / int(period)
+        return None
+
+    # cgroup v1
+    quota = _read("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") or _read("/sys/fs/cgroup/cpu,cpuacct/cpu.cfs_quota_us")
+    period = _read("/sys/fs/cgroup/cpu/cpu.cfs_period_us") or _read("/sys/fs/cgroup/cpu,cpuacct/cpu.cfs_period_us")
+    if quota and period and int(quota) > 0:
+        return int(quota) / int(period)
+    return None
+
+
+def workers_from_command_line(argv=None):
+    """N from `uvicorn/gunicorn ... --workers N` (or -w N / --workers=N), else None."""
+    argv = sys.argv if argv is None else argv
+    for i, arg in enumerate(argv):
+        value = None
+        if arg in ("--workers", "-w") and i + 1 < len(argv):
+            value = argv[i + 1]
+        elif arg.startswith("--workers="):
+            value = arg.partition("=")[2]
+        if value is not None and value.isdigit():
+            return int(value)
+    return None
+
+
+def resolve_workers():
+    """(count, source) for the API worker processes sharing this machine's budget."""
+    explicit = os.getenv("PARS_WORKERS")
+    if explicit:
+        return int(explicit), "PARS_WORKERS"
+    detected = workers_from_command_line()
+    if detected:
+        return detected, "--workers"
+    concurrency = os.getenv("WEB_CONCURRENCY")
+    if concurrency:
+        return int(concurrency), "WEB_CONCURRENCY"
+    return 1, "default"
+
+
+def allowed_cpus() -> list:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+class CpuBudget:
+    def __init__(self):
+        self.config = None
+        self._slot_fd = None
+
+    def configure(self, workers=None, pin=True) -> dict:
+        """Computes the budget, exports thread env vars and optionally pins this process."""
+        if self.config is not None:
+            return self.config
+
+        cpus = allowed_cpus()
+        limit = cgroup_cpu_limit()
+        available = min(len(cpus), math.ceil(limit)) if limit else len(cpus)
+        if workers is None:
+            workers, workers_source = resolve_workers()
+        else:
+            workers_source = "argument"
+        workers = max(1, workers)
+
+        override = os.getenv("PARS_CPU_THREADS")
+        threads = int(override) if override else max(1, available // workers)
+        inter_op = max(1, min(2, threads // 4))
+        torch_share = float(os.getenv("PARS_CPU_TORCH_SHARE", "0.5"))
+        torch_threads = max(1, min(threads - 1, round(threads * torch_share))) if threads > 1 else 1
+        tf_threads = max(1, threads - torch_threads)
+
+        # setdefault: explicit operator settings always win
+        exported = {}
+        for names, count in ((THREAD_ENV_VARS, threads), (TORCH_ENV_VARS, torch_threads), (TF_ENV_VARS, tf_threads)):
+            for name in names:
+                exported[name] = os.environ.setdefault(name, str(count))
+        exported["TF_NUM_INTEROP_THREADS"] = os.environ.setdefault("TF_NUM_INTEROP_THREADS", str(inter_op))
+
+        self.config = {
+            "visible_cpus": os.cpu_count(),
+            "affinity_cpus": len(cpus),
+            "cgroup_limit": round(limit, 2) if limit else None,
+            "workers": workers,
+            "workers_source": workers_source,
+            "threads": threads,
+            "inter_op_threads": inter_op,
+            "split": {"tensorflow": tf_threads, "torch": torch_threads},
+            "source": "PARS_CPU_THREADS" if override else ("cgroup" if limit else "affinity"),
+            "env": exported,
+            "pinned": None,
+            "frameworks": {},
+        }
+        if pin and os.getenv("PARS_CPU_PIN", "0") == "1":
+            self._pin(cpus, threads, workers)
+
+        print(f"[PARS] CPU budget: {threads} threads/worker, TF {tf_threads} + torch {torch_threads} "
+              f"({self.config['source']}, {available} CPUs across {workers} workers)")
+        return self.config
+
+    def _claim_slot(self, workers: int):
+        """Worker index via an exclusive lock file; held for the life of the process."""
+        explicit = os.getenv("PARS_WORKER_INDEX")
+        if explicit is not None:
+            return int(explicit)
+        try:
+            import fcntl
+        except ImportError:
+            return None
+        for slot in range(workers):
+            fd = os.open(os.path.join(SLOT_LOCK_DIR, f"pars-cpu-slot-{slot}.lock"), os.O_CREAT | os.O_RDWR, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                continue
+            self._slot_fd = fd
+            return slot
+        return None
+
+    def _pin(self, cpus: list, threads: int, workers: int):
+        if not hasattr(os, "sched_setaffinity"):
+            print("[PARS] WARNING: CPU pinning is not supported on this platform.")
+            return
+        slot = self._claim_slot(workers)
+        if slot is None:
+            print("[PARS] WARNING: No free CPU slot; running unpinned.")
+            return
+        start = (slot * threads) % len(cpus)
+        cores = [cpus[(start + i) % len(cpus)] for i in range(min(threads, len(cpus)))]
+        os.sched_setaffinity(0, cores)
+        self.config["pinned"] = {"slot": slot, "cores": cores}
+
+    def apply_frameworks(self):
+        """Applies the budget to TensorFlow/torch if (and only if) they are loaded."""
+        config = self.configure()
+        inter_op = config["inter_op_threads"]
+        split = config["split"]
+        frameworks = config["frameworks"]
+
+        tf = sys.modules.get("tensorflow")
+        if tf is not None:
+            try:
+                tf.config.threading.set_intra_op_parallelism_threads(split["tensorflow"])
+                tf.config.threading.set_inter_op_parallelism_threads(inter_op)
+            except RuntimeError:
+                # Runtime already initialised; the TF_NUM_* env vars applied at load time
+                pass
+            frameworks["tensorflow"] = {
+                "intra_op": tf.config.threading.get_intra_op_parallelism_threads(),
+                "inter_op": tf.config.threading.get_inter_op_parallelism_threads(),
+            }
+
+        torch = sys.modules.get("torch")
+        if torch is not None:
+            torch.set_num_threads(split["torch"])
+            try:
+                torch.set_num_interop_threads(inter_op)
+            except RuntimeError:
+                # Only settable before the first parallel op
+                pass
+            frameworks["torch"] = {
+                "intra_op": torch.get_num_threads(),
+                "inter_op": torch.get_num_interop_threads(),
+            }
+        return config
+
+    def status(self) -> dict:
+        return self.config
+
+
+cpu_budget = CpuBudget()
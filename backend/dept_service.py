@@ -1,9 +1,14 @@
 import os
+import re
 import time
+import threading
 from supabase import create_client, Client
 from sentence_transformers import SentenceTransformer, util
 import torch
 
+from roster_repository import get_roster_repository, roster_cache
+from keyword_routing import HOSPITAL_MAP, get_department_legacy
+
 
 # ============================================================
 # ------------------- SUPABASE CONFIG ------------------------
@@ -75,16 +80,31 @@ MODEL_NAMES = [
     # "paraphrase-MiniLM-L6-v2"   # Redundant
 ]
 
+# int8 dynamic quantization of the Linear layers (CPU only). Department
+# embeddings below are encoded with whichever model is actually served.
+# Check agreement with validate_quantization.py before enabling.
+ROUTING_QUANTIZE = os.getenv("PARS_ROUTING_QUANTIZE", "0") == "1"
+
 MODELS = []
 DEPT_EMBEDDINGS_MAP = {}
 
+
+def quantize_model(model):
+    """int8 dynamic-quantized copy of a SentenceTransformer (weights int8, activations fp32)."""
+    quantized = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    quantized.eval()
+    return quantized
+
+
 print("[PARS] Loading NLP Models...")
 
 for name in MODEL_NAMES:
     try:
-        model = SentenceTransformer(name)
+        model = SentenceTransformer(name, device="cpu" if ROUTING_QUANTIZE else None)
+        if ROUTING_QUANTIZE:
+            model = quantize_model(model)
         MODELS.append(model)
-        print(f"[PARS] Loaded model: {name}")
+        print(f"[PARS] Loaded model: {name}{' (int8 dynamic)' if ROUTING_QUANTIZE else ''}")
     except Exception as e:
         print(f"[PARS] Failed loading {name}: {e}")
 
@@ -122,9 +142,38 @@ def get_active_model():
 # ------------------- NLP CLASSIFICATION ---------------------
 # ============================================================
 
-def get_department(complaint: str) -> str:
+ROUTING_TOP_K = int(os.getenv("PARS_ROUTING_TOP_K", "3"))
+
+
+def _clean_name(full_dept_name: str) -> str:
+    return full_dept_name.split(" (")[0].strip()
+
+
+def route_complaint(complaint: str, top_k: int = ROUTING_TOP_K) -> dict:
+    """
+    Routes a complaint once and returns a reusable result:
+      { department, stage, candidates: [{department, score}, ...] }
+    stage is "default" (empty/short), "keyword", "transformer" or "fallback".
+    Candidates are ranked: similarity scores for the transformer stage,
+    keyword weight shares for the keyword stage.
+    """
     if not complaint or len(complaint.strip()) < 3:
-        return "General_Medicine"
+        return {
+            "department": "General_Medicine",
+            "stage": "default",
+            "candidates": [{"department": "General_Medicine", "score": 1.0}],
+        }
+
+    # Cheap keyword stage first; only ambiguous complaints reach the transformer
+    weights = _keyword_weights(complaint)
+    keyword_candidates = _ranked_shares(weights)[:top_k]
+    if CASCADE_ENABLED and keyword_candidates and keyword_candidates[0]["score"] >= CASCADE_THRESHOLD:
+        _count_stage("keyword")
+        return {
+            "department": keyword_candidates[0]["department"],
+            "stage": "keyword",
+            "candidates": keyword_candidates,
+        }
 
     active_model = get_active_model()
 
@@ -142,84 +191,154 @@ def get_department(complaint: str) -> str:
                 dept_embeddings
             )[0]
 
-            best_match_idx = int(torch.argmax(cos_scores))
-
-            full_dept_name = DEPARTMENTS[best_match_idx]
-            clean_name = full_dept_name.split(" (")[0].strip()
+            top = torch.topk(cos_scores, k=min(top_k, len(DEPARTMENTS)))
+            candidates = [
+                {"department": _clean_name(DEPARTMENTS[int(idx)]), "score": round(float(score), 4)}
+                for score, idx in zip(top.values, top.indices)
+            ]
 
             print(f"[PARS] Active Model Used.")
 
-            return clean_name
+            _count_stage("transformer")
+            return {
+                "department": candidates[0]["department"],
+                "stage": "transformer",
+                "candidates": candidates,
+            }
 
         except Exception as e:
             print(f"[PARS] NLP Error: {e}")
 
     # Fallback to keyword logic
-    return get_department_legacy(complaint)
+    _count_stage("fallback")
+    department = get_department_legacy(complaint)
+    return {
+        "department": department,
+        "stage": "fallback",
+        "candidates": keyword_candidates or [{"department": department, "score": 0.0}],
+    }
+
+
+def get_department(complaint: str) -> str:
+    return route_complaint(complaint)["department"]
 
 
 # ============================================================
 # ------------------- KEYWORD FALLBACK -----------------------
 # ============================================================
 
-def get_department_legacy(complaint: str) -> str:
-    complaint = complaint.lower()
-
-    hospital_map = {
-        "Cardiology": ["chest pain", "heart", "bp", "palpitations"],
-        "Neurology": ["stroke", "headache", "seizure", "paralysis"],
-        "Gastroenterology": ["stomach", "vomiting", "diarrhea"],
-        "Pulmonology": ["cough", "asthma", "breath"],
-        "Orthopedics": ["fracture", "bone", "joint"],
-        "Emergency_Trauma": ["accident", "trauma", "bleed"],
-        "General_Medicine": ["fever", "flu", "fatigue"],
-        "Dermatology": ["rash", "itch", "skin"],
-        "ENT": ["ear", "nose", "throat"],
-        "Urology_Nephrology": ["kidney", "urine", "bladder"],
-        "Psychiatry": ["depression", "anxiety", "suicide"],
-        "Toxicology": ["poison", "overdose", "chemical"]
-    }
+# HOSPITAL_MAP and get_department_legacy live in keyword_routing.py so the API
+# workers can use them without loading torch (load shedding, sidecar mode).
+
+
+# ============================================================
+# ------------------- CASCADE ROUTER -------------------------
+# ============================================================
 
-    for department, keywords in hospital_map.items():
-        if any(k in complaint for k in keywords):
-            return department
+# Keyword matches at or above this confidence skip the transformer entirely
+CASCADE_ENABLED = os.getenv("PARS_CASCADE_ROUTING", "1") != "0"
+CASCADE_THRESHOLD = float(os.getenv("PARS_CASCADE_THRESHOLD", "0.75"))
+
+# Whole-word matching (with a few common inflections) so "ear" does not
+# fire on "heart" or "year" the way the substring fallback does.
+_KEYWORD_PATTERNS = [
+    (
+        department,
+        keyword,
+        re.compile(r"\b" + re.escape(keyword) + r"(?:s|es|e|ed|ing|y|ache)?\b"),
+    )
+    for department, keywords in HOSPITAL_MAP.items()
+    for keyword in keywords
+]
+
+ROUTING_STATS = {"keyword": 0, "transformer": 0, "fallback": 0}
+_ROUTING_STATS_LOCK = threading.Lock()
+
+
+def _count_stage(stage: str):
+    with _ROUTING_STATS_LOCK:
+        ROUTING_STATS[stage] += 1
+
+
+def _keyword_weights(complaint: str) -> dict:
+    """Matched keyword weight per department (multi-word phrases count more)."""
+    text = complaint.lower()
+    weights = {}
 
-    return "General_Medicine"
+    for department, keyword, pattern in _KEYWORD_PATTERNS:
+        if pattern.search(text):
+            weights[department] = weights.get(department, 0) + len(keyword.split())
+
+    return weights
+
+
+def _ranked_shares(weights: dict) -> list:
+    total = sum(weights.values())
+    return [
+        {"department": department, "score": round(weight / total, 4)}
+        for department, weight in sorted(weights.items(), key=lambda item: -item[1])
+    ]
+
+
+def route_keywords(complaint: str):
+    """
+    Keyword stage of the cascade router.
+    Returns (department, confidence) where confidence is the winning
+    department's share of all matched keyword weight. Returns (None, 0.0)
+    when nothing matches.
+    """
+    ranked = _ranked_shares(_keyword_weights(complaint))
+    if not ranked:
+        return None, 0.0
+    return ranked[0]["department"], ranked[0]["score"]
+
+
+def get_routing_stats() -> dict:
+    """Snapshot of how many complaints each cascade stage has handled."""
+    with _ROUTING_STATS_LOCK:
+        stats = dict(ROUTING_STATS)
+    total = sum(stats.values())
+    stats["total"] = total
+    stats["keyword_hit_rate"] = round(stats["keyword"] / total, 4) if total else 0.0
+    return stats
 
 
 # ============================================================
 # ------------------- REFERRAL SYSTEM ------------------------
 # ============================================================
 
-def get_referral(complaint_or_reason: str):
+def get_referral(complaint_or_reason: str, routing: dict = None, cached_roster: bool = False):
+    """
+    Department plus doctor roster. Pass a route_complaint() result as
+    `routing` to reuse it instead of routing the text again. With
+    cached_roster the doctors come from the periodic roster snapshot
+    instead of a live query (load shedding).
+    """
+    if routing is None:
+        routing = route_complaint(complaint_or_reason)
 
-    dept_table = get_department(complaint_or_reason)
+    dept_table = routing["department"]
     print(f"[PARS] Determined Department: {dept_table}")
 
-    supabase = get_supabase()
-    doctors = []
-
-    if supabase:
-        try:
-            response = supabase.table(dept_table.lower()).select("*").execute()
-            data = response.data
-
-            for doc in data:
-                doctors.append({
-                    "name": doc.get("doc_name"),
-                    "experience": doc.get("experience_years"),
-                    "available": doc.get("is_available")
-                })
+    # Roster source is configurable (PARS_ROSTER_BACKEND): supabase, sql or sqlite
+    try:
+        repository = get_roster_repository(get_supabase)
+        if cached_roster:
+            doctors = roster_cache.get_doctors(repository, dept_table)
+        else:
+            doctors = repository.get_doctors(dept_table)
 
-        except Exception as e:
-            print(f"[PARS] Supabase Query Error: {e}")
-            doctors = [{
-                "name": "Dr. House (Mock)",
-                "experience": 10,
-                "available": True
-            }]
+    except Exception as e:
+        print(f"[PARS] Roster Query Error: {e}")
+        doctors = [{
+            "name": "Dr. House (Mock)",
+            "experience": 10,
+            "available": True
+        }]
 
     return {
         "department": dept_table,
-        "doctors": doctors
+        "doctors": doctors,
+        "routing_stage": routing["stage"],
+        "alternatives": routing["candidates"]
     }
@@ -2,7 +2,7 @@ import os
 import re
 import json
 import google.generativeai as genai
-from pypdf import PdfReader
+from pypdf import PdfReader, PdfWriter
 from io import BytesIO
 from dotenv import load_dotenv
 
@@ -16,25 +16,139 @@ if GEMINI_API_KEY:
 else:
     print("[PARS] WARNING: GEMINI_API_KEY not found in environment variables.")
 
-def extract_text_from_pdf(file_bytes):
-    """Extracts raw text from a PDF file."""
+# Prompt budget for the clinical text (roughly 4 characters per token)
+PROMPT_TOKEN_BUDGET = int(os.getenv("PARS_DOC_TOKEN_BUDGET", "3000"))
+CHUNK_CHARS = int(os.getenv("PARS_DOC_CHUNK_CHARS", "800"))
+# Scanned PDFs: at most this many pages are sent to the multimodal model
+MAX_IMAGE_PAGES = int(os.getenv("PARS_DOC_MAX_IMAGE_PAGES", "3"))
+
+# Relevance index: (pattern, weight). Measurements with numbers score highest,
+# then vitals/history vocabulary; legal and billing boilerplate is penalised.
+RELEVANCE_PATTERNS = [(re.compile(p, re.IGNORECASE), w) for p, w in [
+    (r'\b(bp|blood pressure)\s*[:=-]?\s*\d{2,3}\s*[/-]\s*\d{2,3}', 6),
+    (r'\b(heart rate|pulse|hr)\s*[:=-]?\s*\d{2,3}', 5),
+    (r'\b(spo2|sp02|o2 sat\w*|oxygen saturation|saturation)\s*[:=-]?\s*\d{2,3}', 5),
+    (r'\b(temp\w*)\s*[:=-]?\s*\d{2,3}(\.\d)?', 5),
+    (r'\b(resp\w* rate|rr)\s*[:=-]?\s*\d{1,2}', 5),
+    (r'\b(gcs|glasgow)\b\s*[:=-]?\s*\d{1,2}', 5),
+    (r'\bpain( score)?\s*[:=-]?\s*\d{1,2}\s*(/\s*10)?', 4),
+    (r'\b\d{2,3}\s*(bpm|mmhg|%|°\s*[cf]|breaths)', 3),
+    (r'\b(chief|presenting) complaint|\bc/o\b|complains of|history of present', 4),
+    (r'\b(vitals?|vital signs|triage|observations)\b', 3),
+    (r'\b(age|dob|date of birth|sex|gender|male|female|\d{1,3}\s*(y/?o|years? old))\b', 2),
+    (r'\b(diabet\w*|hypertensi\w*|htn|dm|cad|heart disease|mi|chf|copd|asthma)\b', 2),
+    (r'\b(symptom\w*|pain|fever|cough|dyspn\w*|nausea|vomit\w*|dizz\w*|bleed\w*)\b', 1),
+    (r'\b(confidential\w*|disclaimer|copyright|invoice|billing|insurance|signature|page \d+ of \d+)\b', -2),
+]]
+
+
+def extract_pages_from_pdf(file_bytes):
+    """Extracts raw text per page from a PDF file."""
     try:
         reader = PdfReader(BytesIO(file_bytes))
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
-        return text
+        return [page.extract_text() or "" for page in reader.pages]
     except Exception as e:
         print(f"PDF Text Extraction Error: {e}")
+        return []
+
+def extract_text_from_pdf(file_bytes):
+    """Extracts raw text from a PDF file."""
+    return "".join(page + "\n" for page in extract_pages_from_pdf(file_bytes))
+
+def relevance_score(text):
+    """Local vitals/keyword relevance of a piece of text (no model calls)."""
+    return sum(weight * len(pattern.findall(text)) for pattern, weight in RELEVANCE_PATTERNS)
+
+def chunk_pages(pages, chunk_chars=CHUNK_CHARS):
+    """Splits page texts into ~chunk_chars pieces on line boundaries, keeping page numbers."""
+    chunks = []
+    for page_no, page_text in enumerate(pages, start=1):
+        current = []
+        size = 0
+        for line in page_text.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            if current and size + len(line) > chunk_chars:
+                chunks.append({"page": page_no, "text": "\n".join(current)})
+                current, size = [], 0
+            # Very long lines (no line breaks in the text layer) are cut hard
+            while len(line) > chunk_chars:
+                chunks.append({"page": page_no, "text": line[:chunk_chars]})
+                line = line[chunk_chars:]
+            current.append(line)
+            size += len(line) + 1
+        if current:
+            chunks.append({"page": page_no, "text": "\n".join(current)})
+    for index, chunk in enumerate(chunks):
+        chunk["index"] = index
+        chunk["score"] = relevance_score(chunk["text"])
+    return chunks
+
+def select_relevant_text(pages, token_budget=PROMPT_TOKEN_BUDGET, chunk_chars=CHUNK_CHARS):
+    """
+    Ranks chunks by relevance and keeps the best ones that fit the token budget,
+    returned in document order. The first chunk (demographics / header) is always kept.
+    """
+    chunks = chunk_pages(pages, chunk_chars)
+    if not chunks:
         return ""
+    char_budget = token_budget * 4
+    if sum(len(c["text"]) for c in chunks) <= char_budget:
+        # Short document: nothing to trim
+        return "\n".join(page for page in pages if page.strip())
+
+    selected = [chunks[0]]
+    used = len(chunks[0]["text"])
+    ranked = sorted(chunks[1:], key=lambda c: (-c["score"], c["index"]))
+    for chunk in ranked:
+        if chunk["score"] <= 0:
+            break
+        if used + len(chunk["text"]) > char_budget:
+            continue
+        selected.append(chunk)
+        used += len(chunk["text"])
+
+    selected.sort(key=lambda c: c["index"])
+    print(f"[PARS] Selected {len(selected)}/{len(chunks)} text chunks ({used} chars) for extraction.")
+    return "\n...\n".join(f"[Page {c['page']}]\n{c['text']}" for c in selected)
 
-def extract_vitals_from_pdf(file_bytes):
+def select_relevant_pages(file_bytes, pages, max_pages=MAX_IMAGE_PAGES):
+    """
+    For scanned PDFs: a smaller PDF holding only the pages most likely to carry
+    vitals, judged from whatever text layer exists. A fully scanned PDF has no
+    text to judge by, so it is sent whole rather than guessing at the first pages.
+    """
+    if len(pages) <= max_pages:
+        return file_bytes
+    scores = [relevance_score(page) for page in pages]
+    if max(scores) <= 0:
+        print(f"[PARS] No page has a usable text layer, sending all {len(pages)} pages to the multimodal model.")
+        return file_bytes
+    scored = sorted(range(len(pages)), key=lambda i: (-scores[i], i))
+    keep = sorted(scored[:max_pages])
+    try:
+        reader = PdfReader(BytesIO(file_bytes))
+        writer = PdfWriter()
+        for i in keep:
+            writer.add_page(reader.pages[i])
+        out = BytesIO()
+        writer.write(out)
+        print(f"[PARS] Sending pages {[i + 1 for i in keep]} of {len(pages)} to the multimodal model.")
+        return out.getvalue()
+    except Exception as e:
+        print(f"[PARS] Page selection failed, sending the full PDF: {e}")
+        return file_bytes
+
+def extract_vitals_from_pdf(file_bytes, use_llm=True):
     """
     Scans a PDF for medical details using Google Gemini API.
     Returns a dictionary of structured patient data.
+    use_llm=False skips Gemini and uses the local regex parser (load shedding).
     """
     print(f"[PARS] Extracting text from PDF (Size: {len(file_bytes)} bytes)...")
-    text = extract_text_from_pdf(file_bytes)
+    pages = extract_pages_from_pdf(file_bytes)
+    text = "".join(page + "\n" for page in pages)
     print(f"[PARS] Extracted text length: {len(text)}")
     
     # If text is empty, it might be a scan.
@@ -55,12 +169,18 @@ def extract_vitals_from_pdf(file_bytes):
         print("[PARS] Fallback to legacy regex parser (No API Key)")
         return extract_vitals_regex_fallback(text)
 
+    if not use_llm:
+        print("[PARS] Using local regex parser (load shedding)")
+        return extract_vitals_regex_fallback(text)
+
     try:
         # gemini-1.5-flash was deprecated/not found for this key. Using 2.0-flash.
         model = genai.GenerativeModel('gemini-2.5-flash')
         
         # If we have text, use it. If not, try to use the PDF blob directly (Multimodal).
         if len(text) > 50:
+             # Only the most relevant chunks go to the model, within the token budget
+             relevant_text = select_relevant_text(pages)
              prompt_content = f"""
             You are a medical data extraction assistant. Extract the following patient details from the provided clinical text.
             Return ONLY a raw JSON object (no markdown formatting, no code blocks) with keys matching exactly these names and types:
@@ -83,8 +203,8 @@ def extract_vitals_from_pdf(file_bytes):
             
             If a value is not found in the text, use the default or a reasonable normal value for a healthy adult.
             
-            Clinical Text:
-            {text[:20000]} 
+            Clinical Text (relevant excerpts, in document order):
+            {relevant_text} 
             """
              response = model.generate_content(prompt_content)
         else:
@@ -95,7 +215,7 @@ def extract_vitals_from_pdf(file_bytes):
              # Create a Part object (Dictionary structure for Google GenAI SDK)
              pdf_part = {
                  "mime_type": "application/pdf",
-                 "data": file_bytes
+                 "data": select_relevant_pages(file_bytes, pages)
              }
              
              # Note: generate_content accepts list of [prompt, image/blob]
@@ -0,0 +1,238 @@
+"""
+PARS - Multi-Document Intake
+Helpers for /parse-documents: unpacking uploads (PDFs or zip archives) and
+merging the per-document extractions into one PatientInput candidate with
+field-level provenance. Documents are identified by their upload index (the
+position in the expanded batch), since filenames need not be unique.
+"""
+
+import io
+import os
+import zipfile
+from collections import Counter
+
+PARSE_CONCURRENCY = int(os.getenv("PARS_PARSE_CONCURRENCY", "4"))
+MAX_BATCH_FILES = int(os.getenv("PARS_MAX_BATCH_FILES", "50"))
+MAX_BATCH_FILE_BYTES = int(os.getenv("PARS_MAX_BATCH_FILE_BYTES", str(25 * 1024 * 1024)))
+# Uploaded plus decompressed bytes held in memory for one request
+MAX_BATCH_TOTAL_BYTES = int(os.getenv("PARS_MAX_BATCH_TOTAL_BYTES", str(100 * 1024 * 1024)))
+
+# PatientInput fields with the defaults the extraction prompt falls back to.
+# A value equal to its default is weak evidence: the document may simply not mention it.
+FIELD_DEFAULTS = {
+    "Age": 0,
+    "Gender": None,
+    "Heart_Rate": 75,
+    "Systolic_BP": 120,
+    "Diastolic_BP": 80,
+    "O2_Saturation": 98.0,
+    "Temperature": 37.0,
+    "Respiratory_Rate": 16,
+    "Pain_Score": 0,
+    "GCS_Score": 15,
+}
+# No usable default: a prompt fallback here means "unknown", so these are
+# reported in missing_required instead of being filled in
+REQUIRED_FIELDS = {"Age", "Gender"}
+BOOLEAN_FIELDS = ["Diabetes", "Hypertension", "Heart_Disease"]
+FLOAT_FIELDS = {"O2_Saturation", "Temperature"}
+
+
+class BatchFile:
+    def __init__(self, filename: str, content: bytes = None, error: str = None):
+        self.filename = filename
+        self.content = content
+        self.error = error
+
+
+class ByteBudget:
+    """Running total of the bytes one batch holds in memory; charge() raises ValueError past the limit."""
+
+    def __init__(self, limit=MAX_BATCH_TOTAL_BYTES):
+        self.limit = limit
+        self.used = 0
+
+    @property
+    def remaining(self) -> int:
+        return self.limit - self.used
+
+    def check(self, size: int):
+        if size > self.remaining:
+            raise ValueError(f"Documents exceed the batch size limit ({self.limit} bytes)")
+
+    def charge(self, size: int):
+        self.check(size)
+        self.used += size
+
+
+def _read_member(archive, info, budget: ByteBudget):
+    """
+    Decompresses one member in chunks, without trusting its declared size.
+    Returns None if it exceeds MAX_BATCH_FILE_BYTES; raises if the batch budget runs out.
+    """
+    limit = min(MAX_BATCH_FILE_BYTES, budget.remaining)
+    chunks = []
+    size = 0
+    with archive.open(info) as member:
+        while True:
+            chunk = member.read(min(1024 * 1024, limit - size + 1))
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > limit:
+                if size > MAX_BATCH_FILE_BYTES:
+                    return None
+                budget.check(size)
+            chunks.append(chunk)
+    budget.charge(size)
+    return b"".join(chunks)
+
+
+def _is_pdf(name: str, content: bytes) -> bool:
+    return name.lower().endswith(".pdf") or content[:5] == b"%PDF-"
+
+
+def expand_uploads(uploads, budget: ByteBudget = None) -> list:
+    """
+    uploads: [(filename, bytes)]. Zip archives are expanded into their PDF
+    members (nested folders included); anything else that is not a PDF is
+    reported as an error entry rather than parsed. Member count and declared
+    sizes are checked before anything is decompressed, and decompression
+    stops as soon as `budget` (shared with the raw uploads) is used up.
+    Raises ValueError when a batch limit is exceeded.
+    """
+    budget = budget or ByteBudget()
+    files = []
+    for filename, content in uploads:
+        if zipfile.is_zipfile(io.BytesIO(content)):
+            try:
+                with zipfile.ZipFile(io.BytesIO(content)) as archive:
+                    members = [info for info in archive.infolist()
+                               if not info.is_dir()
+                               and not os.path.basename(info.filename).startswith((".", "__MACOSX"))]
+                    # Checked against the central directory, before any member is decompressed
+                    _check_count(len(files) + len(members))
+                    budget.check(sum(info.file_size for info in members
+                                     if info.filename.lower().endswith(".pdf")
+                                     and info.file_size <= MAX_BATCH_FILE_BYTES))
+                    for info in members:
+                        member = f"{filename}/{info.filename}"
+                        if not info.filename.lower().endswith(".pdf"):
+                            files.append(BatchFile(member, error="Not a PDF"))
+                        elif info.file_size > MAX_BATCH_FILE_BYTES:
+                            files.append(BatchFile(member, error="File too large"))
+                        else:
+                            content_bytes = _read_member(archive, info, budget)
+                            if content_bytes is None:
+                                files.append(BatchFile(member, error="File too large"))
+                            else:
+                                files.append(BatchFile(member, content_bytes))
+            except zipfile.BadZipFile as e:
+                files.append(BatchFile(filename, error=f"Invalid zip archive: {e}"))
+        elif len(content) > MAX_BATCH_FILE_BYTES:
+            files.append(BatchFile(filename, error="File too large"))
+        elif _is_pdf(filename, content):
+            files.append(BatchFile(filename, content))
+        else:
+            files.append(BatchFile(filename, error="Not a PDF or zip archive"))
+        _check_count(len(files))
+    return files
+
+
+def _check_count(count: int):
+    if count > MAX_BATCH_FILES:
+        raise ValueError(f"Too many documents ({count}); the limit is {MAX_BATCH_FILES}")
+
+
+def _coerce(field: str, value):
+    if value is None or value == "":
+        return None
+    try:
+        if field in FLOAT_FIELDS:
+            return round(float(value), 1)
+        if field == "Gender":
+            value = str(value).strip().capitalize()
+            return {"M": "Male", "F": "Female", "O": "Other"}.get(value, value)
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def _as_bool(value) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("true", "yes", "y", "1")
+    return bool(value)
+
+
+def merge_extractions(results: list) -> dict:
+    """
+    results: [(index, extracted_dict)] where index is the document's upload
+    index; provenance sources are these indices.
+
+    Per field: values that differ from the prompt default win over defaults;
+    among those the value reported by most documents wins, ties going to the
+    later document. Required fields (REQUIRED_FIELDS) are never defaulted:
+    if no document reports a specific value they are left out of `patient`
+    and listed in `missing_required`. Comorbidities are true if any document
+    reports them, and distinct chief complaints are joined. Extractions that
+    are not dicts are skipped and reported in `errors`.
+    Returns {"patient", "provenance", "missing_required", "errors"}.
+    """
+    errors = [{"index": index, "error": f"Unexpected extraction result ({type(data).__name__})"}
+              for index, data in results if not isinstance(data, dict)]
+    results = sorted((item for item in results if isinstance(item[1], dict)), key=lambda item: item[0])
+    patient = {}
+    provenance = {}
+    missing_required = []
+
+    for field, default in FIELD_DEFAULTS.items():
+        reported = [(index, _coerce(field, data.get(field))) for index, data in results]
+        reported = [(index, value) for index, value in reported if value is not None]
+        specific = [(index, value) for index, value in reported if value != default]
+        candidates = specific if field in REQUIRED_FIELDS else (specific or reported)
+        if not candidates:
+            if field in REQUIRED_FIELDS:
+                missing_required.append(field)
+                provenance[field] = {"value": None, "sources": [], "defaulted": False, "missing": True}
+                continue
+            patient[field] = default
+            provenance[field] = {"value": default, "sources": [], "defaulted": True}
+            continue
+
+        counts = Counter(value for _, value in candidates)
+        last_seen = {value: i for i, (_, value) in enumerate(candidates)}
+        value = max(counts, key=lambda v: (counts[v], last_seen[v]))
+        patient[field] = value
+        provenance[field] = {
+            "value": value,
+            "sources": [index for index, v in candidates if v == value],
+            "defaulted": not specific,
+        }
+        conflicts = [{"value": v, "source": index} for index, v in specific if v != value]
+        if conflicts:
+            provenance[field]["conflicts"] = conflicts
+
+    for field in BOOLEAN_FIELDS:
+        sources = [index for index, data in results if _as_bool(data.get(field))]
+        patient[field] = bool(sources)
+        provenance[field] = {"value": bool(sources), "sources": sources, "defaulted": not sources}
+
+    complaints = []
+    complaint_sources = []
+    for index, data in results:
+        complaint = str(data.get("Chief_Complaint") or "").strip()
+        if complaint and complaint.lower() not in {c.lower() for c in complaints}:
+            complaints.append(complaint)
+            complaint_sources.append(index)
+    patient["Chief_Complaint"] = "; ".join(complaints) or None
+    provenance["Chief_Complaint"] = {
+        "value": patient["Chief_Complaint"], "sources": complaint_sources, "defaulted": not complaints,
+    }
+
+    names = [(index, str(data.get("name")).strip()) for index, data in results
+             if data.get("name") and str(data.get("name")).strip().lower() != "unknown"]
+    patient["name"] = names[0][1] if names else "Unknown"
+    provenance["name"] = {"value": patient["name"], "sources": [i for i, n in names if n == patient["name"]],
+                          "defaulted": not names}
+
+    return {"patient": patient, "provenance": provenance, "missing_required": missing_required, "errors": errors}
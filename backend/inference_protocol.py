@@ -0,0 +1,281 @@
+"""
+PARS - Inference Sidecar Protocol
+Binary framing and client for talking to inference_server.py over a Unix
+domain socket. Imports nothing heavy, so API workers that use the sidecar
+never load TensorFlow or torch themselves.
+
+Frame layout (network byte order):
+  header  = request_id:u32  op_or_status:u8  length:u32
+  payload = `length` bytes
+
+Strings are u32-length-prefixed UTF-8; NONE_LENGTH encodes None.
+"""
+
+import itertools
+import json
+import socket
+import struct
+import threading
+
+HEADER = struct.Struct("!IBI")
+
+OP_PING = 0
+OP_PREDICT = 1
+OP_DEPARTMENT = 2
+OP_REFERRAL = 3
+OP_STATS = 4
+OP_PREDICT_BATCH = 5
+OP_ROUTE = 6
+OP_MODEL = 7
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+NONE_LENGTH = 0xFFFFFFFF
+
+# Age, Heart_Rate, Systolic_BP, Diastolic_BP, O2_Saturation, Temperature,
+# Respiratory_Rate, Pain_Score, GCS_Score, history flags
+_PATIENT = struct.Struct("!iiiiddiiiB")
+_RESULT = struct.Struct("!dB")
+_U32 = struct.Struct("!I")
+
+RISK_LABELS = ["LOW", "MEDIUM", "HIGH"]
+
+
+class InferenceError(RuntimeError):
+    """Raised when the sidecar reports a failure for a request."""
+
+
+# ============================================================
+# ------------------- CODEC ----------------------------------
+# ============================================================
+
+def pack_str(value) -> bytes:
+    if value is None:
+        return _U32.pack(NONE_LENGTH)
+    data = str(value).encode("utf-8")
+    return _U32.pack(len(data)) + data
+
+
+def unpack_str(buf: bytes, offset: int = 0):
+    (length,) = _U32.unpack_from(buf, offset)
+    offset += _U32.size
+    if length == NONE_LENGTH:
+        return None, offset
+    return buf[offset:offset + length].decode("utf-8"), offset + length
+
+
+def pack_patient(data: dict) -> bytes:
+    flags = (
+        (1 if data.get("Diabetes") else 0)
+        | (2 if data.get("Hypertension") else 0)
+        | (4 if data.get("Heart_Disease") else 0)
+    )
+    head = _PATIENT.pack(
+        int(data["Age"]),
+        int(data["Heart_Rate"]),
+        int(data["Systolic_BP"]),
+        int(data["Diastolic_BP"]),
+        float(data["O2_Saturation"]),
+        float(data["Temperature"]),
+        int(data["Respiratory_Rate"]),
+        int(data.get("Pain_Score", 0)),
+        int(data.get("GCS_Score", 15)),
+        flags,
+    )
+    return (
+        head
+        + pack_str(data["Gender"])
+        + pack_str(data.get("Arrival_Mode", "Walk-in"))
+        + pack_str(data.get("Chief_Complaint"))
+    )
+
+
+def unpack_patient(buf: bytes) -> dict:
+    (age, hr, sbp, dbp, o2, temp, rr, pain, gcs, flags) = _PATIENT.unpack_from(buf, 0)
+    offset = _PATIENT.size
+    gender, offset = unpack_str(buf, offset)
+    arrival_mode, offset = unpack_str(buf, offset)
+    complaint, offset = unpack_str(buf, offset)
+    return {
+        "Age": age,
+        "Gender": gender,
+        "Heart_Rate": hr,
+        "Systolic_BP": sbp,
+        "Diastolic_BP": dbp,
+        "O2_Saturation": o2,
+        "Temperature": temp,
+        "Respiratory_Rate": rr,
+        "Pain_Score": pain,
+        "GCS_Score": gcs,
+        "Arrival_Mode": arrival_mode,
+        "Diabetes": bool(flags & 1),
+        "Hypertension": bool(flags & 2),
+        "Heart_Disease": bool(flags & 4),
+        "Chief_Complaint": complaint,
+    }
+
+
+def pack_result(result: dict) -> bytes:
+    label = RISK_LABELS.index(result["risk_label"])
+    return (
+        _RESULT.pack(float(result["risk_score"]), label)
+        + pack_str(result["details"])
+        + pack_str(result.get("model_version"))
+    )
+
+
+def unpack_result(buf: bytes) -> dict:
+    risk_score, label = _RESULT.unpack_from(buf, 0)
+    details, offset = unpack_str(buf, _RESULT.size)
+    result = {
+        "risk_score": risk_score,
+        "risk_label": RISK_LABELS[label],
+        "details": details,
+    }
+    # Model version that scored it (sidecar registry); absent from older sidecars
+    if offset < len(buf):
+        version, _ = unpack_str(buf, offset)
+        if version is not None:
+            result["model_version"] = version
+    return result
+
+
+def pack_many(items: list) -> bytes:
+    """count:u32 followed by u32-length-prefixed items."""
+    return _U32.pack(len(items)) + b"".join(_U32.pack(len(item)) + item for item in items)
+
+
+def unpack_many(buf: bytes) -> list:
+    (count,) = _U32.unpack_from(buf, 0)
+    offset = _U32.size
+    items = []
+    for _ in range(count):
+        (length,) = _U32.unpack_from(buf, offset)
+        offset += _U32.size
+        items.append(buf[offset:offset + length])
+        offset += length
+    return items
+
+
+def read_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    remaining = size
+    while remaining:
+        chunk = sock.recv(remaining)
+        if not chunk:
+            raise ConnectionError("Inference sidecar closed the connection")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+# ============================================================
+# ------------------- CLIENT ---------------------------------
+# ============================================================
+
+class InferenceClient:
+    """
+    Blocking client used by the FastAPI workers. Each worker thread keeps its
+    own connection, so one request is in flight per connection and the
+    server is free to batch across threads and workers.
+    """
+
+    def __init__(self, socket_path: str, timeout: float = 30.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._ids = itertools.count(1)
+
+    def _connection(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            self._local.sock = sock
+        return sock
+
+    def _reset(self):
+        sock = getattr(self._local, "sock", None)
+        self._local.sock = None
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+    def call(self, op: int, payload: bytes = b"") -> bytes:
+        request_id = next(self._ids) & 0xFFFFFFFF
+        frame = HEADER.pack(request_id, op, len(payload)) + payload
+
+        # Every op is idempotent, so a stale connection is retried once
+        for attempt in range(2):
+            try:
+                sock = self._connection()
+                sock.sendall(frame)
+                reply_id, status, length = HEADER.unpack(read_exact(sock, HEADER.size))
+                body = read_exact(sock, length)
+                break
+            except OSError:
+                self._reset()
+                if attempt:
+                    raise
+
+        if reply_id != request_id:
+            self._reset()
+            raise InferenceError(f"Out-of-order reply {reply_id} for request {request_id}")
+        if status != STATUS_OK:
+            raise InferenceError(body.decode("utf-8", errors="replace"))
+        return body
+
+    def ping(self) -> bool:
+        try:
+            self.call(OP_PING)
+            return True
+        except Exception:
+            return False
+
+    def predict(self, data: dict) -> dict:
+        return unpack_result(self.call(OP_PREDICT, pack_patient(data)))
+
+    def predict_batch(self, records: list) -> list:
+        body = self.call(OP_PREDICT_BATCH, pack_many([pack_patient(data) for data in records]))
+        return [unpack_result(item) for item in unpack_many(body)]
+
+    def get_department(self, complaint: str) -> str:
+        department, _ = unpack_str(self.call(OP_DEPARTMENT, pack_str(complaint)))
+        return department
+
+    def route_complaint(self, complaint: str) -> dict:
+        return json.loads(self.call(OP_ROUTE, pack_str(complaint)))
+
+    def get_referral(self, complaint_or_reason: str, routing: dict = None, cached_roster: bool = False):
+        payload = pack_str(complaint_or_reason) + pack_str(json.dumps(routing) if routing else None)
+        if cached_roster:
+            payload += pack_str("cached")
+        return json.loads(self.call(OP_REFERRAL, payload))
+
+    def get_routing_stats(self) -> dict:
+        return json.loads(self.call(OP_STATS))
+
+    def model_command(self, action: str, version: str = None) -> dict:
+        """Model registry admin on the sidecar: "status", "activate" (with version) or "rollback"."""
+        return json.loads(self.call(OP_MODEL, pack_str(json.dumps({"action": action, "version": version}))))
+
+
+class RemoteTriageModel:
+    """Drop-in stand-in for ml_service.TriageModel backed by the sidecar."""
+
+    def __init__(self, client: InferenceClient):
+        self.client = client
+
+    def predict(self, data: dict) -> dict:
+        return self.client.predict(data)
+
+    def predict_batch(self, records: list) -> list:
+        return self.client.predict_batch(records)
+
+    def fast_path_stats(self):
+        """The sidecar model's surrogate hit rate, forwarded through OP_STATS."""
+        return self.client.get_routing_stats().get("fast_path")
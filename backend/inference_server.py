@@ -0,0 +1,244 @@
+"""
+PARS - Inference Sidecar
+One process owns TriageModel and the dept_service NLP models; any number of
+uvicorn workers share it over a Unix domain socket.
+
+Run with:
+  python inference_server.py                      # listens on PARS_INFERENCE_SOCKET
+  PARS_INFERENCE_SOCKET=/tmp/pars-inference.sock PARS_WORKERS=4 uvicorn main:app --workers 4
+
+Concurrent /predict requests from all workers are collected for up to
+PARS_SIDECAR_BATCH_WAIT_MS (or PARS_SIDECAR_BATCH_SIZE records) and scored
+with a single TriageModel.predict_batch call. If that call raises, the batch
+is retried one record at a time so only the offending record gets the error.
+
+The sidecar owns the model registry in this mode: the API forwards
+/admin/models calls as OP_MODEL, and every predict reply names the version
+that scored it.
+"""
+
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from inference_protocol import (
+    HEADER,
+    OP_DEPARTMENT,
+    OP_MODEL,
+    OP_PING,
+    OP_PREDICT,
+    OP_PREDICT_BATCH,
+    OP_REFERRAL,
+    OP_ROUTE,
+    OP_STATS,
+    STATUS_ERROR,
+    STATUS_OK,
+    pack_many,
+    pack_result,
+    pack_str,
+    unpack_many,
+    unpack_patient,
+    unpack_str,
+)
+
+# The sidecar is the single process hosting TF and torch: it gets the whole budget.
+# It is not pinned, so it never takes an API worker's CPU slot.
+from cpu_budget import cpu_budget
+cpu_budget.configure(workers=int(os.getenv("PARS_SIDECAR_WORKERS", "1")), pin=False)
+
+from ml_service import TriageModel
+from model_registry import ModelRegistry
+from dept_service import get_department, get_referral, get_routing_stats, route_complaint
+
+cpu_budget.apply_frameworks()
+
+DEFAULT_SOCKET = "/tmp/pars-inference.sock"
+
+
+class InferenceServer:
+    def __init__(self, socket_path, max_batch=32, max_wait_ms=2.0, routing_threads=2):
+        self.socket_path = socket_path
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.registry = ModelRegistry(loader=TriageModel)
+        self.registry.load(os.getenv("PARS_MODEL_VERSION", "baseline"))
+        # TensorFlow gets one dedicated thread; routing/roster calls get their own pool
+        self._model_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pars-model")
+        self._routing_executor = ThreadPoolExecutor(max_workers=routing_threads, thread_name_prefix="pars-routing")
+        self._queue = None
+        # Strong references: the event loop only keeps weak ones to running tasks
+        self._tasks = set()
+        self.batches = 0
+        self.batched_records = 0
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            records = [record for record, _ in batch]
+            # One version per batch, even if a swap lands meanwhile
+            active = self.registry.active()
+            try:
+                results = await loop.run_in_executor(self._model_executor, active.model.predict_batch, records)
+            except Exception as e:
+                print(f"[PARS] Sidecar batch of {len(batch)} failed ({e}); retrying records individually.")
+                await self._predict_individually(active, batch)
+                continue
+
+            self.batches += 1
+            self.batched_records += len(batch)
+            for (_, future), result in zip(batch, results):
+                result["model_version"] = active.version
+                if not future.done():
+                    future.set_result(result)
+
+    async def _predict_individually(self, active, batch):
+        loop = asyncio.get_running_loop()
+        for record, future in batch:
+            if future.done():
+                continue
+            try:
+                result = await loop.run_in_executor(self._model_executor, active.model.predict, record)
+            except Exception as e:
+                print(f"[PARS] Sidecar record failed: {e}")
+                if not future.done():
+                    future.set_exception(e)
+                continue
+            result["model_version"] = active.version
+            if not future.done():
+                future.set_result(result)
+
+    def _spawn(self, coro):
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _dispatch(self, op, payload):
+        loop = asyncio.get_running_loop()
+
+        if op == OP_PING:
+            return b""
+        if op == OP_PREDICT:
+            future = loop.create_future()
+            await self._queue.put((unpack_patient(payload), future))
+            return pack_result(await future)
+        if op == OP_PREDICT_BATCH:
+            futures = []
+            for item in unpack_many(payload):
+                future = loop.create_future()
+                await self._queue.put((unpack_patient(item), future))
+                futures.append(future)
+            results = await asyncio.gather(*futures)
+            return pack_many([pack_result(result) for result in results])
+        if op == OP_DEPARTMENT:
+            complaint, _ = unpack_str(payload)
+            department = await loop.run_in_executor(self._routing_executor, get_department, complaint)
+            return pack_str(department)
+        if op == OP_ROUTE:
+            complaint, _ = unpack_str(payload)
+            routing = await loop.run_in_executor(self._routing_executor, route_complaint, complaint)
+            return json.dumps(routing).encode("utf-8")
+        if op == OP_REFERRAL:
+            reason, offset = unpack_str(payload)
+            routing = None
+            cached_roster = False
+            if offset < len(payload):
+                routing_json, offset = unpack_str(payload, offset)
+                routing = json.loads(routing_json) if routing_json else None
+            if offset < len(payload):
+                roster_mode, _ = unpack_str(payload, offset)
+                cached_roster = roster_mode == "cached"
+            referral = await loop.run_in_executor(
+                self._routing_executor, get_referral, reason, routing, cached_roster
+            )
+            return json.dumps(referral).encode("utf-8")
+        if op == OP_MODEL:
+            command_json, _ = unpack_str(payload)
+            return json.dumps(self._model_command(json.loads(command_json))).encode("utf-8")
+        if op == OP_STATS:
+            stats = get_routing_stats()
+            stats["sidecar_batches"] = self.batches
+            stats["sidecar_avg_batch"] = round(self.batched_records / self.batches, 2) if self.batches else 0.0
+            active = self.registry.active()
+            stats["fast_path"] = active.model.fast_path_stats() if active else None
+            return json.dumps(stats).encode("utf-8")
+        raise ValueError(f"Unknown op {op}")
+
+    def _model_command(self, command: dict) -> dict:
+        """Runs a registry admin command; errors come back as {"error", "code"} like the HTTP API."""
+        action = command.get("action")
+        reply = {}
+        if action not in ("status", "activate", "rollback"):
+            return {"error": f"Unknown model action '{action}'", "code": 400}
+        try:
+            if action == "activate":
+                if not self.registry.load_async(command.get("version") or ""):
+                    reply = {"error": "Another model version is already loading", "code": 409}
+            elif action == "rollback":
+                self.registry.rollback()
+        except ValueError as e:
+            reply = {"error": str(e), "code": 404}
+        except RuntimeError as e:
+            reply = {"error": str(e), "code": 409}
+        reply["status"] = {**self.registry.status(), "available": self.registry.available()}
+        return reply
+
+    async def _serve_request(self, writer, write_lock, request_id, op, payload):
+        try:
+            status, body = STATUS_OK, await self._dispatch(op, payload)
+        except Exception as e:
+            status, body = STATUS_ERROR, str(e).encode("utf-8")
+        async with write_lock:
+            writer.write(HEADER.pack(request_id, status, len(body)) + body)
+            await writer.drain()
+
+    async def _handle_connection(self, reader, writer):
+        write_lock = asyncio.Lock()
+        try:
+            while True:
+                header = await reader.readexactly(HEADER.size)
+                request_id, op, length = HEADER.unpack(header)
+                payload = await reader.readexactly(length)
+                self._spawn(self._serve_request(writer, write_lock, request_id, op, payload))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve_forever(self):
+        self._queue = asyncio.Queue()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+        server = await asyncio.start_unix_server(self._handle_connection, path=self.socket_path)
+        self._spawn(self._batch_loop())
+        print(f"[PARS] Inference sidecar listening on {self.socket_path} "
+              f"(batch<= {self.max_batch}, wait {self.max_wait * 1000:.1f} ms)")
+        async with server:
+            await server.serve_forever()
+
+
+if __name__ == "__main__":
+    server = InferenceServer(
+        os.getenv("PARS_INFERENCE_SOCKET", DEFAULT_SOCKET),
+        max_batch=int(os.getenv("PARS_SIDECAR_BATCH_SIZE", "32")),
+        max_wait_ms=float(os.getenv("PARS_SIDECAR_BATCH_WAIT_MS", "2")),
+        routing_threads=int(os.getenv("PARS_SIDECAR_ROUTING_THREADS", "2")),
+    )
+    asyncio.run(server.serve_forever())
@@ -0,0 +1,40 @@
+"""
+PARS - Keyword Routing
+The original substring keyword router. It has no model dependencies, so it is
+importable anywhere (dept_service fallback, API workers under load shedding).
+"""
+
+HOSPITAL_MAP = {
+    "Cardiology": ["chest pain", "heart", "bp", "palpitations"],
+    "Neurology": ["stroke", "headache", "seizure", "paralysis"],
+    "Gastroenterology": ["stomach", "vomiting", "diarrhea"],
+    "Pulmonology": ["cough", "asthma", "breath"],
+    "Orthopedics": ["fracture", "bone", "joint"],
+    "Emergency_Trauma": ["accident", "trauma", "bleed"],
+    "General_Medicine": ["fever", "flu", "fatigue"],
+    "Dermatology": ["rash", "itch", "skin"],
+    "ENT": ["ear", "nose", "throat"],
+    "Urology_Nephrology": ["kidney", "urine", "bladder"],
+    "Psychiatry": ["depression", "anxiety", "suicide"],
+    "Toxicology": ["poison", "overdose", "chemical"]
+}
+
+
+def get_department_legacy(complaint: str) -> str:
+    complaint = complaint.lower()
+
+    for department, keywords in HOSPITAL_MAP.items():
+        if any(k in complaint for k in keywords):
+            return department
+
+    return "General_Medicine"
+
+
+def legacy_routing(complaint: str) -> dict:
+    """get_department_legacy result in the route_complaint() shape (stage "legacy")."""
+    department = get_department_legacy(complaint or "")
+    return {
+        "department": department,
+        "stage": "legacy",
+        "candidates": [{"department": department, "score": 1.0}],
+    }
@@ -0,0 +1,211 @@
+"""
+PARS - Adaptive Load Shedding
+Overload controller that trades answer quality for latency during surges.
+
+Requests are tracked per endpoint class, each with its own latency window and
+SLOs:
+  triage   /predict, /predict/stream, /self-check-in
+           PARS_SLO_LATENCY_MS, PARS_SLO_INFLIGHT
+  parsing  /parse-document, /parse-documents
+           PARS_SLO_PARSE_LATENCY_MS, PARS_SLO_PARSE_INFLIGHT
+
+A class's pressure is the worse of (requests in flight / in-flight SLO) and
+(p95 latency over the recent window / latency SLO). While pressure stays at
+or above 1.0 the controller steps up one level per PARS_SHED_ESCALATE_SECONDS,
+but each further step needs latencies observed since the previous one: a
+single spike still inside the PARS_SHED_WINDOW_SECONDS window cannot carry
+the controller to level 3 on its own. It steps back down only after pressure has stayed below
+PARS_SHED_RECOVER_RATIO for PARS_SHED_RECOVER_SECONDS, so it does not flap
+around the threshold.
+
+Levels shed the most expensive work first:
+  1  parsing  Gemini extraction -> local regex parser
+  2  routing  transformer routing -> keyword get_department_legacy
+  3  roster   live roster queries -> cached roster snapshot
+
+Triage pressure can drive all three levels. Parsing pressure (slow Gemini
+calls) only ever sheds the parsing tier, so a burst of document uploads
+cannot degrade /predict while /predict itself is within its SLO.
+
+Triage scoring itself is never degraded: TriageModel.predict (and its safety
+guardrails) runs the same way at every level.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+TIERS = ["parsing", "routing", "roster"]
+DEGRADED_HEADER = "X-PARS-Degraded"
+
+# Highest level each endpoint class may push the controller to
+CLASS_MAX_LEVEL = {"triage": len(TIERS), "parsing": 1}
+
+
+class _Ladder:
+    """Latency window, in-flight count and hysteretic level for one endpoint class."""
+
+    def __init__(self, latency_slo_ms, inflight_slo, max_level):
+        self.latency_slo_ms = latency_slo_ms
+        self.inflight_slo = inflight_slo
+        self.max_level = max_level
+        self.inflight = 0
+        self.latencies = deque(maxlen=4096)  # (finished_at, ms)
+        self.level = 0
+        self.changed_at = time.monotonic()
+        self.calm_since = None
+        self.pressure = 0.0
+        self.fresh_pressure = 0.0  # pressure from requests finished since the last level change
+        self.p95_ms = None
+        self.transitions = 0
+
+    def p95(self, now: float, window_seconds: float, since: float = None):
+        """p95 over the window, or only over requests finished after `since`."""
+        cutoff = now - window_seconds
+        while self.latencies and self.latencies[0][0] < cutoff:
+            self.latencies.popleft()
+        samples = sorted(ms for finished_at, ms in self.latencies if since is None or finished_at > since)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+    def status(self) -> dict:
+        return {
+            "level": self.level,
+            "pressure": round(self.pressure, 3),
+            "p95_ms": round(self.p95_ms, 1) if self.p95_ms is not None else None,
+            "in_flight": self.inflight,
+            "slo": {"latency_ms": self.latency_slo_ms, "in_flight": self.inflight_slo},
+            "transitions": self.transitions,
+        }
+
+
+class OverloadController:
+    def __init__(
+        self,
+        enabled=True,
+        latency_slo_ms=1500.0,
+        inflight_slo=32,
+        parse_latency_slo_ms=20000.0,
+        parse_inflight_slo=8,
+        window_seconds=30.0,
+        escalate_seconds=2.0,
+        recover_ratio=0.6,
+        recover_seconds=30.0,
+        forced_level=None,
+    ):
+        self.enabled = enabled
+        self.window_seconds = window_seconds
+        self.escalate_seconds = escalate_seconds
+        self.recover_ratio = recover_ratio
+        self.recover_seconds = recover_seconds
+        self.forced_level = forced_level
+
+        self._lock = threading.Lock()
+        self._ladders = {
+            "triage": _Ladder(latency_slo_ms, inflight_slo, CLASS_MAX_LEVEL["triage"]),
+            "parsing": _Ladder(parse_latency_slo_ms, parse_inflight_slo, CLASS_MAX_LEVEL["parsing"]),
+        }
+        self._evaluated_at = 0.0
+
+    # ------------------- observations -------------------
+
+    @contextmanager
+    def track(self, endpoint_class="triage", observe_latency=True):
+        """Wraps one request of `endpoint_class`: counts it as in flight and records its latency."""
+        ladder = self._ladders[endpoint_class]
+        with self._lock:
+            ladder.inflight += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            now = time.monotonic()
+            with self._lock:
+                ladder.inflight -= 1
+                if observe_latency:
+                    ladder.latencies.append((now, (now - started) * 1000.0))
+                self._evaluate(now)
+
+    def _evaluate(self, now: float):
+        # Called with the lock held; at most a few times per second
+        if now - self._evaluated_at < 0.25:
+            return
+        self._evaluated_at = now
+        for name, ladder in self._ladders.items():
+            ladder.p95_ms = ladder.p95(now, self.window_seconds)
+            latency_pressure = (ladder.p95_ms or 0.0) / ladder.latency_slo_ms
+            inflight_pressure = ladder.inflight / ladder.inflight_slo
+            ladder.pressure = max(inflight_pressure, latency_pressure)
+            fresh_p95 = ladder.p95(now, self.window_seconds, since=ladder.changed_at)
+            ladder.fresh_pressure = max(inflight_pressure, (fresh_p95 or 0.0) / ladder.latency_slo_ms)
+            self._step(name, ladder, now)
+
+    def _step(self, name: str, ladder: _Ladder, now: float):
+        if ladder.pressure >= 1.0:
+            ladder.calm_since = None
+            if (ladder.level < ladder.max_level and now - ladder.changed_at >= self.escalate_seconds
+                    and ladder.fresh_pressure >= 1.0):
+                self._set_level(name, ladder, ladder.level + 1, now)
+        elif ladder.pressure < self.recover_ratio:
+            if ladder.calm_since is None:
+                ladder.calm_since = now
+            elif (ladder.level > 0 and now - ladder.calm_since >= self.recover_seconds
+                    and now - ladder.changed_at >= self.recover_seconds):
+                self._set_level(name, ladder, ladder.level - 1, now)
+                ladder.calm_since = now
+        else:
+            ladder.calm_since = None
+
+    def _set_level(self, name: str, ladder: _Ladder, level: int, now: float):
+        print(f"[PARS] Load shedding ({name}) level {ladder.level} -> {level} "
+              f"(pressure {ladder.pressure:.2f}, p95 {ladder.p95_ms or 0:.0f} ms, in flight {ladder.inflight})")
+        ladder.level = level
+        ladder.changed_at = now
+        ladder.transitions += 1
+
+    # ------------------- decisions -------------------
+
+    def level(self) -> int:
+        if not self.enabled:
+            return 0
+        if self.forced_level is not None:
+            return self.forced_level
+        with self._lock:
+            self._evaluate(time.monotonic())
+            return max(ladder.level for ladder in self._ladders.values())
+
+    def degraded(self, tier: str) -> bool:
+        return self.level() > TIERS.index(tier)
+
+    def active_tiers(self) -> list:
+        return TIERS[:self.level()]
+
+    def status(self) -> dict:
+        level = self.level()
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "level": level,
+                "degraded": TIERS[:level],
+                "forced": self.forced_level is not None,
+                "classes": {name: ladder.status() for name, ladder in self._ladders.items()},
+            }
+
+
+def create_overload_controller() -> OverloadController:
+    forced = os.getenv("PARS_SHED_FORCE_LEVEL")
+    return OverloadController(
+        enabled=os.getenv("PARS_LOAD_SHEDDING", "1") != "0",
+        latency_slo_ms=float(os.getenv("PARS_SLO_LATENCY_MS", "1500")),
+        inflight_slo=int(os.getenv("PARS_SLO_INFLIGHT", "32")),
+        parse_latency_slo_ms=float(os.getenv("PARS_SLO_PARSE_LATENCY_MS", "20000")),
+        parse_inflight_slo=int(os.getenv("PARS_SLO_PARSE_INFLIGHT", "8")),
+        window_seconds=float(os.getenv("PARS_SHED_WINDOW_SECONDS", "30")),
+        escalate_seconds=float(os.getenv("PARS_SHED_ESCALATE_SECONDS", "2")),
+        recover_ratio=float(os.getenv("PARS_SHED_RECOVER_RATIO", "0.6")),
+        recover_seconds=float(os.getenv("PARS_SHED_RECOVER_SECONDS", "30")),
+        forced_level=max(0, min(len(TIERS), int(forced))) if forced else None,
+    )
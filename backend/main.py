@@ -1,22 +1,51 @@
 """
 PARS - FastAPI Backend
 Run with: uvicorn main:app --reload --port 8000
+Several workers: PARS_WORKERS=4 uvicorn main:app --workers 4 --port 8000
+(PARS_WORKERS sizes the per-worker CPU budget and turns on model broadcast;
+it should match --workers)
 """
 
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import FastAPI, HTTPException, UploadFile, File, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse, Response, JSONResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import Optional
 from typing import Optional, List, Dict, Any
+import asyncio
+import functools
+import json
+import os
+import time
+import uuid
+from contextlib import ExitStack
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
 
-# Try to import ML service (requires TensorFlow)
-try:
-    from ml_service import TriageModel
+# Thread pools are sized when TF/torch/BLAS load, so the CPU budget goes first
+from cpu_budget import cpu_budget
+cpu_budget.configure()
+
+# Optional inference sidecar (see inference_server.py). When set, TriageModel and
+# the NLP models live in one shared process and workers never import TF/torch.
+INFERENCE_SOCKET = os.getenv("PARS_INFERENCE_SOCKET")
+
+if INFERENCE_SOCKET:
+    from inference_protocol import InferenceClient, RemoteTriageModel
+    inference_client = InferenceClient(INFERENCE_SOCKET)
+    TriageModel = functools.partial(RemoteTriageModel, inference_client)
     ML_AVAILABLE = True
-except Exception as e:
-    print(f"[PARS] WARNING: ML service not available: {e}")
-    TriageModel = None
-    ML_AVAILABLE = False
+    print(f"[PARS] Using inference sidecar at {INFERENCE_SOCKET}")
+else:
+    inference_client = None
+    # Try to import ML service (requires TensorFlow)
+    try:
+        from ml_service import TriageModel
+        ML_AVAILABLE = True
+    except Exception as e:
+        print(f"[PARS] WARNING: ML service not available: {e}")
+        TriageModel = None
+        ML_AVAILABLE = False
 
 # Try to import doc parser (requires Google AI)
 try:
@@ -28,15 +57,58 @@ except Exception as e:
     DOC_PARSER_AVAILABLE = False
 
 # Try to import dept service
-try:
-    from dept_service import get_referral, get_department
+if inference_client:
+    get_referral = inference_client.get_referral
+    get_department = inference_client.get_department
+    route_complaint = inference_client.route_complaint
+    get_routing_stats = inference_client.get_routing_stats
     DEPT_SERVICE_AVAILABLE = True
-except Exception as e:
-    print(f"[PARS] WARNING: Dept service not available: {e}")
-    get_referral = None
-    get_department = None
-    DEPT_SERVICE_AVAILABLE = False
+else:
+    try:
+        from dept_service import get_referral, get_department, route_complaint, get_routing_stats
+        DEPT_SERVICE_AVAILABLE = True
+    except Exception as e:
+        print(f"[PARS] WARNING: Dept service not available: {e}")
+        get_referral = None
+        get_department = None
+        route_complaint = None
+        get_routing_stats = None
+        DEPT_SERVICE_AVAILABLE = False
+
+cpu_budget.apply_frameworks()
+
+from triage_cache import predict_cache, canonical_key
+from stream_ingest import iter_ndjson_lines, encode_line, STREAM_CHUNK_SIZE
+from triage_queue import triage_queue, format_sse
+from persistence import create_persistence_queue, rows_from_predict, rows_from_check_in
+from model_registry import ModelRegistry, ACTIVE_FILE
+from admin_auth import require_admin
+from triage_stats import triage_stats
+from load_shedding import create_overload_controller, DEGRADED_HEADER
+from keyword_routing import get_department_legacy, legacy_routing
+from document_batch import expand_uploads, merge_extractions, ByteBudget, PARSE_CONCURRENCY, MAX_BATCH_FILES
+from profiler import (
+    profiler, to_collapsed, to_speedscope, summarize, memory_stats, set_memory_tracing,
+    new_trace_id, set_request_tag, TRACE_HEADER,
+)
 
+# Optional write-behind persistence of triage decisions (PARS_PERSIST_BACKEND)
+persistence_queue = create_persistence_queue()
+
+# Overload controller: degrades parsing/routing/rosters (never scoring) under surges
+overload = create_overload_controller()
+# path -> endpoint class; each class has its own latency window and SLO
+SHED_TRACKED_PATHS = {
+    "/predict": "triage",
+    "/predict/stream": "triage",
+    "/self-check-in": "triage",
+    "/parse-document": "parsing",
+    "/parse-documents": "parsing",
+}
+
+# Live dashboard counters, restored from the last snapshot
+triage_stats.load()
+triage_stats.start()
 
 
 app = FastAPI(title="PARS Triage API", version="1.0.0")
@@ -57,16 +129,84 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+# Opt-in request tracing: clients send X-PARS-Trace (any value, or their own id)
+# and get the trace id plus Server-Timing back; during a profiling session the
+# traced requests are listed alongside the samples. Every request's endpoint
+# (and trace id) is carried to the threads its work is offloaded to, see
+# profiler.wrap.
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    trace = request.headers.get(TRACE_HEADER)
+    endpoint = f"{request.method} {request.url.path}"
+    if trace is None:
+        set_request_tag(endpoint)
+        return await call_next(request)
+
+    trace_id = trace if trace not in ("", "1", "true") else new_trace_id()
+    set_request_tag(endpoint, trace_id)
+    started = time.perf_counter()
+    response = await call_next(request)
+    duration_ms = (time.perf_counter() - started) * 1000.0
+    profiler.record_trace(trace_id, request.method, request.url.path, response.status_code, duration_ms)
+    response.headers[TRACE_HEADER] = trace_id
+    response.headers["Server-Timing"] = f"app;dur={duration_ms:.2f}"
+    return response
+
+
+@app.middleware("http")
+async def shed_load(request: Request, call_next):
+    endpoint_class = SHED_TRACKED_PATHS.get(request.url.path)
+    if endpoint_class is None:
+        return await call_next(request)
+    # A request stays in flight until its body is fully sent, so the NDJSON
+    # streams count for as long as they keep scoring or parsing
+    tracking = ExitStack()
+    tracking.enter_context(overload.track(endpoint_class))
+    try:
+        response = await call_next(request)
+    except BaseException:
+        tracking.close()
+        raise
+    response.body_iterator = _close_after(response.body_iterator, tracking)
+    return response
+
+
+async def _close_after(body, tracking: ExitStack):
+    try:
+        async for chunk in body:
+            yield chunk
+    finally:
+        tracking.close()
+
+
+def _mark_degraded(response: Response, tiers):
+    """X-PARS-Degraded lists exactly the tiers this response was served with."""
+    if tiers:
+        response.headers[DEGRADED_HEADER] = ",".join(tiers)
+
+
+# Versioned models with hot-swap (the sidecar owns its own model in sidecar mode)
+model_registry = ModelRegistry(loader=None if INFERENCE_SOCKET else TriageModel)
+# Cached results name the version that produced them, so drop them on swap
+model_registry.on_swap(lambda version: predict_cache.clear())
+# Several in-process workers: model activation is broadcast through a shared file
+MODEL_BROADCAST = not INFERENCE_SOCKET and cpu_budget.status()["workers"] > 1
+
 # Load model on startup (if ML is available)
 if ML_AVAILABLE:
     try:
-        model = TriageModel()
+        if INFERENCE_SOCKET:
+            model_registry.install("sidecar", TriageModel())
+        else:
+            published = ModelRegistry.published() if MODEL_BROADCAST else None
+            model_registry.load(published or os.getenv("PARS_MODEL_VERSION", "baseline"))
+            if MODEL_BROADCAST:
+                model_registry.follow(ACTIVE_FILE, float(os.getenv("PARS_MODEL_SYNC_SECONDS", "2")))
         print("[PARS] Model loaded successfully.")
     except Exception as e:
         print(f"[PARS] WARNING: Could not load model: {e}")
-        model = None
 else:
-    model = None
     print("[PARS] Running without ML model (TensorFlow not available)")
 
 
@@ -93,46 +233,220 @@ class TriageResponse(BaseModel):
     risk_label: str
     details: str
     referral: Optional[Dict[str, Any]] = None
+    queue_id: Optional[str] = None
+    model_version: Optional[str] = None
+    degraded: Optional[List[str]] = None
 
 
 @app.get("/")
 def health():
+    active = model_registry.active()
     return {
         "status": "ok", 
-        "model_loaded": model is not None,
+        "model_loaded": model_registry.active() is not None,
+        "model": model_registry.status(),
+        "fast_path": active.model.fast_path_stats() if active else None,
         "ml_available": ML_AVAILABLE,
-        "whisper_available": True  # Whisper is always available
+        "whisper_available": True,  # Whisper is always available
+        "inference_sidecar": INFERENCE_SOCKET,
+        "routing": get_routing_stats() if get_routing_stats else None,
+        "predict_cache": predict_cache.stats(),
+        "persistence": persistence_queue.stats() if persistence_queue else None,
+        "load_shedding": overload.status(),
+        "cpu": cpu_budget.status()
     }
 
 
+# Shared pool for the independent /predict stages (inference, referral)
+_stage_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv("PARS_STAGE_WORKERS", "16")), thread_name_prefix="pars-stage"
+)
+INFERENCE_DEADLINE = float(os.getenv("PARS_INFERENCE_DEADLINE", "10"))
+REFERRAL_DEADLINE = float(os.getenv("PARS_REFERRAL_DEADLINE", "5"))
+
+
+def _submit_stage(fn, *args):
+    # Tagged with the request so profiler samples of pars-stage threads show the endpoint
+    return _stage_pool.submit(profiler.wrap(fn), *args)
+
+
+_sidecar_version = None
+
+
+def _set_model_version(result: dict, active):
+    """
+    In sidecar mode the reply names the sidecar's active version. A change
+    (a swap forwarded by any worker) drops results cached under the old one.
+    """
+    global _sidecar_version
+    version = result.get("model_version") if INFERENCE_SOCKET else None
+    if version is None:
+        result["model_version"] = active.version
+        return
+    if _sidecar_version is not None and version != _sidecar_version:
+        predict_cache.clear()
+    _sidecar_version = version
+
+
+def _remaining(started: float, deadline: float) -> float:
+    return max(0.0, deadline - (time.monotonic() - started))
+
+
 @app.post("/predict", response_model=TriageResponse)
-def predict(patient: PatientInput):
-    if model is None:
+def predict(patient: PatientInput, response: Response):
+    # Pin the model version for the whole request; a hot-swap won't affect it
+    active = model_registry.active()
+    if active is None:
         raise HTTPException(status_code=503, detail="Model not loaded. Place model files in backend/ directory.")
 
-    # 1. Get ML Prediction & Risk Analysis
-    result = model.predict(patient.dict())
-    
-    # 2. Determine Referral Logic
-    # Use Chief Complaint if provided, otherwise fallback to the generated "details"
-    referral_reason = patient.Chief_Complaint if patient.Chief_Complaint else result["details"]
-    
-    # 3. Get Department & Doctor List (Graceful Fallback)
+    # Duplicate submissions (client retries, resubmitted vitals) within the cache
+    # TTL share one computation and one patient visit: the side effects run once
+    # per canonical key, and duplicates get the same queue_id back
+    payload = patient.dict()
+    result = predict_cache.get_or_compute(
+        canonical_key(payload),
+        lambda: _run_predict(active, payload),
+        on_computed=lambda computed: _record_visit(payload, computed),
+    )
+    _mark_degraded(response, result.get("degraded"))
+    return result
+
+
+def _referral_stage(referral_reason: str, degraded: list) -> dict:
+    # Get Department & Doctor List (Graceful Fallback)
     if DEPT_SERVICE_AVAILABLE and get_referral:
         try:
-            referral_data = get_referral(referral_reason)
+            routing = legacy_routing(referral_reason) if "routing" in degraded else None
+            return get_referral(referral_reason, routing=routing, cached_roster="roster" in degraded)
         except Exception as e:
             print(f"[PARS] Error getting referral: {e}")
-            referral_data = {"department": "General Medicine", "doctors": []}
+            return {"department": "General Medicine", "doctors": []}
     else:
         print("[PARS] Dept service unavailable, using fallback.")
+        return {"department": "General Medicine", "doctors": []}
+
+
+def _record_visit(payload: dict, result: dict):
+    """Queue admission, stats and persistence for one new /predict visit."""
+    department = result["referral"].get("department")
+    # 5. Admit to the live triage queue
+    patient_id = str(uuid.uuid4())
+    triage_queue.admit(
+        patient_id,
+        result,
+        department=department,
+        chief_complaint=payload.get("Chief_Complaint"),
+    )
+    result["queue_id"] = patient_id
+    triage_stats.record(result, department=department, source="predict")
+
+    # 6. Queue for persistence (buffered, never blocks the response)
+    if persistence_queue:
+        persistence_queue.enqueue(*rows_from_predict(payload, result, patient_id))
+
+
+def _run_predict(active, payload: dict) -> dict:
+    """Pure scoring + referral; shared by coalesced requests, so no side effects here."""
+    started = time.monotonic()
+    complaint = payload.get("Chief_Complaint")
+    # Decided once per request; only routing/roster can be shed here, never scoring
+    degraded = [tier for tier in overload.active_tiers() if tier in ("routing", "roster")]
+
+    # Stage graph: with a Chief Complaint, routing + roster lookup don't depend on
+    # the risk score, so they run alongside inference. Without one, the referral
+    # is routed on the generated "details" and has to wait for the model.
+    referral_future = _submit_stage(_referral_stage, complaint, degraded) if complaint else None
+
+    # 1. Get ML Prediction & Risk Analysis
+    inference_future = _submit_stage(active.model.predict, payload)
+    try:
+        result = inference_future.result(timeout=_remaining(started, INFERENCE_DEADLINE))
+    except FuturesTimeout:
+        raise HTTPException(status_code=504, detail="Triage inference exceeded its deadline")
+    _set_model_version(result, active)
+
+    # 2./3. Determine Referral (dependent stage only when there was no complaint)
+    if referral_future is None:
+        referral_future = _submit_stage(_referral_stage, result["details"], degraded)
+        referral_started = time.monotonic()
+    else:
+        referral_started = started
+    try:
+        referral_data = referral_future.result(timeout=_remaining(referral_started, REFERRAL_DEADLINE))
+    except FuturesTimeout:
+        print("[PARS] Referral stage exceeded its deadline, using fallback.")
         referral_data = {"department": "General Medicine", "doctors": []}
     
     # 4. Merge Results
     result["referral"] = referral_data
-    
+    if degraded:
+        result["degraded"] = degraded
+
     return result
 
+@app.post("/predict/stream")
+async def predict_stream(request: Request):
+    """
+    Accepts an NDJSON body of PatientInput records and streams NDJSON results
+    back, scoring STREAM_CHUNK_SIZE records per TriageModel.predict_batch call.
+    The body is read only as fast as results are consumed, so a slow client
+    throttles ingestion instead of growing server memory.
+    """
+    active = model_registry.active()
+    if active is None:
+        raise HTTPException(status_code=503, detail="Model not loaded. Place model files in backend/ directory.")
+
+    # Decided once per stream so every line and the header agree
+    shed_routing = overload.degraded("routing")
+    response = StreamingResponse(_stream_triage(request, active, shed_routing), media_type="application/x-ndjson")
+    _mark_degraded(response, ["routing"] if shed_routing else None)
+    return response
+
+
+async def _stream_triage(request: Request, active, shed_routing: bool):
+    chunk = []
+    async for line_no, line in iter_ndjson_lines(request.stream()):
+        try:
+            if isinstance(line, Exception):
+                raise line
+            chunk.append((line_no, PatientInput(**json.loads(line)).dict()))
+        except (ValueError, TypeError) as e:
+            yield encode_line({"line": line_no, "error": str(e)})
+            continue
+
+        if len(chunk) >= STREAM_CHUNK_SIZE:
+            yield await run_in_threadpool(profiler.wrap(_score_chunk), active, chunk, shed_routing)
+            chunk = []
+
+    if chunk:
+        yield await run_in_threadpool(profiler.wrap(_score_chunk), active, chunk, shed_routing)
+
+
+def _score_chunk(active, chunk: list, shed_routing: bool = False) -> bytes:
+    records = [record for _, record in chunk]
+    try:
+        results = active.model.predict_batch(records)
+    except Exception as e:
+        print(f"[PARS] Stream chunk failed: {e}")
+        return b"".join(encode_line({"line": line_no, "error": "Inference failed"}) for line_no, _ in chunk)
+
+    lines = []
+    for (line_no, record), result in zip(chunk, results):
+        result["line"] = line_no
+        _set_model_version(result, active)
+        if record.get("Chief_Complaint") and DEPT_SERVICE_AVAILABLE and get_department:
+            try:
+                if shed_routing:
+                    result["department"] = get_department_legacy(record["Chief_Complaint"])
+                    result["degraded"] = ["routing"]
+                else:
+                    result["department"] = get_department(record["Chief_Complaint"])
+            except Exception as e:
+                print(f"[PARS] Stream routing error: {e}")
+        lines.append(encode_line(result))
+    return b"".join(lines)
+
+
 class SelfCheckInInput(BaseModel):
     name: str
     age: int
@@ -140,24 +454,241 @@ class SelfCheckInInput(BaseModel):
     symptoms: str
 
 @app.post("/self-check-in", response_model=TriageResponse)
-def self_check_in(data: SelfCheckInInput):
+def self_check_in(data: SelfCheckInInput, response: Response):
     """
     Simplified check-in for non-emergency cases. 
     Always returns LOW risk and determines department based on symptoms.
     """
-    # 1. Determine Department
-    dept = get_department(data.symptoms)
+    degraded = [tier for tier in overload.active_tiers() if tier in ("routing", "roster")]
+
+    # 1. Determine Department (routed once, reused for the referral)
+    routing = legacy_routing(data.symptoms) if "routing" in degraded else route_complaint(data.symptoms)
+    dept = routing["department"]
     
     # 2. Get Doctors/Referral Data
-    referral_data = get_referral(data.symptoms)
+    referral_data = get_referral(data.symptoms, routing=routing, cached_roster="roster" in degraded)
     
     # 3. Construct Response
-    return {
+    result = {
         "risk_score": 0.1,
         "risk_label": "LOW",
         "details": f"Self check-in completed. Based on '{data.symptoms}', we recommend visiting {dept.replace('_', ' ')}.",
         "referral": referral_data
     }
+    if degraded:
+        result["degraded"] = degraded
+
+    patient_id = str(uuid.uuid4())
+    triage_queue.admit(
+        patient_id,
+        result,
+        name=data.name,
+        department=referral_data.get("department"),
+        chief_complaint=data.symptoms,
+    )
+    result["queue_id"] = patient_id
+    triage_stats.record(result, department=referral_data.get("department"), source="self-check-in")
+
+    if persistence_queue:
+        persistence_queue.enqueue(*rows_from_check_in(data.dict(), result, patient_id))
+
+    _mark_degraded(response, result.get("degraded"))
+    return result
+
+class RescoreInput(BaseModel):
+    risk_score: float
+    risk_label: str
+    details: Optional[str] = None
+
+
+@app.get("/stats")
+def get_stats():
+    """Live counts per department and risk label, with rolling-window averages."""
+    return triage_stats.summary()
+
+
+# The triage queue is per-process: /queue and /queue/stream require a single
+# API worker (see triage_queue.py).
+if cpu_budget.status()["workers"] > 1:
+    print(f"[PARS] WARNING: {cpu_budget.status()['workers']} workers configured; the live triage queue "
+          "is per-process, so /queue and /queue/stream will only see each worker's own patients.")
+
+
+@app.get("/queue")
+def get_queue(limit: int = 100):
+    """Waiting patients in priority order (guardrail overrides, then risk). Single-worker only."""
+    seq, patients = triage_queue.snapshot(limit)
+    return {"seq": seq, "total": len(triage_queue), "patients": patients}
+
+
+@app.put("/queue/{patient_id}")
+def rescore_patient(patient_id: str, data: RescoreInput):
+    try:
+        return triage_queue.rescore(patient_id, data.dict())
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Patient not in queue")
+
+
+@app.delete("/queue/{patient_id}")
+def discharge_patient(patient_id: str):
+    try:
+        return triage_queue.discharge(patient_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Patient not in queue")
+
+
+@app.get("/queue/stream")
+async def stream_queue(request: Request):
+    """
+    Server-Sent Events: a `snapshot` event on connect, then one `upsert` or
+    `remove` event per change. Reconnects with Last-Event-ID resume from the
+    change log without a new snapshot when possible.
+    """
+    last_event_id = request.headers.get("last-event-id")
+    cursor = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+    return StreamingResponse(
+        _queue_events(request, cursor),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _queue_events(request: Request, cursor):
+    loop = asyncio.get_running_loop()
+    wake = asyncio.Event()
+    triage_queue.subscribe(loop, wake)
+    try:
+        while not await request.is_disconnected():
+            wake.clear()
+            events = None
+            if cursor is not None:
+                events, latest = triage_queue.events_since(cursor)
+            if events is None:
+                # First connect, or the client fell behind the change log
+                cursor, patients = triage_queue.snapshot()
+                yield format_sse(cursor, "snapshot", {"patients": patients})
+                continue
+
+            for seq, op, payload in events:
+                yield format_sse(seq, op, payload)
+            cursor = latest
+
+            if not events:
+                try:
+                    await asyncio.wait_for(wake.wait(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+    finally:
+        triage_queue.unsubscribe(loop, wake)
+
+
+def _sidecar_model_command(action: str, version: str = None) -> dict:
+    """Forwards a registry admin call to the sidecar, which owns the model in that mode."""
+    try:
+        reply = inference_client.model_command(action, version)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Inference sidecar unavailable: {e}")
+    if "error" in reply:
+        raise HTTPException(status_code=reply["code"], detail=reply["error"])
+    if action in ("activate", "rollback"):
+        # Activation finishes in the background; _set_model_version clears
+        # again when the first result from the new version arrives
+        predict_cache.clear()
+    return reply["status"]
+
+
+@app.get("/admin/models", dependencies=[Depends(require_admin)])
+def list_models():
+    if INFERENCE_SOCKET:
+        return _sidecar_model_command("status")
+    return {**model_registry.status(), "available": model_registry.available()}
+
+
+@app.post("/admin/models/{version}/activate", status_code=202, dependencies=[Depends(require_admin)])
+def activate_model(version: str):
+    """
+    Loads and warms `version` in the background, then swaps it in atomically:
+    on the sidecar in sidecar mode, and on every worker (via the shared
+    active-version file) when several workers run in-process.
+    """
+    if INFERENCE_SOCKET:
+        return _sidecar_model_command("activate", version)
+    try:
+        if MODEL_BROADCAST:
+            if model_registry.status()["loading"]:
+                raise RuntimeError("Another model version is already loading")
+            model_registry.publish(version, ACTIVE_FILE)
+            model_registry.converge(version)
+            return model_registry.status()
+        started = model_registry.load_async(version)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if not started:
+        raise HTTPException(status_code=409, detail="Another model version is already loading")
+    return model_registry.status()
+
+
+@app.post("/admin/models/rollback", dependencies=[Depends(require_admin)])
+def rollback_model():
+    if INFERENCE_SOCKET:
+        return _sidecar_model_command("rollback")
+    try:
+        if MODEL_BROADCAST:
+            previous = model_registry.status()["previous"]
+            if previous is None:
+                raise RuntimeError("No previous model version to roll back to")
+            model_registry.publish(previous, ACTIVE_FILE)
+            model_registry.converge(previous)
+        else:
+            model_registry.rollback()
+    except (RuntimeError, ValueError) as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return model_registry.status()
+
+
+@app.post("/admin/profile", dependencies=[Depends(require_admin)])
+def profile_process(seconds: float = 10.0, format: str = "collapsed", interval_ms: float = 5.0, by_endpoint: bool = True):
+    """
+    Samples every thread of this replica for `seconds` and returns the stacks as
+    collapsed text (format=collapsed), a speedscope file (format=speedscope) or
+    per-endpoint sample counts (format=summary).
+    """
+    if format not in ("collapsed", "speedscope", "summary"):
+        raise HTTPException(status_code=400, detail="format must be collapsed, speedscope or summary")
+    try:
+        session = profiler.profile(seconds, interval_ms=interval_ms, by_endpoint=by_endpoint)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    if format == "summary":
+        return summarize(session)
+    filename = f"pars-profile-{int(session['started_at'])}"
+    if format == "speedscope":
+        return Response(
+            content=json.dumps(to_speedscope(session)),
+            media_type="application/json",
+            headers={"Content-Disposition": f'attachment; filename="{filename}.speedscope.json"'},
+        )
+    return PlainTextResponse(
+        to_collapsed(session),
+        headers={"Content-Disposition": f'attachment; filename="{filename}.collapsed.txt"'},
+    )
+
+
+@app.get("/admin/profile/memory", dependencies=[Depends(require_admin)])
+def profile_memory(top: int = 25, group_by: str = "lineno"):
+    if group_by not in ("lineno", "filename", "traceback"):
+        raise HTTPException(status_code=400, detail="group_by must be lineno, filename or traceback")
+    return memory_stats(top=top, group_by=group_by)
+
+
+@app.post("/admin/profile/memory/tracing", dependencies=[Depends(require_admin)])
+def toggle_memory_tracing(enabled: bool = True, frames: int = 1):
+    """Starts/stops tracemalloc; top allocation sites are only reported while it runs."""
+    return {"tracemalloc": set_memory_tracing(enabled, frames)}
+
 
 @app.post("/parse-document")
 async def parse_document(file: UploadFile = File(...)):
@@ -166,20 +697,111 @@ async def parse_document(file: UploadFile = File(...)):
     """
     content = await file.read()
     
-    # Run the parser
-    extracted_data = extract_vitals_from_pdf(content)
+    # Run the parser (local regex only while Gemini extraction is being shed)
+    shed_llm = overload.degraded("parsing")
+    extracted_data = extract_vitals_from_pdf(content, use_llm=not shed_llm)
     
-    return {
+    result = {
         "status": "success",
         "filename": file.filename,
         "data": extracted_data
     }
+    if shed_llm:
+        result["degraded"] = ["parsing"]
+    return JSONResponse(result, headers={DEGRADED_HEADER: "parsing"} if shed_llm else None)
+
+
+
+
+@app.post("/parse-documents")
+async def parse_documents(files: List[UploadFile] = File(...)):
+    """
+    Accepts several PDFs and/or zip archives of PDFs (e.g. a transfer patient's
+    referral letters and lab reports), parses them in parallel and streams one
+    NDJSON line per document as it finishes, followed by a final line with the
+    merged PatientInput candidate, per-field provenance (by upload index, as
+    given on each file line) and the required fields no document reported.
+    """
+    if not DOC_PARSER_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Document parser not available")
+
+    if len(files) > MAX_BATCH_FILES:
+        raise HTTPException(status_code=413, detail=f"Too many documents ({len(files)}); the limit is {MAX_BATCH_FILES}")
+    # Uploads and decompressed zip members share one in-memory byte budget
+    budget = ByteBudget()
+    uploads = []
+    try:
+        for upload in files:
+            declared = getattr(upload, "size", None)
+            if declared is not None:
+                budget.check(declared)
+            content = await upload.read(budget.remaining + 1)
+            budget.charge(len(content))
+            uploads.append((upload.filename or "document.pdf", content))
+        batch = expand_uploads(uploads, budget)
+    except ValueError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    # Decided once per batch so every file line and the header agree
+    use_llm = not overload.degraded("parsing")
+    response = StreamingResponse(_parse_batch(batch, use_llm), media_type="application/x-ndjson")
+    _mark_degraded(response, None if use_llm else ["parsing"])
+    return response
+
+
+async def _parse_batch(batch: list, use_llm: bool):
+    semaphore = asyncio.Semaphore(PARSE_CONCURRENCY)
+
+    async def parse_one(index, doc):
+        if doc.error:
+            return index, doc, None, doc.error
+        async with semaphore:
+            try:
+                data = await run_in_threadpool(profiler.wrap(extract_vitals_from_pdf), doc.content, use_llm)
+            except Exception as e:
+                print(f"[PARS] Failed to parse {doc.filename}: {e}")
+                return index, doc, None, "Parsing failed"
+        if not isinstance(data, dict):
+            print(f"[PARS] Unexpected extraction result for {doc.filename}: {type(data).__name__}")
+            return index, doc, None, "Unexpected extraction result"
+        return index, doc, data, None
+
+    # Documents finish in any order and filenames may repeat; everything is keyed
+    # by upload index, which also orders the merge tie-breaks
+    parsed = []
+    for next_done in asyncio.as_completed([parse_one(i, doc) for i, doc in enumerate(batch)]):
+        index, doc, data, error = await next_done
+        if error:
+            yield encode_line({"type": "file", "index": index, "filename": doc.filename,
+                               "status": "error", "error": error})
+            continue
+        parsed.append((index, data))
+        line = {"type": "file", "index": index, "filename": doc.filename, "status": "success", "data": data}
+        if not use_llm:
+            line["degraded"] = ["parsing"]
+        yield encode_line(line)
+
+    merged = merge_extractions(parsed)
+    yield encode_line({
+        "type": "merged",
+        "documents": len(batch),
+        "parsed": len(parsed),
+        **merged,
+    })
+
+
+# Endpoint functions are known only after every route is declared
+profiler.register_endpoints(app.routes)
 
 
+@app.on_event("shutdown")
+def flush_persistence():
+    if persistence_queue:
+        persistence_queue.close()
+    triage_stats.close()
 
 
 if __name__ == "__main__":
     import uvicorn
-    import os
     port = int(os.getenv("PORT", "8000"))
     uvicorn.run(app, host="0.0.0.0", port=port)
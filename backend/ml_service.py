@@ -4,19 +4,105 @@ Loads the Keras triage model and preprocessor, applies hybrid guardrails.
 Place your trained model files in the same directory:
   - triage_model_nn.keras
   - preprocessor_nn.pkl
+  - triage_surrogate.json (optional, from distill.py; enables the fast path)
 """
 
+import json
+import os
+import threading
+
 import numpy as np
 import pandas as pd
 import joblib
 import tensorflow as tf
 
+SURROGATE_FILE = "triage_surrogate.json"
+
+# Serve from the distilled surrogate when its confidence interval sits inside
+# one of these bands (PARS_FAST_PATH=0 disables the fast path entirely)
+FAST_PATH_ENABLED = os.getenv("PARS_FAST_PATH", "1") != "0"
+FAST_PATH_LABELS = {l.strip().upper() for l in os.getenv("PARS_FAST_PATH_LABELS", "LOW").split(",") if l.strip()}
+
+# Raw request fields the surrogate reads directly (no preprocessor)
+SURROGATE_FEATURES = [
+    "Age", "Heart_Rate", "Systolic_BP", "Diastolic_BP", "O2_Saturation", "Temperature",
+    "Respiratory_Rate", "Pain_Score", "GCS_Score", "Diabetes", "Hypertension",
+    "Heart_Disease", "Gender_Male", "Arrival_Ambulance",
+]
+
+_SURROGATE_DEFAULTS = {
+    "Age": 40, "Heart_Rate": 80, "Systolic_BP": 120, "Diastolic_BP": 80, "O2_Saturation": 98,
+    "Temperature": 37, "Respiratory_Rate": 16, "Pain_Score": 0, "GCS_Score": 15,
+}
+
+
+def surrogate_features(data: dict) -> list:
+    features = [float(data.get(name, _SURROGATE_DEFAULTS[name])) for name in SURROGATE_FEATURES[:9]]
+    features += [1.0 if data.get(flag) else 0.0 for flag in ("Diabetes", "Hypertension", "Heart_Disease")]
+    features.append(1.0 if str(data.get("Gender", "")).lower() in ("male", "m") else 0.0)
+    features.append(1.0 if data.get("Arrival_Mode") == "Ambulance" else 0.0)
+    return features
+
+
+def risk_label_for(score: float) -> str:
+    if score >= 0.75:
+        return "HIGH"
+    if score >= 0.40:
+        return "MEDIUM"
+    return "LOW"
+
+
+class FastPathSurrogate:
+    """
+    Compact student model distilled from the network (see distill.py).
+    `band` is the measured fidelity half-width: the network's score is
+    expected to lie within score +/- band.
+    """
+
+    def __init__(self, spec: dict):
+        self.kind = spec["kind"]
+        self.band = float(spec["band"])
+        if self.kind == "linear":
+            self.intercept = float(spec["intercept"])
+            self.weights = [float(w) for w in spec["weights"]]
+        elif self.kind == "tree":
+            tree = spec["tree"]
+            self.left = tree["left"]
+            self.right = tree["right"]
+            self.feature = tree["feature"]
+            self.threshold = tree["threshold"]
+            self.value = tree["value"]
+        else:
+            raise ValueError(f"Unknown surrogate kind '{self.kind}'")
+
+    @classmethod
+    def from_file(cls, path: str):
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def score(self, data: dict) -> float:
+        x = surrogate_features(data)
+        if self.kind == "linear":
+            score = self.intercept + sum(w * v for w, v in zip(self.weights, x))
+        else:
+            node = 0
+            while self.left[node] != -1:
+                node = self.left[node] if x[self.feature[node]] <= self.threshold[node] else self.right[node]
+            score = self.value[node]
+        return min(max(score, 0.0), 1.0)
+
+    def confident_label(self, score: float):
+        """The risk band if score +/- band cannot cross a threshold, else None."""
+        low_label = risk_label_for(score - self.band)
+        if low_label == risk_label_for(score + self.band):
+            return low_label
+        return None
+
 
 class TriageModel:
     def __init__(self, model_path="triage_model_nn.keras", preprocessor_path="preprocessor_nn.pkl"):
         try:
             # Use os.path.dirname to make paths relative to this script
-            import os
             base_dir = os.path.dirname(os.path.abspath(__file__))
             
             # Construct absolute paths
@@ -30,11 +116,102 @@ class TriageModel:
             print(f"[PARS] Error loading model/preprocessor: {e}")
             raise e
 
+        # Optional distilled surrogate, stored next to the network it was distilled from
+        self.surrogate = None
+        surrogate_path = os.path.join(os.path.dirname(model_full_path), SURROGATE_FILE)
+        if FAST_PATH_ENABLED and os.path.exists(surrogate_path):
+            try:
+                self.surrogate = FastPathSurrogate.from_file(surrogate_path)
+                print(f"[PARS] Fast-path surrogate loaded ({self.surrogate.kind}, band ±{self.surrogate.band:.3f}).")
+            except Exception as e:
+                print(f"[PARS] WARNING: Could not load surrogate {surrogate_path}: {e}")
+
+        self._fast_path_lock = threading.Lock()
+        self._fast_path_hits = 0
+        self._fast_path_total = 0
+
     def predict(self, data: dict) -> dict:
         """
         Takes patient vitals dict, returns { risk_score, risk_label, details }.
         Applies hybrid guardrails before neural network inference.
         """
+        return self.predict_batch([data])[0]
+
+    def predict_batch(self, records: list) -> list:
+        """
+        Scores many patients with a single preprocessor/network call.
+        Guardrails are still evaluated per record; overridden records never
+        reach the network.
+        """
+        results = [None] * len(records)
+        pending = []
+
+        for i, data in enumerate(records):
+            critical_reasons = self.critical_reasons(data)
+            if critical_reasons:
+                results[i] = {
+                    "risk_score": 0.99,
+                    "risk_label": "HIGH",
+                    "details": "⚠️ Critical vitals detected (SAFETY OVERRIDE): " + ". ".join(critical_reasons) + ".",
+                }
+            else:
+                pending.append(i)
+
+        # --- Fast path: distilled surrogate, only when clearly inside one band ---
+        if self.surrogate is not None and pending:
+            remaining = []
+            for i in pending:
+                score = self.surrogate.score(records[i])
+                if self.surrogate.confident_label(score) in FAST_PATH_LABELS:
+                    results[i] = self.classify(records[i], score)
+                else:
+                    remaining.append(i)
+            with self._fast_path_lock:
+                self._fast_path_total += len(pending)
+                self._fast_path_hits += len(pending) - len(remaining)
+            pending = remaining
+
+        if not pending:
+            return results
+
+        # --- Neural Network Prediction ---
+        df = self.build_frame([records[i] for i in pending])
+
+        # Scale features
+        # Ensure columns are in the correct order as expected by the preprocessor if necessary
+        # The preprocessor (ColumnTransformer) usually handles columns by name, but let's be safe.
+        
+        try:
+             X = self.preprocessor.transform(df)
+        except Exception as e:
+             # Debugging: Print columns if transform fails
+             print(f"[PARS] Columns in DF: {df.columns.tolist()}")
+             raise e
+
+        # Predict
+        prediction = self.model.predict(X, verbose=0)
+
+        for row, i in enumerate(pending):
+            risk_score = float(prediction[row][0]) if prediction.shape[-1] == 1 else float(np.max(prediction[row]))
+            results[i] = self.classify(records[i], risk_score)
+
+        return results
+
+    def fast_path_stats(self) -> dict:
+        with self._fast_path_lock:
+            hits, total = self._fast_path_hits, self._fast_path_total
+        return {
+            "enabled": self.surrogate is not None,
+            "labels": sorted(FAST_PATH_LABELS),
+            "band": self.surrogate.band if self.surrogate else None,
+            "hits": hits,
+            "total": total,
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+        }
+
+    @staticmethod
+    def critical_reasons(data: dict) -> list:
+        """Rule-based safety override reasons (empty list if none apply)."""
         # --- Guardrails (Rule-based override) ---
         # Critical thresholds as per test.py logic
         hr = data.get("Heart_Rate", 80)
@@ -64,17 +241,13 @@ class TriageModel:
         if gcs <= 8:
             critical_reasons.append("Unconscious / Coma (GCS <= 8)")
 
-        if critical_reasons:
-            return {
-                "risk_score": 0.99,
-                "risk_label": "HIGH",
-                "details": "⚠️ Critical vitals detected (SAFETY OVERRIDE): " + ". ".join(critical_reasons) + ".",
-            }
+        return critical_reasons
 
-        # --- Neural Network Prediction ---
-        df = pd.DataFrame([data])
+    @staticmethod
+    def build_frame(records: list) -> pd.DataFrame:
+        """Builds the preprocessor input frame (training column names) for a list of patients."""
+        df = pd.DataFrame(records)
 
-        # Rename Temperature -> Temp if model expects it (Logic from test.py)
         # Rename Temperature -> Temp if model expects it (Logic from test.py)
         if "Temperature" in df.columns:
             df = df.rename(columns={"Temperature": "Temp"})
@@ -100,31 +273,19 @@ class TriageModel:
             if col in df.columns:
                 df[col] = df[col].astype(int)
 
-        # Scale features
-        # Ensure columns are in the correct order as expected by the preprocessor if necessary
-        # The preprocessor (ColumnTransformer) usually handles columns by name, but let's be safe.
-        
-        try:
-             X = self.preprocessor.transform(df)
-        except Exception as e:
-             # Debugging: Print columns if transform fails
-             print(f"[PARS] Columns in DF: {df.columns.tolist()}")
-             raise e
-
-        # Predict
-        prediction = self.model.predict(X, verbose=0)
-        risk_score = float(prediction[0][0]) if prediction.shape[-1] == 1 else float(np.max(prediction[0]))
+        return df
 
+    @staticmethod
+    def classify(data: dict, risk_score: float) -> dict:
+        """Maps a network risk score to a label and a vitals-based explanation."""
         # Classify
         # Classify based on new thresholds from test.py
-        if risk_score >= 0.75:
-            risk_label = "HIGH"
-        elif risk_score >= 0.40:
-            risk_label = "MEDIUM"
-        else:
-            risk_label = "LOW"
+        risk_label = risk_label_for(risk_score)
 
         # Generate explanation
+        hr = data.get("Heart_Rate", 80)
+        systolic = data.get("Systolic_BP", 120)
+        o2 = data.get("O2_Saturation", 98)
         details = []
         if hr > 100:
             details.append("Elevated heart rate")
@@ -0,0 +1,245 @@
+"""
+PARS - Model Registry
+Versioned TriageModel loading with zero-downtime hot-swap and rollback.
+
+Layout (PARS_MODEL_DIR, default backend/models):
+  models/<version>/triage_model_nn.keras
+  models/<version>/preprocessor_nn.pkl
+
+The files shipped next to ml_service.py are served as version "baseline".
+A new version is loaded and warmed up on a background thread, then swapped
+in with a single reference assignment. Requests that already picked up the
+old version finish on it; the old version is kept for instant rollback.
+
+A registry only swaps its own process. With several API workers, activation
+and rollback are broadcast through a shared active-version file
+(PARS_MODEL_ACTIVE_FILE, default models/ACTIVE): the worker that handles the
+admin call writes it, and every worker's follow() thread polls it and
+converges on the named version. In sidecar mode the sidecar owns the
+registry and the API forwards admin calls to it.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.path.abspath(os.getenv("PARS_MODEL_DIR", os.path.join(BASE_DIR, "models")))
+BASELINE_VERSION = "baseline"
+MODEL_FILE = "triage_model_nn.keras"
+PREPROCESSOR_FILE = "preprocessor_nn.pkl"
+ACTIVE_FILE = os.getenv("PARS_MODEL_ACTIVE_FILE", os.path.join(MODEL_DIR, "ACTIVE"))
+
+_VERSION_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{0,63}$")
+
+# One normal and one abnormal record; neither trips a guardrail, so both reach the network
+WARMUP_RECORDS = [
+    {
+        "Age": 40, "Gender": "Male", "Heart_Rate": 80, "Systolic_BP": 120, "Diastolic_BP": 80,
+        "O2_Saturation": 98.0, "Temperature": 37.0, "Respiratory_Rate": 16, "Pain_Score": 0,
+        "GCS_Score": 15, "Arrival_Mode": "Walk-in", "Diabetes": False, "Hypertension": False,
+        "Heart_Disease": False, "Chief_Complaint": None,
+    },
+    {
+        "Age": 72, "Gender": "Female", "Heart_Rate": 118, "Systolic_BP": 95, "Diastolic_BP": 60,
+        "O2_Saturation": 91.0, "Temperature": 38.9, "Respiratory_Rate": 26, "Pain_Score": 7,
+        "GCS_Score": 13, "Arrival_Mode": "Ambulance", "Diabetes": True, "Hypertension": True,
+        "Heart_Disease": True, "Chief_Complaint": None,
+    },
+]
+
+ModelVersion = namedtuple("ModelVersion", ["version", "model", "loaded_at"])
+
+
+class ModelRegistry:
+    def __init__(self, loader=None, model_dir=MODEL_DIR):
+        """
+        loader(model_path, preprocessor_path) builds a TriageModel. Without a
+        loader (e.g. inference sidecar mode) only install() is supported.
+        """
+        self.loader = loader
+        self.model_dir = model_dir
+        self._lock = threading.Lock()
+        self._active = None
+        self._previous = None
+        self._loading = None
+        self._last_error = None
+        self._listeners = []
+        self._follow_path = None
+        self._followed_mtime = None
+
+    # ------------------- lookup -------------------
+
+    def active(self):
+        """The ModelVersion to use for one request (read once, then keep using it)."""
+        return self._active
+
+    def paths(self, version: str):
+        if version == BASELINE_VERSION:
+            return MODEL_FILE, PREPROCESSOR_FILE
+        if not _VERSION_PATTERN.match(version):
+            raise ValueError(f"Invalid model version '{version}'")
+        version_dir = os.path.join(self.model_dir, version)
+        return os.path.join(version_dir, MODEL_FILE), os.path.join(version_dir, PREPROCESSOR_FILE)
+
+    def available(self) -> list:
+        versions = [BASELINE_VERSION]
+        if os.path.isdir(self.model_dir):
+            for name in sorted(os.listdir(self.model_dir)):
+                version_dir = os.path.join(self.model_dir, name)
+                if (_VERSION_PATTERN.match(name)
+                        and os.path.isfile(os.path.join(version_dir, MODEL_FILE))
+                        and os.path.isfile(os.path.join(version_dir, PREPROCESSOR_FILE))):
+                    versions.append(name)
+        return versions
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "active": self._active.version if self._active else None,
+                "previous": self._previous.version if self._previous else None,
+                "loading": self._loading,
+                "last_error": self._last_error,
+                "hot_swap": self.loader is not None,
+                "shared_active_file": self._follow_path,
+            }
+
+    # ------------------- lifecycle -------------------
+
+    def on_swap(self, callback):
+        """callback(version) runs after every swap or rollback."""
+        self._listeners.append(callback)
+
+    def _set_active(self, entry):
+        with self._lock:
+            self._previous = self._active
+            self._active = entry
+        for callback in self._listeners:
+            callback(entry.version)
+
+    def install(self, version: str, model):
+        self._set_active(ModelVersion(version, model, time.time()))
+
+    def _build(self, version: str):
+        model_path, preprocessor_path = self.paths(version)
+        model = self.loader(model_path, preprocessor_path)
+        # Warm-up: first calls trace the graph and allocate buffers
+        model.predict_batch(WARMUP_RECORDS)
+        model.predict(WARMUP_RECORDS[0])
+        return ModelVersion(version, model, time.time())
+
+    def load(self, version: str):
+        """Loads, warms and swaps in `version` synchronously."""
+        if self.loader is None:
+            raise RuntimeError("Hot-swap is not available in this mode")
+        self._set_active(self._build(version))
+        print(f"[PARS] Model version '{version}' is now active.")
+
+    def load_async(self, version: str) -> bool:
+        """Starts a background load; False if another load is already running."""
+        if self.loader is None:
+            raise RuntimeError("Hot-swap is not available in this mode")
+        if version not in self.available():
+            raise ValueError(f"Unknown model version '{version}'")
+
+        with self._lock:
+            if self._loading:
+                return False
+            self._loading = version
+            self._last_error = None
+
+        def run():
+            try:
+                self.load(version)
+            except Exception as e:
+                print(f"[PARS] Failed to load model version '{version}': {e}")
+                with self._lock:
+                    self._last_error = f"{version}: {e}"
+            finally:
+                with self._lock:
+                    self._loading = None
+
+        threading.Thread(target=run, name=f"pars-model-load-{version}", daemon=True).start()
+        return True
+
+    def rollback(self) -> str:
+        with self._lock:
+            if self._previous is None:
+                raise RuntimeError("No previous model version to roll back to")
+            self._active, self._previous = self._previous, self._active
+            version = self._active.version
+        for callback in self._listeners:
+            callback(version)
+        print(f"[PARS] Rolled back to model version '{version}'.")
+        return version
+
+    # ------------------- multi-worker broadcast -------------------
+
+    def publish(self, version: str, path=ACTIVE_FILE):
+        """Records `version` as the one every worker should serve (atomic write)."""
+        if version not in self.available():
+            raise ValueError(f"Unknown model version '{version}'")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"version": version, "published_at": time.time()}, f)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def published(path=ACTIVE_FILE):
+        try:
+            with open(path) as f:
+                return json.load(f).get("version")
+        except (OSError, ValueError):
+            return None
+
+    def converge(self, version: str):
+        """Makes `version` active here: instant rollback if it is the previous one, else a background load."""
+        with self._lock:
+            active = self._active.version if self._active else None
+            previous = self._previous.version if self._previous else None
+        if version == active:
+            return
+        if version == previous:
+            self.rollback()
+        else:
+            self.load_async(version)
+
+    def follow(self, path=ACTIVE_FILE, interval=2.0):
+        """Polls the shared active-version file and converges on every change."""
+        if self._follow_path is not None:
+            return
+        self._follow_path = path
+
+        def check():
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                return
+            if mtime == self._followed_mtime:
+                return
+            version = self.published(path)
+            if version is None:
+                return
+            try:
+                self.converge(version)
+            except (RuntimeError, ValueError) as e:
+                print(f"[PARS] Could not switch to published model version '{version}': {e}")
+                with self._lock:
+                    self._last_error = f"{version}: {e}"
+            # A failed or refused switch is retried only when the file changes again,
+            # except when another load was still running
+            with self._lock:
+                if self._loading is None or self._loading == version:
+                    self._followed_mtime = mtime
+
+        def run():
+            while True:
+                time.sleep(interval)
+                check()
+
+        check()
+        threading.Thread(target=run, name="pars-model-follow", daemon=True).start()
@@ -0,0 +1,433 @@
+"""
+PARS - Write-Behind Persistence
+Buffers triage decisions from /predict and /self-check-in and writes them to
+the `patients` and `patient_assignments` tables in bulk, off the request path.
+
+Select a sink with PARS_PERSIST_BACKEND:
+  none      (default) nothing is written by the backend
+  memory    in-process lists, for tests (see verify_persistence.py)
+  sqlite    local file (PARS_PERSIST_SQLITE_PATH), for tests and offline sites
+  supabase  bulk upserts through the Supabase client; needs a key that may
+            write these tables (SUPABASE_SERVICE_ROLE_KEY) because the rows are
+            not owned by a logged-in user, and PARS_PERSIST_USER_ID set to a
+            real auth.users id (patients.user_id is a foreign key)
+
+Rows carry ids generated here, so a retried flush upserts instead of
+duplicating. Failures are classified (classify_error):
+  transient  connection errors, timeouts, database unavailable: the whole
+             batch is retried with backoff and never dropped
+  row        constraint / data errors: the batch is split in half and
+             retried, so one bad row cannot hold back the rest; a single row
+             that still fails after PARS_PERSIST_MAX_ATTEMPTS tries is
+             dead-lettered to PARS_PERSIST_DEAD_LETTER_PATH (JSON lines) or,
+             without a path, logged and dropped
+  unknown    retried whole like a transient error, but only
+             PARS_PERSIST_MAX_ATTEMPTS times before being treated as a row error
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+
+# Same placeholder the kiosk uses when no staff user is logged in
+ANONYMOUS_USER_ID = "00000000-0000-0000-0000-000000000000"
+
+# Stable vitals recorded for self check-in (mirrors PatientIntake.tsx)
+SELF_CHECK_IN_VITALS = {
+    "heart_rate": 75,
+    "systolic_bp": 120,
+    "diastolic_bp": 80,
+    "o2_saturation": 98,
+    "temperature": 37,
+    "respiratory_rate": 16,
+    "pain_score": 0,
+    "gcs_score": 15,
+    "arrival_mode": "Walk-in",
+}
+
+
+# ============================================================
+# ------------------- ROW BUILDERS ---------------------------
+# ============================================================
+
+def _assignment_row(patient_row: dict, referral: dict) -> dict:
+    referral = referral or {}
+    available = [d.get("name") for d in referral.get("doctors", []) if d.get("available") and d.get("name")]
+    return {
+        "id": str(uuid.uuid4()),
+        "patient_id": patient_row["id"],
+        "patient_name": patient_row["name"],
+        "department": referral.get("department") or "General Medicine",
+        "doctor_name": available[0] if available else "Assigned via Triage",
+    }
+
+
+def rows_from_predict(payload: dict, result: dict, patient_id=None):
+    """(patient_row, assignment_row) for a /predict request and its response."""
+    referral = result.get("referral") or {}
+    patient_row = {
+        "id": patient_id or str(uuid.uuid4()),
+        "user_id": PERSIST_USER_ID,
+        "name": "Unknown",
+        "age": payload["Age"],
+        "gender": payload["Gender"],
+        "heart_rate": payload["Heart_Rate"],
+        "systolic_bp": payload["Systolic_BP"],
+        "diastolic_bp": payload["Diastolic_BP"],
+        "o2_saturation": payload["O2_Saturation"],
+        "temperature": payload["Temperature"],
+        "respiratory_rate": payload["Respiratory_Rate"],
+        "pain_score": payload.get("Pain_Score", 0),
+        "gcs_score": payload.get("GCS_Score", 15),
+        "arrival_mode": payload.get("Arrival_Mode", "Walk-in"),
+        "diabetes": bool(payload.get("Diabetes")),
+        "hypertension": bool(payload.get("Hypertension")),
+        "heart_disease": bool(payload.get("Heart_Disease")),
+        "risk_score": result["risk_score"],
+        "risk_label": result["risk_label"],
+        "explanation": result["details"],
+        "department": referral.get("department"),
+        "chief_complaint": payload.get("Chief_Complaint"),
+    }
+    return patient_row, _assignment_row(patient_row, referral)
+
+
+def rows_from_check_in(data: dict, result: dict, patient_id=None):
+    """(patient_row, assignment_row) for a /self-check-in request and its response."""
+    referral = result.get("referral") or {}
+    patient_row = {
+        "id": patient_id or str(uuid.uuid4()),
+        "user_id": PERSIST_USER_ID,
+        "name": data["name"],
+        "age": data["age"],
+        "gender": data["gender"],
+        **SELF_CHECK_IN_VITALS,
+        "diabetes": False,
+        "hypertension": False,
+        "heart_disease": False,
+        "risk_score": result["risk_score"],
+        "risk_label": result["risk_label"],
+        "explanation": result["details"],
+        "department": referral.get("department"),
+        "chief_complaint": data["symptoms"],
+    }
+    return patient_row, _assignment_row(patient_row, referral)
+
+
+# ============================================================
+# ------------------- SINKS ----------------------------------
+# ============================================================
+
+class MemorySink:
+    """
+    In-process stand-in for the database. Like the real schema, a batch is
+    all-or-nothing: `valid_user_ids` (if given) plays the patients.user_id
+    foreign key, and fail_next() simulates an outage for the next N writes.
+    """
+
+    def __init__(self, valid_user_ids=None):
+        self.patients = []
+        self.assignments = []
+        self.writes = 0
+        self.failed_writes = 0
+        self.valid_user_ids = set(valid_user_ids) if valid_user_ids is not None else None
+        self._fail_next = 0
+
+    def fail_next(self, count=1):
+        self._fail_next += count
+
+    def write(self, patients: list, assignments: list):
+        if self._fail_next:
+            self._fail_next -= 1
+            self.failed_writes += 1
+            raise ConnectionError("simulated sink outage")
+        if self.valid_user_ids is not None:
+            bad = [p["id"] for p in patients if p.get("user_id") not in self.valid_user_ids]
+            if bad:
+                self.failed_writes += 1
+                raise ValueError(f"patients.user_id foreign key violation for {bad}")
+        self.patients.extend(patients)
+        self.assignments.extend(assignments)
+        self.writes += 1
+
+
+class SQLiteSink:
+    PATIENT_COLUMNS = [
+        "id", "user_id", "name", "age", "gender", "heart_rate", "systolic_bp",
+        "diastolic_bp", "o2_saturation", "temperature", "respiratory_rate",
+        "pain_score", "gcs_score", "arrival_mode", "diabetes", "hypertension",
+        "heart_disease", "risk_score", "risk_label", "explanation", "department",
+        "chief_complaint",
+    ]
+    ASSIGNMENT_COLUMNS = ["id", "patient_id", "patient_name", "department", "doctor_name"]
+
+    def __init__(self, path=":memory:"):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS patients ("
+                + ", ".join(f"{c} TEXT PRIMARY KEY" if c == "id" else c for c in self.PATIENT_COLUMNS)
+                + ", created_at TEXT DEFAULT CURRENT_TIMESTAMP)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS patient_assignments ("
+                + ", ".join(f"{c} TEXT PRIMARY KEY" if c == "id" else c for c in self.ASSIGNMENT_COLUMNS)
+                + ", assigned_at TEXT DEFAULT CURRENT_TIMESTAMP)"
+            )
+
+    @staticmethod
+    def _upsert_sql(table, columns):
+        return (
+            f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' for _ in columns)})"
+        )
+
+    def write(self, patients: list, assignments: list):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                self._upsert_sql("patients", self.PATIENT_COLUMNS),
+                [[row.get(c) for c in self.PATIENT_COLUMNS] for row in patients],
+            )
+            self._conn.executemany(
+                self._upsert_sql("patient_assignments", self.ASSIGNMENT_COLUMNS),
+                [[row.get(c) for c in self.ASSIGNMENT_COLUMNS] for row in assignments],
+            )
+
+    def count(self, table: str) -> int:
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+class SupabaseSink:
+    def __init__(self, client):
+        self.client = client
+
+    def write(self, patients: list, assignments: list):
+        # Patients first so the assignment foreign keys resolve
+        if patients:
+            self.client.table("patients").upsert(patients).execute()
+        if assignments:
+            self.client.table("patient_assignments").upsert(assignments).execute()
+
+
+# ============================================================
+# ------------------- ERROR CLASSIFICATION -------------------
+# ============================================================
+
+# Postgres SQLSTATE classes: connection, resources, operator intervention,
+# transaction rollback (serialization / deadlock) are worth retrying as-is
+TRANSIENT_SQLSTATE_CLASSES = ("08", "40", "53", "57")
+
+
+def classify_error(error) -> str:
+    """"transient", "row" or "unknown" for an exception raised by a sink write."""
+    if isinstance(error, sqlite3.IntegrityError):
+        return "row"
+    if isinstance(error, (OSError, TimeoutError, sqlite3.OperationalError)):
+        return "transient"  # OSError covers ConnectionError and socket errors
+    httpx = sys.modules.get("httpx")  # supabase's transport, if loaded
+    if httpx is not None and isinstance(error, httpx.TransportError):
+        return "transient"
+    code = getattr(error, "code", None)  # postgrest APIError carries the SQLSTATE / HTTP code
+    if isinstance(code, str) and code:
+        if code.startswith(TRANSIENT_SQLSTATE_CLASSES) or (code.isdigit() and code.startswith("5")):
+            return "transient"
+        return "row"
+    if isinstance(error, (ValueError, TypeError, KeyError, sqlite3.DatabaseError)):
+        return "row"
+    return "unknown"
+
+
+# ============================================================
+# ------------------- WRITE-BEHIND QUEUE ---------------------
+# ============================================================
+
+class WriteBehindQueue:
+    """
+    Bounded buffer flushed by a background thread when `batch_size` records
+    are waiting or `flush_interval` seconds have passed. Failed batches go to
+    the head of a retry queue (with exponential backoff): whole on transient
+    errors, split in half on row-level errors, so a poison row ends up alone
+    while the rows around it are written. A single row that has failed
+    `max_attempts` times with a row-level error is dead-lettered (or logged
+    and dropped). When the buffer is full the oldest records are dropped
+    and counted.
+    """
+
+    def __init__(self, sink, batch_size=50, flush_interval=2.0, max_buffer=10000, max_backoff=30.0,
+                 max_attempts=5, dead_letter_path=None):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+        self.dead_letter_path = dead_letter_path
+        self._buffer = deque()
+        self._retry = deque()  # (batch, attempts), written before new records
+        self._cond = threading.Condition()
+        self._closed = False
+        self._failures_in_row = 0
+        self._stats = {"enqueued": 0, "flushed": 0, "flushes": 0, "failures": 0, "dropped": 0,
+                       "dead_lettered": 0}
+        self._thread = threading.Thread(target=self._run, name="pars-write-behind", daemon=True)
+        self._thread.start()
+
+    def enqueue(self, patient_row: dict, assignment_row: dict):
+        """Never blocks on the database; only appends to the buffer."""
+        with self._cond:
+            self._buffer.append((patient_row, assignment_row))
+            self._stats["enqueued"] += 1
+            self._trim()
+            if len(self._buffer) >= self.batch_size:
+                self._cond.notify()
+
+    def _trim(self):
+        while len(self._buffer) > self.max_buffer:
+            self._buffer.popleft()
+            self._stats["dropped"] += 1
+
+    def _take_batch(self):
+        if self._retry:
+            return self._retry.popleft()
+        batch = []
+        while self._buffer and len(batch) < self.batch_size:
+            batch.append(self._buffer.popleft())
+        return batch, 0
+
+    def _write(self, batch, attempts=0) -> bool:
+        try:
+            self.sink.write([p for p, _ in batch], [a for _, a in batch])
+        except Exception as e:
+            kind = classify_error(e)
+            print(f"[PARS] Persistence flush of {len(batch)} records failed "
+                  f"({kind}, attempt {attempts + 1}): {type(e).__name__}: {e}")
+            self._failures_in_row += 1
+            attempts += 1
+            with self._cond:
+                self._stats["failures"] += 1
+                if kind == "transient" or (kind == "unknown" and attempts < self.max_attempts):
+                    # Outage, not bad data: retry the whole batch, never drop it
+                    self._retry.appendleft((batch, attempts))
+                elif len(batch) > 1:
+                    # Halves start their own attempt count; only single rows are capped
+                    middle = len(batch) // 2
+                    self._retry.appendleft((batch[middle:], 0))
+                    self._retry.appendleft((batch[:middle], 0))
+                elif attempts < self.max_attempts:
+                    self._retry.appendleft((batch, attempts))
+                else:
+                    self._dead_letter(batch[0], e)
+            return False
+
+        self._failures_in_row = 0
+        with self._cond:
+            self._stats["flushed"] += len(batch)
+            self._stats["flushes"] += 1
+        return True
+
+    def _dead_letter(self, record, error):
+        # Called with the condition held
+        patient_row, assignment_row = record
+        self._stats["dead_lettered"] += 1
+        if self.dead_letter_path:
+            try:
+                with open(self.dead_letter_path, "a") as f:
+                    f.write(json.dumps({"error": str(error), "patient": patient_row,
+                                        "assignment": assignment_row}, default=str) + "\n")
+                print(f"[PARS] Dead-lettered patient {patient_row.get('id')} to {self.dead_letter_path}")
+                return
+            except OSError as e:
+                print(f"[PARS] Could not write dead letter: {e}")
+        print(f"[PARS] Dropping patient {patient_row.get('id')} after {self.max_attempts} failed writes: {error}")
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._closed and not self._retry and len(self._buffer) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+                if self._closed and not self._buffer and not self._retry:
+                    return
+                batch, attempts = self._take_batch()
+
+            if batch and not self._write(batch, attempts):
+                if self._closed:
+                    return
+                time.sleep(min(self.max_backoff, 0.5 * 2 ** (self._failures_in_row - 1)))
+
+    def flush(self, timeout=10.0):
+        """Synchronously drains the buffer (used on shutdown and in tests)."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._cond:
+                batch, attempts = self._take_batch()
+            if not batch:
+                return True
+            if not self._write(batch, attempts):
+                backoff = min(self.max_backoff, 0.5 * 2 ** (self._failures_in_row - 1))
+                time.sleep(max(0.0, min(backoff, deadline - time.monotonic())))
+        return False
+
+    def close(self, timeout=10.0):
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        with self._cond:
+            stats = dict(self._stats)
+            stats["buffered"] = len(self._buffer) + sum(len(batch) for batch, _ in self._retry)
+        return stats
+
+
+PERSIST_BACKEND = os.getenv("PARS_PERSIST_BACKEND", "none").lower()
+PERSIST_USER_ID = os.getenv("PARS_PERSIST_USER_ID", ANONYMOUS_USER_ID)
+PERSIST_DEAD_LETTER_PATH = os.getenv("PARS_PERSIST_DEAD_LETTER_PATH")
+
+
+def create_persistence_queue():
+    """Builds the queue selected by PARS_PERSIST_BACKEND, or None when disabled."""
+    if PERSIST_BACKEND in ("", "none"):
+        return None
+
+    if PERSIST_BACKEND == "memory":
+        sink = MemorySink()
+    elif PERSIST_BACKEND == "sqlite":
+        sink = SQLiteSink(os.getenv("PARS_PERSIST_SQLITE_PATH", "pars_triage.db"))
+    elif PERSIST_BACKEND == "supabase":
+        if PERSIST_USER_ID == ANONYMOUS_USER_ID:
+            # The placeholder is not in auth.users, so every row would violate the FK
+            print("[PARS] WARNING: PARS_PERSIST_USER_ID must be a real auth.users id for supabase "
+                  "persistence; persistence disabled.")
+            return None
+        from supabase import create_client
+        url = os.getenv("SUPABASE_URL")
+        key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+        if not url:
+            # dept_service already resolves the project URL from .env
+            from dept_service import SUPABASE_URL as url
+        if not key:
+            print("[PARS] WARNING: SUPABASE_SERVICE_ROLE_KEY not set; inserts may be rejected by RLS.")
+            from dept_service import SUPABASE_KEY as key
+        sink = SupabaseSink(create_client(url, key))
+    else:
+        print(f"[PARS] WARNING: Unknown PARS_PERSIST_BACKEND '{PERSIST_BACKEND}', persistence disabled.")
+        return None
+
+    print(f"[PARS] Write-behind persistence enabled ({PERSIST_BACKEND}).")
+    return WriteBehindQueue(
+        sink,
+        batch_size=int(os.getenv("PARS_PERSIST_BATCH_SIZE", "50")),
+        flush_interval=float(os.getenv("PARS_PERSIST_FLUSH_SECONDS", "2")),
+        max_buffer=int(os.getenv("PARS_PERSIST_MAX_BUFFER", "10000")),
+        max_attempts=int(os.getenv("PARS_PERSIST_MAX_ATTEMPTS", "5")),
+        dead_letter_path=PERSIST_DEAD_LETTER_PATH,
+    )
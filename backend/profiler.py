@@ -0,0 +1,277 @@
+"""
+PARS - Live Profiling
+Low-overhead sampling profiler and memory statistics for a running replica.
+
+The sampler runs on the requesting thread and reads every other thread's
+current stack via sys._current_frames() at a fixed interval; nothing is
+installed into the interpreter, so the cost is one stack walk per thread per
+tick and nothing at all outside a session. Output is either collapsed stacks (one
+"frame;frame;frame count" line per stack, for flamegraph.pl / speedscope) or
+a speedscope JSON document.
+
+Samples can be tagged with the API endpoint that is running on the sampled
+thread. The tag is found from the stack itself (the endpoint function's code
+object), which works both for sync endpoints on the threadpool and for async
+endpoints on the event loop. Work handed off to other threads (the /predict
+stage pool, run_in_threadpool calls) has no endpoint frame on its stack, so
+those callables are wrapped with profiler.wrap(): it carries the request's
+endpoint and trace id (a contextvar set by the tracing middleware) to the
+worker thread, and samples of that thread are tagged from a thread ident ->
+request map while the call runs.
+"""
+
+import contextvars
+import gc
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+
+PROFILE_MAX_SECONDS = float(os.getenv("PARS_PROFILE_MAX_SECONDS", "60"))
+PROFILE_INTERVAL_MS = float(os.getenv("PARS_PROFILE_INTERVAL_MS", "5"))
+TRACE_HEADER = "X-PARS-Trace"
+MAX_TRACES = 1000
+
+# (endpoint label, trace id or None) of the request running in this context
+_request_tag = contextvars.ContextVar("pars_request_tag", default=None)
+
+
+def set_request_tag(endpoint: str, trace_id=None):
+    return _request_tag.set((endpoint, trace_id))
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._session = None
+        self._endpoints = {}  # code object -> "METHOD /path"
+        self._thread_tags = {}  # thread ident -> (endpoint, trace id), while running wrapped work
+
+    def register_endpoints(self, routes):
+        """Maps endpoint functions to route labels so samples can be tagged."""
+        for route in routes:
+            endpoint = getattr(route, "endpoint", None)
+            code = getattr(endpoint, "__code__", None)
+            if code is not None:
+                methods = ",".join(sorted(getattr(route, "methods", None) or [])) or "WS"
+                self._endpoints[code] = f"{methods} {route.path}"
+
+    def wrap(self, fn):
+        """
+        Binds fn to the calling request, so samples taken while it runs on a
+        pool thread are attributed to that request's endpoint and trace.
+        """
+        tag = _request_tag.get()
+        if tag is None:
+            return fn
+
+        def run(*args, **kwargs):
+            ident = threading.get_ident()
+            self._thread_tags[ident] = tag
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._thread_tags.pop(ident, None)
+
+        return run
+
+    @property
+    def active(self) -> bool:
+        return self._session is not None
+
+    def profile(self, seconds: float, interval_ms: float = PROFILE_INTERVAL_MS, by_endpoint: bool = True) -> dict:
+        """
+        Samples all threads for `seconds` (blocking the caller) and returns the
+        aggregated session. Only one session runs at a time.
+        """
+        seconds = min(max(seconds, 0.1), PROFILE_MAX_SECONDS)
+        interval = max(interval_ms, 1.0) / 1000.0
+
+        with self._lock:
+            if self._session is not None:
+                raise RuntimeError("A profiling session is already running")
+            session = {
+                "stacks": Counter(),
+                "samples": 0,
+                "traces": [],
+                "trace_samples": Counter(),
+                "started_at": time.time(),
+                "interval_ms": interval * 1000.0,
+            }
+            self._session = session
+
+        own = threading.get_ident()
+        deadline = time.monotonic() + seconds
+        try:
+            while time.monotonic() < deadline:
+                tick = time.monotonic()
+                self._sample(session, own, by_endpoint)
+                time.sleep(max(0.0, interval - (time.monotonic() - tick)))
+        finally:
+            with self._lock:
+                self._session = None
+
+        session["duration_s"] = round(time.time() - session["started_at"], 3)
+        return session
+
+    def _sample(self, session: dict, own: int, by_endpoint: bool):
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = []
+            endpoint = None
+            while frame is not None:
+                code = frame.f_code
+                if by_endpoint and endpoint is None:
+                    endpoint = self._endpoints.get(code)
+                stack.append(_frame_label(code))
+                frame = frame.f_back
+            stack.reverse()
+
+            tag = self._thread_tags.get(ident)
+            if tag is not None:
+                if by_endpoint and endpoint is None:
+                    endpoint = tag[0]
+                if tag[1]:
+                    session["trace_samples"][tag[1]] += 1
+
+            root = f"[{endpoint}]" if endpoint else f"[thread {names.get(ident, ident)}]"
+            session["stacks"][(root, *stack)] += 1
+        session["samples"] += 1
+
+    def record_trace(self, trace_id: str, method: str, path: str, status: int, duration_ms: float):
+        """Called by the tracing middleware; kept only while a session is running."""
+        session = self._session
+        if session is not None and len(session["traces"]) < MAX_TRACES:
+            session["traces"].append({
+                "trace_id": trace_id,
+                "endpoint": f"{method} {path}",
+                "status": status,
+                "duration_ms": round(duration_ms, 3),
+                "offloaded_samples": session["trace_samples"].get(trace_id, 0),
+            })
+
+
+def to_collapsed(session: dict) -> str:
+    lines = [f"{';'.join(frame.replace(';', ':') for frame in stack)} {count}"
+             for stack, count in session["stacks"].most_common()]
+    return "\n".join(lines) + "\n"
+
+
+def to_speedscope(session: dict, name: str = "PARS live profile") -> dict:
+    """Sampled profile in the speedscope file format (https://www.speedscope.app)."""
+    frame_index = {}
+    frames = []
+    samples = []
+    weights = []
+    for stack, count in session["stacks"].items():
+        indices = []
+        for label in stack:
+            if label not in frame_index:
+                frame_index[label] = len(frames)
+                frames.append({"name": label})
+            indices.append(frame_index[label])
+        samples.append(indices)
+        weights.append(count * session["interval_ms"])
+
+    total = sum(weights)
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "pars-profiler",
+        "activeProfileIndex": 0,
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled",
+            "name": name,
+            "unit": "milliseconds",
+            "startValue": 0,
+            "endValue": total,
+            "samples": samples,
+            "weights": weights,
+        }],
+        "traces": session["traces"],
+    }
+
+
+def summarize(session: dict) -> dict:
+    by_root = Counter()
+    for stack, count in session["stacks"].items():
+        by_root[stack[0]] += count
+    return {
+        "samples": session["samples"],
+        "duration_s": session.get("duration_s"),
+        "interval_ms": session["interval_ms"],
+        "by_endpoint": dict(by_root.most_common()),
+        "traces": session["traces"],
+    }
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+# ==========================================
+# MEMORY
+# ==========================================
+
+def _rss_kb():
+    try:
+        with open("/proc/self/status") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+        return {
+            "rss_kb": int(fields["VmRSS"].split()[0]),
+            "peak_rss_kb": int(fields["VmHWM"].split()[0]),
+        }
+    except (OSError, KeyError, ValueError):
+        import resource
+        return {"rss_kb": None, "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+
+
+def set_memory_tracing(enabled: bool, frames: int = 1) -> bool:
+    """tracemalloc costs noticeably on every allocation, so it is off until asked for."""
+    if enabled and not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+    elif not enabled and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    return tracemalloc.is_tracing()
+
+
+def memory_stats(top: int = 25, group_by: str = "lineno") -> dict:
+    stats = {
+        **_rss_kb(),
+        "gc_counts": gc.get_count(),
+        "gc_objects": len(gc.get_objects()),
+        "threads": threading.active_count(),
+        "tracemalloc": tracemalloc.is_tracing(),
+    }
+    if not tracemalloc.is_tracing():
+        return stats
+
+    current, peak = tracemalloc.get_traced_memory()
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+    stats["traced_current_kb"] = current // 1024
+    stats["traced_peak_kb"] = peak // 1024
+    stats["top"] = [
+        {
+            "location": str(stat.traceback),
+            "size_kb": round(stat.size / 1024, 1),
+            "count": stat.count,
+        }
+        for stat in snapshot.statistics(group_by)[:top]
+    ]
+    return stats
+
+
+profiler = SamplingProfiler()
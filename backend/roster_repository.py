@@ -0,0 +1,224 @@
+"""
+PARS - Doctor Roster Repositories
+Pluggable sources for the per-department doctor tables used by get_referral.
+
+Select with PARS_ROSTER_BACKEND:
+  supabase  (default) Supabase REST client, one request per department
+  sql       SQLAlchemy engine with a connection pool (PARS_ROSTER_DB_URL),
+            all twelve departments in a single UNION ALL round trip
+  sqlite    local file (PARS_ROSTER_SQLITE_PATH) seeded from the
+            departments migration, for tests and offline sites
+"""
+
+import os
+import re
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SEED_MIGRATION = os.path.join(
+    os.path.dirname(BASE_DIR), "supabase", "migrations", "20260214200000_add_departments_and_seed.sql"
+)
+
+# Table names are interpolated into SQL, so only these are ever accepted
+DEPARTMENT_TABLES = [
+    "cardiology", "neurology", "gastroenterology", "pulmonology", "orthopedics",
+    "emergency_trauma", "general_medicine", "dermatology", "ent",
+    "urology_nephrology", "psychiatry", "toxicology",
+]
+
+
+def _table_name(department: str) -> str:
+    table = department.lower()
+    if table not in DEPARTMENT_TABLES:
+        raise ValueError(f"Unknown department '{department}'")
+    return table
+
+
+def _doctor(row) -> dict:
+    return {
+        "name": row["doc_name"],
+        "experience": row["experience_years"],
+        "available": bool(row["is_available"]) if row["is_available"] is not None else None,
+    }
+
+
+class SupabaseRosterRepository:
+    def __init__(self, client_factory):
+        self._client_factory = client_factory
+        self._client = None
+
+    def _get_client(self):
+        if self._client is None:
+            self._client = self._client_factory()
+        return self._client
+
+    def get_doctors(self, department: str) -> list:
+        client = self._get_client()
+        if not client:
+            return []
+        response = client.table(_table_name(department)).select("*").execute()
+        return [_doctor(doc) for doc in response.data]
+
+    def get_all(self) -> dict:
+        return {table: self.get_doctors(table) for table in DEPARTMENT_TABLES}
+
+
+class SQLAlchemyRosterRepository:
+    def __init__(self, url: str, **engine_kwargs):
+        from sqlalchemy import create_engine
+
+        options = {"pool_pre_ping": True}
+        if not url.startswith("sqlite"):
+            options.update(pool_size=5, max_overflow=10, pool_recycle=1800)
+        options.update(engine_kwargs)
+        self.engine = create_engine(url, **options)
+
+    def get_doctors(self, department: str) -> list:
+        from sqlalchemy import text
+
+        query = text(f"SELECT doc_name, experience_years, is_available FROM {_table_name(department)} ORDER BY doc_id")
+        with self.engine.connect() as conn:
+            return [_doctor(row._mapping) for row in conn.execute(query)]
+
+    def get_all(self) -> dict:
+        from sqlalchemy import text
+
+        union = " UNION ALL ".join(
+            f"SELECT '{table}' AS department, doc_id, doc_name, experience_years, is_available FROM {table}"
+            for table in DEPARTMENT_TABLES
+        )
+        rosters = {table: [] for table in DEPARTMENT_TABLES}
+        with self.engine.connect() as conn:
+            for row in conn.execute(text(f"SELECT * FROM ({union}) AS rosters ORDER BY department, doc_id")):
+                rosters[row._mapping["department"]].append(_doctor(row._mapping))
+        return rosters
+
+
+class SQLiteRosterRepository(SQLAlchemyRosterRepository):
+    def __init__(self, path: str = ":memory:", seed_sql_path: str = SEED_MIGRATION):
+        if path == ":memory:":
+            # One shared connection, otherwise every checkout sees an empty database
+            from sqlalchemy.pool import StaticPool
+            super().__init__("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+        else:
+            super().__init__(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+        self._seed(seed_sql_path)
+
+    def _seed(self, seed_sql_path: str):
+        from sqlalchemy import inspect
+
+        if set(DEPARTMENT_TABLES) <= {t.lower() for t in inspect(self.engine).get_table_names()}:
+            return
+
+        with open(seed_sql_path) as f:
+            sql = f.read()
+        # Postgres SERIAL -> SQLite rowid alias
+        sql = re.sub(r"\bSERIAL PRIMARY KEY\b", "INTEGER PRIMARY KEY", sql)
+
+        raw = self.engine.raw_connection()
+        try:
+            raw.cursor().executescript(sql)
+            raw.commit()
+        finally:
+            raw.close()
+        print(f"[PARS] Seeded roster database from {os.path.basename(seed_sql_path)}")
+
+
+class RosterCache:
+    """
+    Last full roster snapshot (one get_all() call), served when live queries
+    are shed under load. Refreshed at most every ttl_seconds, outside the lock:
+    while a refresh is in flight (on a background thread once a snapshot
+    exists) callers keep getting the stale snapshot. Only the very first load
+    blocks, and concurrent first callers wait for it instead of each querying.
+    A failed refresh keeps the stale snapshot and retries with backoff
+    (5s, 10s, 20s, ... capped at ttl_seconds).
+    """
+
+    def __init__(self, ttl_seconds=300.0):
+        self.ttl_seconds = ttl_seconds
+        self._rosters = None
+        self._loaded_at = 0.0
+        self._next_refresh = 0.0
+        self._failures = 0
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self._loaded = threading.Condition(self._lock)
+
+    def get_doctors(self, repository, department: str) -> list:
+        table = _table_name(department)
+        with self._lock:
+            due = not self._refreshing and time.monotonic() >= self._next_refresh
+            if due:
+                self._refreshing = True
+            if self._rosters is not None:
+                if due:
+                    threading.Thread(target=self._refresh, args=(repository,),
+                                     name="pars-roster-refresh", daemon=True).start()
+                return list(self._rosters.get(table, []))
+            if not due:
+                # Another caller is doing the first load; wait for it
+                self._loaded.wait_for(lambda: not self._refreshing)
+                if self._rosters is None:
+                    raise RuntimeError("Roster snapshot unavailable (initial load failed)")
+                return list(self._rosters.get(table, []))
+
+        self._refresh(repository, raise_errors=True)
+        with self._lock:
+            return list(self._rosters.get(table, []))
+
+    def _refresh(self, repository, raise_errors=False):
+        try:
+            rosters = repository.get_all()
+        except Exception as e:
+            with self._lock:
+                self._failures += 1
+                backoff = min(self.ttl_seconds, 5.0 * 2 ** (self._failures - 1))
+                self._next_refresh = time.monotonic() + backoff
+                self._refreshing = False
+                self._loaded.notify_all()
+            print(f"[PARS] Roster cache refresh failed (retry in {backoff:.0f}s): {e}")
+            if raise_errors:
+                raise
+            return
+        with self._lock:
+            self._rosters = rosters
+            self._loaded_at = time.monotonic()
+            self._next_refresh = self._loaded_at + self.ttl_seconds
+            self._failures = 0
+            self._refreshing = False
+            self._loaded.notify_all()
+
+    def age_seconds(self):
+        return round(time.monotonic() - self._loaded_at, 1) if self._rosters is not None else None
+
+
+roster_cache = RosterCache(float(os.getenv("PARS_ROSTER_CACHE_TTL", "300")))
+
+_repository = None
+_repository_lock = threading.Lock()
+
+
+def get_roster_repository(supabase_factory=None):
+    """Process-wide repository chosen by PARS_ROSTER_BACKEND (built on first use)."""
+    global _repository
+    if _repository is None:
+        with _repository_lock:
+            if _repository is None:
+                _repository = create_roster_repository(supabase_factory)
+    return _repository
+
+
+def create_roster_repository(supabase_factory=None):
+    backend = os.getenv("PARS_ROSTER_BACKEND", "supabase").lower()
+    if backend == "sql":
+        url = os.getenv("PARS_ROSTER_DB_URL")
+        if not url:
+            raise RuntimeError("PARS_ROSTER_BACKEND=sql requires PARS_ROSTER_DB_URL")
+        return SQLAlchemyRosterRepository(url)
+    if backend == "sqlite":
+        return SQLiteRosterRepository(os.getenv("PARS_ROSTER_SQLITE_PATH", os.path.join(BASE_DIR, "roster.db")))
+    if backend != "supabase":
+        print(f"[PARS] WARNING: Unknown PARS_ROSTER_BACKEND '{backend}', using supabase.")
+    return SupabaseRosterRepository(supabase_factory)
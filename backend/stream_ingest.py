@@ -0,0 +1,58 @@
+"""
+PARS - Streaming Ingestion
+Incremental NDJSON parsing for /predict/stream. Only one partial line is ever
+buffered, so memory stays flat no matter how long the upload runs.
+"""
+
+import json
+import os
+
+STREAM_CHUNK_SIZE = int(os.getenv("PARS_STREAM_CHUNK_SIZE", "256"))
+STREAM_MAX_LINE_BYTES = int(os.getenv("PARS_STREAM_MAX_LINE_BYTES", "65536"))
+
+
+class LineTooLong(ValueError):
+    pass
+
+
+async def iter_ndjson_lines(chunks, max_line_bytes=STREAM_MAX_LINE_BYTES):
+    """
+    Yields (line_number, bytes_or_error) for each non-blank line of an async
+    byte stream. Lines longer than max_line_bytes are skipped and reported as
+    a LineTooLong instance instead of being buffered.
+    """
+    buf = bytearray()
+    line_no = 0
+    skipping = False
+
+    async for chunk in chunks:
+        buf.extend(chunk)
+
+        while True:
+            idx = buf.find(b"\n")
+            if idx < 0:
+                break
+            line = bytes(buf[:idx])
+            del buf[:idx + 1]
+            line_no += 1
+
+            if skipping:
+                skipping = False
+                continue
+            if len(line) > max_line_bytes:
+                yield line_no, LineTooLong(f"Line exceeds {max_line_bytes} bytes")
+            elif line.strip():
+                yield line_no, line
+
+        if len(buf) > max_line_bytes and not skipping:
+            skipping = True
+            yield line_no + 1, LineTooLong(f"Line exceeds {max_line_bytes} bytes")
+        if skipping:
+            buf.clear()
+
+    if buf.strip() and not skipping:
+        yield line_no + 1, bytes(buf)
+
+
+def encode_line(obj: dict) -> bytes:
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8") + b"\n"
@@ -0,0 +1,117 @@
+import io
+import zipfile
+
+import pytest
+
+import document_batch
+from document_batch import ByteBudget, expand_uploads, merge_extractions
+
+PDF = b"%PDF-1.4\n% test document\n"
+
+
+def zip_of(members: dict) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, content in members.items():
+            archive.writestr(name, content)
+    return buf.getvalue()
+
+
+def test_specific_values_beat_prompt_defaults():
+    merged = merge_extractions([
+        (0, {"Age": 67, "Gender": "F", "Heart_Rate": 75, "Systolic_BP": 150}),
+        (1, {"Age": 67, "Heart_Rate": 112, "Systolic_BP": 120}),
+    ])
+    patient, provenance = merged["patient"], merged["provenance"]
+
+    assert patient["Gender"] == "Female"
+    assert patient["Heart_Rate"] == 112
+    assert patient["Systolic_BP"] == 150
+    assert provenance["Heart_Rate"]["sources"] == [1]
+    assert provenance["Age"]["sources"] == [0, 1]
+    assert provenance["Diastolic_BP"] == {"value": 80, "sources": [], "defaulted": True}
+    assert merged["missing_required"] == []
+
+
+def test_majority_wins_ties_go_to_the_later_document():
+    merged = merge_extractions([(0, {"Heart_Rate": 100}), (1, {"Heart_Rate": 110}), (2, {"Heart_Rate": 100})])
+    assert merged["patient"]["Heart_Rate"] == 100
+    assert merged["provenance"]["Heart_Rate"]["conflicts"] == [{"value": 110, "source": 1}]
+
+    tie = merge_extractions([(0, {"Heart_Rate": 100}), (1, {"Heart_Rate": 110})])
+    assert tie["patient"]["Heart_Rate"] == 110
+
+
+def test_required_fields_are_never_defaulted():
+    merged = merge_extractions([(0, {"Age": 0, "Heart_Rate": 90})])
+    assert "Age" not in merged["patient"]
+    assert "Gender" not in merged["patient"]
+    assert merged["missing_required"] == ["Age", "Gender"]
+    assert merged["provenance"]["Age"]["missing"]
+
+
+def test_flags_complaints_names_and_bad_results():
+    merged = merge_extractions([
+        (0, {"Diabetes": "yes", "Chief_Complaint": "Chest pain", "name": "Unknown"}),
+        (1, {"Hypertension": False, "Chief_Complaint": "chest pain", "name": "Ana Ruiz"}),
+        (2, {"Chief_Complaint": "Dizziness"}),
+        (3, "Gemini returned prose"),
+    ])
+    patient = merged["patient"]
+    assert patient["Diabetes"] and not patient["Hypertension"]
+    assert merged["provenance"]["Diabetes"]["sources"] == [0]
+    assert patient["Chief_Complaint"] == "Chest pain; Dizziness"
+    assert patient["name"] == "Ana Ruiz"
+    assert merged["errors"] == [{"index": 3, "error": "Unexpected extraction result (str)"}]
+
+
+def test_expand_uploads_unpacks_zip_members():
+    archive = zip_of({"letters/referral.pdf": PDF, "notes.txt": b"hello", "__MACOSX/._referral.pdf": b"x"})
+    files = expand_uploads([("scan.pdf", PDF), ("bundle.zip", archive), ("photo.jpg", b"\xff\xd8")])
+
+    assert [(f.filename, f.error) for f in files] == [
+        ("scan.pdf", None),
+        ("bundle.zip/letters/referral.pdf", None),
+        ("bundle.zip/notes.txt", "Not a PDF"),
+        ("photo.jpg", "Not a PDF or zip archive"),
+    ]
+    assert files[1].content == PDF
+
+
+def test_expand_uploads_limits_member_count(monkeypatch):
+    monkeypatch.setattr(document_batch, "MAX_BATCH_FILES", 3)
+    archive = zip_of({f"page{i}.pdf": PDF for i in range(4)})
+    with pytest.raises(ValueError, match="Too many documents"):
+        expand_uploads([("bundle.zip", archive)])
+
+
+def test_decompression_is_charged_to_the_batch_budget():
+    archive = zip_of({"big.pdf": PDF + b"0" * 50000})
+    budget = ByteBudget(limit=len(archive) + 1000)
+    budget.charge(len(archive))
+    with pytest.raises(ValueError, match="batch size limit"):
+        expand_uploads([("bundle.zip", archive)], budget)
+
+    roomy = ByteBudget(limit=10 ** 6)
+    assert expand_uploads([("bundle.zip", archive)], roomy)[0].error is None
+    assert roomy.used == len(PDF) + 50000
+
+
+def test_oversized_member_is_reported_not_read(monkeypatch):
+    monkeypatch.setattr(document_batch, "MAX_BATCH_FILE_BYTES", 1000)
+    archive = zip_of({"big.pdf": PDF + b"0" * 5000, "small.pdf": PDF})
+    files = expand_uploads([("bundle.zip", archive)])
+    assert [(f.filename, f.error) for f in files] == [
+        ("bundle.zip/big.pdf", "File too large"),
+        ("bundle.zip/small.pdf", None),
+    ]
+
+
+def test_byte_budget():
+    budget = ByteBudget(limit=10)
+    budget.charge(6)
+    assert budget.remaining == 4
+    budget.check(4)
+    with pytest.raises(ValueError):
+        budget.charge(5)
+    assert budget.used == 6
@@ -0,0 +1,65 @@
+import struct
+
+from inference_protocol import (
+    NONE_LENGTH,
+    pack_many,
+    pack_patient,
+    pack_result,
+    pack_str,
+    unpack_many,
+    unpack_patient,
+    unpack_result,
+    unpack_str,
+)
+
+PATIENT = {
+    "Age": 72, "Gender": "Female", "Heart_Rate": 118, "Systolic_BP": 95, "Diastolic_BP": 60,
+    "O2_Saturation": 91.5, "Temperature": 38.9, "Respiratory_Rate": 26, "Pain_Score": 7,
+    "GCS_Score": 13, "Arrival_Mode": "Ambulance", "Diabetes": True, "Hypertension": False,
+    "Heart_Disease": True, "Chief_Complaint": "chest pain, short of breath",
+}
+
+
+def test_patient_round_trip():
+    assert unpack_patient(pack_patient(PATIENT)) == PATIENT
+
+
+def test_patient_defaults():
+    minimal = {key: PATIENT[key] for key in ("Age", "Gender", "Heart_Rate", "Systolic_BP", "Diastolic_BP",
+                                             "O2_Saturation", "Temperature", "Respiratory_Rate")}
+    decoded = unpack_patient(pack_patient(minimal))
+    assert decoded["Pain_Score"] == 0
+    assert decoded["GCS_Score"] == 15
+    assert decoded["Arrival_Mode"] == "Walk-in"
+    assert decoded["Chief_Complaint"] is None
+    assert not decoded["Diabetes"]
+
+
+def test_strings_including_none_and_unicode():
+    buf = pack_str(None) + pack_str("Général") + pack_str("")
+    assert buf[:4] == struct.pack("!I", NONE_LENGTH)
+    value, offset = unpack_str(buf)
+    assert value is None
+    value, offset = unpack_str(buf, offset)
+    assert value == "Général"
+    assert unpack_str(buf, offset) == ("", len(buf))
+
+
+def test_result_carries_model_version():
+    result = {"risk_score": 0.83, "risk_label": "HIGH", "details": "tachycardic", "model_version": "v2"}
+    assert unpack_result(pack_result(result)) == result
+
+    unversioned = unpack_result(pack_result({"risk_score": 0.1, "risk_label": "LOW", "details": "stable"}))
+    assert "model_version" not in unversioned
+
+
+def test_result_from_older_sidecar_without_version():
+    result = {"risk_score": 0.4, "risk_label": "MEDIUM", "details": "watch"}
+    legacy = struct.pack("!dB", 0.4, 1) + pack_str("watch")
+    assert unpack_result(legacy) == result
+
+
+def test_many_round_trip():
+    items = [b"", b"one", pack_patient(PATIENT)]
+    assert unpack_many(pack_many(items)) == items
+    assert unpack_many(pack_many([])) == []
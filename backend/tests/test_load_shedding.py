@@ -0,0 +1,97 @@
+import pytest
+
+import load_shedding
+from load_shedding import OverloadController
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(load_shedding, "time", fake)
+    return fake
+
+
+def controller(**overrides):
+    settings = dict(latency_slo_ms=100.0, inflight_slo=4, parse_latency_slo_ms=1000.0, parse_inflight_slo=2,
+                    window_seconds=30.0, escalate_seconds=2.0, recover_ratio=0.6, recover_seconds=10.0)
+    settings.update(overrides)
+    return OverloadController(**settings)
+
+
+def slow_request(shedder, clock, ms, endpoint_class="triage"):
+    with shedder.track(endpoint_class):
+        clock.now += ms / 1000.0
+
+
+def idle(shedder, clock, seconds, step=0.5):
+    for _ in range(int(seconds / step)):
+        clock.now += step
+        shedder.level()
+
+
+def test_sustained_latency_escalates_one_level_per_step(clock):
+    shedder = controller()
+    for _ in range(40):
+        slow_request(shedder, clock, 500)
+    assert shedder.level() == 3
+    assert shedder.active_tiers() == ["parsing", "routing", "roster"]
+    assert shedder.degraded("roster")
+
+
+def test_single_spike_moves_at_most_one_level(clock):
+    shedder = controller()
+    clock.now += 5
+    ladder = shedder._ladders["triage"]
+    for _ in range(10):
+        ladder.latencies.append((clock.now, 900.0))
+    idle(shedder, clock, 25)
+    assert shedder.level() == 1
+
+
+def test_recovers_only_after_calm_period(clock):
+    shedder = controller(window_seconds=5.0)
+    for _ in range(10):
+        slow_request(shedder, clock, 500)
+    assert shedder.level() >= 1
+    peak = shedder.level()
+
+    clock.now += 6  # slow samples leave the window
+    slow_request(shedder, clock, 10)
+    idle(shedder, clock, 5)
+    assert shedder.level() == peak
+    idle(shedder, clock, 10)
+    assert shedder.level() == peak - 1
+
+
+def test_parsing_pressure_only_sheds_parsing(clock):
+    shedder = controller()
+    for _ in range(20):
+        slow_request(shedder, clock, 5000, endpoint_class="parsing")
+    assert shedder.level() == 1
+    assert shedder.degraded("parsing")
+    assert not shedder.degraded("routing")
+
+
+def test_in_flight_pressure(clock):
+    shedder = controller()
+    trackers = [shedder.track() for _ in range(4)]
+    for tracker in trackers:
+        tracker.__enter__()
+    idle(shedder, clock, 3)
+    assert shedder.level() == 1
+    assert shedder.status()["classes"]["triage"]["in_flight"] == 4
+    for tracker in trackers:
+        tracker.__exit__(None, None, None)
+
+
+def test_forced_and_disabled():
+    assert controller(forced_level=2).active_tiers() == ["parsing", "routing"]
+    assert controller(enabled=False, forced_level=2).level() == 0
@@ -0,0 +1,112 @@
+import os
+import time
+
+import pytest
+
+from model_registry import MODEL_FILE, PREPROCESSOR_FILE, ModelRegistry
+
+
+class FakeModel:
+    def __init__(self, model_path, preprocessor_path):
+        self.model_path = model_path
+        self.preprocessor_path = preprocessor_path
+        self.warmed = 0
+
+    def predict(self, data):
+        self.warmed += 1
+        return {"risk_score": 0.1, "risk_label": "LOW", "details": "stable"}
+
+    def predict_batch(self, records):
+        self.warmed += 1
+        return [self.predict(record) for record in records]
+
+
+@pytest.fixture
+def registry(tmp_path):
+    for version in ("v1", "v2"):
+        version_dir = tmp_path / version
+        version_dir.mkdir()
+        (version_dir / MODEL_FILE).write_bytes(b"")
+        (version_dir / PREPROCESSOR_FILE).write_bytes(b"")
+    (tmp_path / "incomplete").mkdir()
+    return ModelRegistry(loader=FakeModel, model_dir=str(tmp_path))
+
+
+def wait_loaded(registry, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while registry.status()["loading"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_available_lists_complete_versions(registry):
+    assert registry.available() == ["baseline", "v1", "v2"]
+    with pytest.raises(ValueError):
+        registry.paths("../etc")
+
+
+def test_load_warms_up_and_notifies(registry):
+    swaps = []
+    registry.on_swap(swaps.append)
+    registry.load("v1")
+
+    active = registry.active()
+    assert active.version == "v1"
+    assert active.model.warmed > 0
+    assert active.model.model_path.endswith(os.path.join("v1", MODEL_FILE))
+    assert swaps == ["v1"]
+
+
+def test_load_async_and_rollback(registry):
+    registry.load("v1")
+    assert registry.load_async("v2")
+    wait_loaded(registry)
+    assert registry.status()["active"] == "v2"
+    assert registry.status()["previous"] == "v1"
+
+    assert registry.rollback() == "v1"
+    assert registry.active().version == "v1"
+    with pytest.raises(ValueError):
+        registry.load_async("v9")
+
+
+def test_rollback_without_previous_version(registry):
+    registry.load("v1")
+    with pytest.raises(RuntimeError):
+        registry.rollback()
+
+
+def test_install_only_without_loader():
+    registry = ModelRegistry(loader=None)
+    registry.install("sidecar", object())
+    assert registry.active().version == "sidecar"
+    with pytest.raises(RuntimeError):
+        registry.load("v1")
+
+
+def test_publish_and_converge(registry, tmp_path):
+    active_file = str(tmp_path / "shared" / "ACTIVE")
+    assert ModelRegistry.published(active_file) is None
+    registry.publish("v2", active_file)
+    assert ModelRegistry.published(active_file) == "v2"
+    with pytest.raises(ValueError):
+        registry.publish("v9", active_file)
+
+    registry.load("v1")
+    registry.converge("v2")
+    wait_loaded(registry)
+    assert registry.active().version == "v2"
+    # The previous version is an instant rollback, not a reload
+    previous_model = registry.status()["previous"]
+    registry.converge(previous_model)
+    assert registry.active().version == "v1"
+    assert registry.status()["loading"] is None
+
+
+def test_follow_converges_on_published_version(registry, tmp_path):
+    active_file = str(tmp_path / "ACTIVE")
+    registry.load("v1")
+    registry.publish("v2", active_file)
+    registry.follow(active_file, interval=0.05)
+    wait_loaded(registry)
+    assert registry.active().version == "v2"
+    assert registry.status()["shared_active_file"] == active_file
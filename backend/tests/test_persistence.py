@@ -0,0 +1,97 @@
+import json
+import sqlite3
+
+import pytest
+
+from persistence import MemorySink, SQLiteSink, WriteBehindQueue, classify_error, rows_from_check_in
+
+VALID_USER = "11111111-1111-1111-1111-111111111111"
+RESULT = {"risk_score": 0.42, "risk_label": "MEDIUM", "details": "stable",
+          "referral": {"department": "General Medicine", "doctors": []}}
+
+
+def rows(i, user_id=VALID_USER):
+    patient, assignment = rows_from_check_in({"name": f"Patient {i}", "age": 40, "gender": "Female",
+                                              "symptoms": "cough"}, RESULT)
+    patient["user_id"] = user_id
+    return patient, assignment
+
+
+def write_behind(sink, **overrides):
+    settings = dict(batch_size=8, flush_interval=60, max_backoff=0.01, max_attempts=3)
+    settings.update(overrides)
+    return WriteBehindQueue(sink, **settings)
+
+
+class CodedError(Exception):
+    def __init__(self, code):
+        super().__init__(code)
+        self.code = code
+
+
+@pytest.mark.parametrize("error, kind", [
+    (ConnectionError("reset"), "transient"),
+    (TimeoutError(), "transient"),
+    (sqlite3.OperationalError("database is locked"), "transient"),
+    (sqlite3.IntegrityError("FOREIGN KEY constraint failed"), "row"),
+    (CodedError("08006"), "transient"),  # connection failure
+    (CodedError("40001"), "transient"),  # serialization failure
+    (CodedError("503"), "transient"),
+    (CodedError("23503"), "row"),  # foreign key violation
+    (ValueError("bad row"), "row"),
+    (RuntimeError("?"), "unknown"),
+])
+def test_classify_error(error, kind):
+    assert classify_error(error) == kind
+
+
+def test_outage_retries_the_whole_batch_and_drops_nothing():
+    sink = MemorySink(valid_user_ids={VALID_USER})
+    queue = write_behind(sink)
+    sink.fail_next(6)  # longer than max_attempts
+    for i in range(8):
+        queue.enqueue(*rows(i))
+    queue.close(timeout=5)
+
+    stats = queue.stats()
+    assert len(sink.patients) == 8
+    assert sink.writes == 1  # never split
+    assert stats["dead_lettered"] == 0
+    assert stats["buffered"] == 0
+
+
+def test_poison_row_is_isolated_and_dead_lettered(tmp_path):
+    dead_letters = tmp_path / "dead_letters.jsonl"
+    sink = MemorySink(valid_user_ids={VALID_USER})
+    queue = write_behind(sink, dead_letter_path=str(dead_letters))
+    poison = rows("poison", user_id="00000000-0000-0000-0000-000000000000")
+    for i in range(7):
+        queue.enqueue(*rows(i))
+    queue.enqueue(*poison)
+    queue.close(timeout=5)
+
+    written = {p["id"] for p in sink.patients}
+    assert len(written) == 7 and poison[0]["id"] not in written
+    assert {a["patient_id"] for a in sink.assignments} == written
+    assert queue.stats()["dead_lettered"] == 1
+    letter = json.loads(dead_letters.read_text().splitlines()[0])
+    assert letter["patient"]["id"] == poison[0]["id"]
+
+
+def test_full_buffer_drops_oldest():
+    sink = MemorySink()
+    queue = write_behind(sink, batch_size=100, max_buffer=3)
+    for i in range(5):
+        queue.enqueue(*rows(i))
+    queue.close(timeout=5)
+    assert queue.stats()["dropped"] == 2
+    assert [p["name"] for p in sink.patients] == ["Patient 2", "Patient 3", "Patient 4"]
+
+
+def test_sqlite_sink_upserts_retried_rows():
+    sink = SQLiteSink()
+    batch = [rows(i) for i in range(3)]
+    sink.write([p for p, _ in batch], [a for _, a in batch])
+    sink.write([p for p, _ in batch], [a for _, a in batch])
+    assert sink.count("patients") == 3
+    assert sink.count("patient_assignments") == 3
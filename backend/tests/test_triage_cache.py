@@ -0,0 +1,92 @@
+import threading
+import time
+
+import pytest
+
+from triage_cache import SingleFlightCache, canonical_key
+
+
+def test_canonical_key_ignores_key_order():
+    assert canonical_key({"Age": 40, "Gender": "Male"}) == canonical_key({"Gender": "Male", "Age": 40})
+    assert canonical_key({"Age": 40}) != canonical_key({"Age": 41})
+
+
+def test_cached_result_is_reused_and_copied():
+    cache = SingleFlightCache(ttl_seconds=60)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"risk_score": 0.2, "referral": {"department": "General Medicine"}}
+
+    first = cache.get_or_compute("k", compute)
+    first["referral"]["department"] = "mutated"
+    second = cache.get_or_compute("k", compute)
+
+    assert len(calls) == 1
+    assert second["referral"]["department"] == "General Medicine"
+    assert cache.stats()["hits"] == 1
+
+
+def test_concurrent_duplicates_share_one_computation_and_side_effect():
+    cache = SingleFlightCache(ttl_seconds=60)
+    started = threading.Event()
+    release = threading.Event()
+    computed, side_effects, results = [], [], []
+
+    def compute():
+        computed.append(1)
+        started.set()
+        release.wait(5)
+        return {"risk_score": 0.5}
+
+    def on_computed(result):
+        side_effects.append(1)
+        result["queue_id"] = "q-1"
+
+    def request():
+        results.append(cache.get_or_compute("k", compute, on_computed=on_computed))
+
+    leader = threading.Thread(target=request)
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=request) for _ in range(4)]
+    for thread in followers:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while cache.stats()["coalesced"] < 4 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+
+    # A later cache hit must not repeat the side effect either
+    results.append(cache.get_or_compute("k", compute, on_computed=on_computed))
+    assert len(computed) == 1
+    assert len(side_effects) == 1
+    assert [r["queue_id"] for r in results] == ["q-1"] * 6
+
+
+def test_errors_reach_the_caller_and_are_not_cached():
+    cache = SingleFlightCache(ttl_seconds=60)
+
+    def fail():
+        raise RuntimeError("model down")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute("k", fail)
+    assert cache.get_or_compute("k", lambda: {"ok": True}) == {"ok": True}
+
+
+def test_lru_eviction_and_zero_ttl():
+    cache = SingleFlightCache(ttl_seconds=60, max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.get_or_compute(key, lambda: {})
+    assert cache.stats()["size"] == 2
+    assert cache.stats()["evictions"] == 1
+
+    uncached = SingleFlightCache(ttl_seconds=0)
+    calls = []
+    for _ in range(2):
+        uncached.get_or_compute("k", lambda: calls.append(1) or {})
+    assert len(calls) == 2
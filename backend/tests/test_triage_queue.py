@@ -0,0 +1,94 @@
+import pytest
+
+import triage_queue
+from triage_queue import OVERRIDE_MARKER, TriageQueue
+
+
+def result(score, override=False):
+    label = "HIGH" if score >= 0.7 else "LOW"
+    return {"risk_score": score, "risk_label": label, "details": OVERRIDE_MARKER if override else "stable"}
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(triage_queue, "time", fake)
+    return fake
+
+
+def ids(queue):
+    return [patient["id"] for patient in queue.snapshot()[1]]
+
+
+def test_priority_order_overrides_then_score_then_arrival(clock):
+    queue = TriageQueue()
+    queue.admit("low", result(0.1))
+    queue.admit("high", result(0.9))
+    queue.admit("override", result(0.2, override=True))
+    queue.admit("high-later", result(0.9))
+
+    assert ids(queue) == ["override", "high", "high-later", "low"]
+    assert queue.peek()["id"] == "override"
+
+
+def test_rescore_and_discharge_keep_the_heap_consistent(clock):
+    queue = TriageQueue()
+    for i, score in enumerate([0.3, 0.5, 0.7, 0.2]):
+        queue.admit(f"p{i}", result(score))
+    queue.admit("p3", result(0.95))  # re-admitting re-scores
+    queue.discharge("p2")
+
+    assert ids(queue) == ["p3", "p1", "p0"]
+    assert len(queue) == 3
+    with pytest.raises(KeyError):
+        queue.discharge("p2")
+
+
+def test_events_since_and_resync(clock):
+    queue = TriageQueue(history=3)
+    queue.admit("a", result(0.1))
+    seq, _ = queue.snapshot()
+    queue.admit("b", result(0.2))
+    queue.discharge("a")
+
+    events, latest = queue.events_since(seq)
+    assert [(op, payload["id"]) for _, op, payload in events] == [("upsert", "b"), ("remove", "a")]
+    assert events[-1][2]["reason"] == "discharged"
+    assert queue.events_since(latest) == ([], latest)
+    # Ahead of the log (e.g. after a restart) or already trimmed from it: resync
+    assert queue.events_since(latest + 5)[0] is None
+    for i in range(5):
+        queue.admit(f"x{i}", result(0.3))
+    assert queue.events_since(seq)[0] is None
+
+
+def test_capacity_evicts_oldest_admissions(clock):
+    queue = TriageQueue(max_patients=2, ttl_seconds=0)
+    for i in range(3):
+        clock.now += 1
+        queue.admit(f"p{i}", result(0.9 - i * 0.1))
+
+    assert sorted(ids(queue)) == ["p1", "p2"]
+    removed = [payload for _, op, payload in queue.events_since(0)[0] if op == "remove"]
+    assert removed == [{"id": "p0", "reason": "capacity"}]
+
+
+def test_ttl_expires_waiting_patients(clock):
+    queue = TriageQueue(ttl_seconds=60)
+    queue.admit("old", result(0.9))
+    clock.now += 30
+    queue.admit("new", result(0.1))
+    clock.now += 45
+
+    assert ids(queue) == ["new"]
+    assert queue.peek()["id"] == "new"
+    removed = [payload for _, op, payload in queue.events_since(0)[0] if op == "remove"]
+    assert removed == [{"id": "old", "reason": "expired"}]
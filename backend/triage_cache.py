@@ -0,0 +1,125 @@
+"""
+PARS - Triage Result Cache
+Single-flight request coalescing plus a short-TTL result cache for /predict.
+Identical payloads that arrive while one is being computed wait for that
+computation instead of rerunning the model, transformer and roster lookup.
+"""
+
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def canonical_key(payload: dict) -> str:
+    """Stable hash of a request payload (key order and whitespace independent)."""
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlightCache:
+    def __init__(self, ttl_seconds=10.0, max_entries=256):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, result)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+
+    def get_or_compute(self, key: str, compute, on_computed=None):
+        """
+        Returns a cached result for key, joins an in-flight computation for
+        the same key, or runs compute() and shares its result.
+        on_computed(result) runs once per computation, in the computing
+        request only, and may add to the result before it is shared; it is
+        the place for side effects that must not repeat for duplicates.
+        Errors are propagated to every waiter and never cached.
+        """
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, result = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return copy.deepcopy(result)
+                del self._entries[key]
+                self._stats["expirations"] += 1
+
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._inflight[key] = flight
+                self._stats["misses"] += 1
+            else:
+                self._stats["coalesced"] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return copy.deepcopy(flight.result)
+
+        try:
+            result = compute()
+            if on_computed is not None:
+                on_computed(result)
+            flight.result = result
+            self._store(key, result)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+        return copy.deepcopy(result)
+
+    def _store(self, key, result):
+        if self.ttl_seconds <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, copy.deepcopy(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+            stats["inflight"] = len(self._inflight)
+        stats["ttl_seconds"] = self.ttl_seconds
+        stats["max_entries"] = self.max_entries
+        return stats
+
+
+predict_cache = SingleFlightCache(
+    ttl_seconds=float(os.getenv("PARS_PREDICT_CACHE_TTL", "10")),
+    max_entries=int(os.getenv("PARS_PREDICT_CACHE_SIZE", "256")),
+)
@@ -0,0 +1,256 @@
+"""
+PARS - Live Triage Queue
+Server-side priority queue of waiting patients, ordered by:
+  1. guardrail SAFETY OVERRIDE results first
+  2. risk_score, highest first
+  3. arrival order
+
+The queue is an indexed binary heap over parallel arrays (plus an id -> slot
+index), so admit, re-score and discharge are O(log n). Every change is
+recorded as a small event; dashboards follow them over Server-Sent Events
+instead of re-reading the whole `patients` table.
+
+Patients leave the queue when discharged (DELETE /queue/{id}), when they have
+waited longer than PARS_QUEUE_TTL_SECONDS (default 12 h), or, oldest first,
+when more than PARS_QUEUE_MAX_PATIENTS (default 5000) are waiting, so memory
+stays bounded even if nobody discharges. Each of these emits a `remove` event.
+
+The queue lives in process memory: PARS must run with a single API worker
+(PARS_WORKERS=1 / uvicorn --workers 1) for /queue and /queue/stream to be
+consistent. With several workers each holds its own queue and its own
+sequence numbers, so admits, re-scores and discharges would land on whichever
+worker served the request.
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import threading
+import time
+from array import array
+from collections import deque
+
+OVERRIDE_MARKER = "SAFETY OVERRIDE"
+QUEUE_MAX_PATIENTS = int(os.getenv("PARS_QUEUE_MAX_PATIENTS", "5000"))
+QUEUE_TTL_SECONDS = float(os.getenv("PARS_QUEUE_TTL_SECONDS", str(12 * 3600)))
+
+
+def is_guardrail_override(result: dict) -> bool:
+    return OVERRIDE_MARKER in (result.get("details") or "")
+
+
+class TriageQueue:
+    def __init__(self, history=1024, max_patients=QUEUE_MAX_PATIENTS, ttl_seconds=QUEUE_TTL_SECONDS):
+        self.max_patients = max_patients
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.RLock()
+        # Heap slots (parallel arrays)
+        self._ids = []
+        self._override = array("b")
+        self._scores = array("d")
+        self._arrival = array("q")
+        self._pos = {}
+        self._patients = {}
+        self._arrivals = itertools.count()
+        # (admitted_at, id) in admission order, for TTL / capacity eviction;
+        # discharged ids are skipped lazily when they reach the front
+        self._admitted = deque()
+        # Change log for SSE subscribers
+        self._events = deque(maxlen=history)
+        self._seq = 0
+        self._waiters = set()
+
+    def __len__(self):
+        return len(self._ids)
+
+    # ------------------- heap internals -------------------
+
+    def _before(self, i, j) -> bool:
+        if self._override[i] != self._override[j]:
+            return self._override[i] > self._override[j]
+        if self._scores[i] != self._scores[j]:
+            return self._scores[i] > self._scores[j]
+        return self._arrival[i] < self._arrival[j]
+
+    def _swap(self, i, j):
+        for arr in (self._ids, self._override, self._scores, self._arrival):
+            arr[i], arr[j] = arr[j], arr[i]
+        self._pos[self._ids[i]] = i
+        self._pos[self._ids[j]] = j
+
+    def _sift_up(self, i):
+        while i > 0:
+            parent = (i - 1) // 2
+            if not self._before(i, parent):
+                break
+            self._swap(i, parent)
+            i = parent
+
+    def _sift_down(self, i):
+        n = len(self._ids)
+        while True:
+            best = i
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < n and self._before(child, best):
+                    best = child
+            if best == i:
+                return
+            self._swap(i, best)
+            i = best
+
+    def _remove_at(self, i):
+        last = len(self._ids) - 1
+        if i != last:
+            self._swap(i, last)
+        patient_id = self._ids.pop()
+        self._override.pop()
+        self._scores.pop()
+        self._arrival.pop()
+        del self._pos[patient_id]
+        if i < len(self._ids):
+            self._sift_up(i)
+            self._sift_down(i)
+
+    def _remove(self, patient_id: str, reason: str) -> dict:
+        self._remove_at(self._pos[patient_id])
+        entry = self._patients.pop(patient_id)
+        self._emit("remove", {"id": patient_id, "reason": reason})
+        return entry
+
+    def _evict(self, now: float):
+        """Drops patients past the TTL, then the oldest ones while over capacity."""
+        while self._admitted:
+            admitted_at, patient_id = self._admitted[0]
+            if patient_id not in self._pos or self._patients[patient_id]["admitted_at"] != admitted_at:
+                self._admitted.popleft()  # already discharged (or re-admitted later)
+                continue
+            if self.ttl_seconds and now - admitted_at > self.ttl_seconds:
+                reason = "expired"
+            elif self.max_patients and len(self._ids) > self.max_patients:
+                reason = "capacity"
+            else:
+                break
+            self._admitted.popleft()
+            self._remove(patient_id, reason)
+        # Keep the index proportional to the queue despite discharges
+        if len(self._admitted) > 2 * len(self._ids) + 64:
+            self._admitted = deque(item for item in self._admitted
+                                   if item[1] in self._pos and self._patients[item[1]]["admitted_at"] == item[0])
+
+    # ------------------- change log -------------------
+
+    def _emit(self, op, payload):
+        self._seq += 1
+        self._events.append((self._seq, op, payload))
+        for loop, wake in list(self._waiters):
+            try:
+                loop.call_soon_threadsafe(wake.set)
+            except RuntimeError:
+                # Subscriber's loop has closed
+                self._waiters.discard((loop, wake))
+
+    def subscribe(self, loop, wake: asyncio.Event):
+        with self._lock:
+            self._waiters.add((loop, wake))
+
+    def unsubscribe(self, loop, wake: asyncio.Event):
+        with self._lock:
+            self._waiters.discard((loop, wake))
+
+    def events_since(self, seq: int):
+        """
+        Returns (events, latest_seq). events is None if `seq` has already
+        fallen out of the change log, or is ahead of this queue (e.g. a
+        Last-Event-ID from before a restart), and the caller must resync from
+        a snapshot.
+        """
+        with self._lock:
+            if seq > self._seq:
+                return None, self._seq
+            if seq == self._seq:
+                return [], self._seq
+            if not self._events or self._events[0][0] > seq + 1:
+                return None, self._seq
+            return [e for e in self._events if e[0] > seq], self._seq
+
+    # ------------------- public API -------------------
+
+    def admit(self, patient_id: str, result: dict, **info) -> dict:
+        """Adds a triaged patient, or re-scores them if already queued."""
+        with self._lock:
+            if patient_id in self._pos:
+                return self.rescore(patient_id, result)
+
+            override = is_guardrail_override(result)
+            entry = {
+                "id": patient_id,
+                "risk_score": result["risk_score"],
+                "risk_label": result["risk_label"],
+                "details": result.get("details"),
+                "override": override,
+                "admitted_at": time.time(),
+                **info,
+            }
+            slot = len(self._ids)
+            self._ids.append(patient_id)
+            self._override.append(1 if override else 0)
+            self._scores.append(float(result["risk_score"]))
+            self._arrival.append(next(self._arrivals))
+            self._pos[patient_id] = slot
+            self._patients[patient_id] = entry
+            self._admitted.append((entry["admitted_at"], patient_id))
+            self._sift_up(slot)
+            self._emit("upsert", entry)
+            self._evict(entry["admitted_at"])
+            return entry
+
+    def rescore(self, patient_id: str, result: dict) -> dict:
+        with self._lock:
+            slot = self._pos.get(patient_id)
+            if slot is None:
+                raise KeyError(patient_id)
+
+            entry = self._patients[patient_id]
+            entry["risk_score"] = result["risk_score"]
+            entry["risk_label"] = result.get("risk_label", entry["risk_label"])
+            if result.get("details") is not None:
+                entry["details"] = result["details"]
+            entry["override"] = is_guardrail_override(entry)
+
+            self._scores[slot] = float(entry["risk_score"])
+            self._override[slot] = 1 if entry["override"] else 0
+            self._sift_up(slot)
+            self._sift_down(self._pos[patient_id])
+            self._emit("upsert", entry)
+            return entry
+
+    def discharge(self, patient_id: str) -> dict:
+        with self._lock:
+            if patient_id not in self._pos:
+                raise KeyError(patient_id)
+            return self._remove(patient_id, "discharged")
+
+    def peek(self):
+        with self._lock:
+            self._evict(time.time())
+            return dict(self._patients[self._ids[0]]) if self._ids else None
+
+    def snapshot(self, limit=None):
+        """(seq, patients in priority order). O(n log n); used for initial sync only."""
+        with self._lock:
+            self._evict(time.time())
+            order = sorted(
+                range(len(self._ids)),
+                key=lambda i: (-self._override[i], -self._scores[i], self._arrival[i]),
+            )
+            if limit is not None:
+                order = order[:limit]
+            return self._seq, [dict(self._patients[self._ids[i]]) for i in order]
+
+
+def format_sse(seq, event, payload) -> str:
+    return f"id: {seq}\nevent: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+triage_queue = TriageQueue()
@@ -0,0 +1,340 @@
+"""
+PARS - Live Triage Statistics
+Incrementally maintained counters for dashboards: totals per department and
+risk label, plus rolling-window counts and average risk scores. Each triage
+decision updates a constant number of counters, and reads never look at the
+decision history, so /stats costs the same after ten patients or ten million.
+
+Rolling windows are rings of fixed-width time buckets with running totals;
+expired buckets are subtracted as they fall out of the window. A background
+thread snapshots everything to JSON so counts survive restarts.
+
+Each worker process writes its own file next to PARS_STATS_SNAPSHOT_PATH
+(triage_stats.<worker>.json, where <worker> is w<PARS_WORKER_INDEX> or
+pid<pid>), and /stats merges this worker's live counters with the other
+workers' files, so every worker reports the same totals (other workers'
+counts are at most PARS_STATS_SNAPSHOT_SECONDS old). On startup a worker
+takes over the files of workers that are no longer running.
+"""
+
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+from collections import Counter, deque
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATS_SNAPSHOT_PATH = os.getenv("PARS_STATS_SNAPSHOT_PATH", os.path.join(BASE_DIR, "triage_stats.json"))
+STATS_SNAPSHOT_SECONDS = float(os.getenv("PARS_STATS_SNAPSHOT_SECONDS", "10"))
+
+# name -> (window seconds, bucket seconds)
+WINDOWS = {
+    "5m": (300, 10),
+    "1h": (3600, 60),
+    "24h": (86400, 900),
+}
+
+
+class _Totals:
+    def __init__(self):
+        self.count = 0
+        self.score_sum = 0.0
+        self.labels = Counter()
+        self.departments = Counter()
+
+    def add(self, score, label, department, sign=1):
+        self.count += sign
+        self.score_sum += sign * score
+        self.labels[label] += sign
+        self.departments[department] += sign
+
+    def merge(self, other, sign=1):
+        self.count += sign * other.count
+        self.score_sum += sign * other.score_sum
+        self.labels.update({k: sign * v for k, v in other.labels.items()})
+        self.departments.update({k: sign * v for k, v in other.departments.items()})
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "score_sum": self.score_sum,
+            "labels": dict(self.labels),
+            "departments": dict(self.departments),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        totals = cls()
+        totals.count = data["count"]
+        totals.score_sum = data["score_sum"]
+        totals.labels = Counter(data["labels"])
+        totals.departments = Counter(data["departments"])
+        return totals
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "avg_risk_score": round(self.score_sum / self.count, 4) if self.count else None,
+            "by_label": {k: v for k, v in self.labels.items() if v},
+            "by_department": {k: v for k, v in self.departments.items() if v},
+        }
+
+
+class RollingWindow:
+    def __init__(self, window_seconds: int, bucket_seconds: int):
+        self.window_seconds = window_seconds
+        self.bucket_seconds = bucket_seconds
+        self._buckets = deque()  # (bucket_start, _Totals)
+        self._running = _Totals()
+
+    def _expire(self, now: float):
+        cutoff = now - self.window_seconds
+        while self._buckets and self._buckets[0][0] + self.bucket_seconds <= cutoff:
+            _, totals = self._buckets.popleft()
+            self._running.merge(totals, sign=-1)
+
+    def add(self, now: float, score, label, department):
+        self._expire(now)
+        start = now - now % self.bucket_seconds
+        if not self._buckets or self._buckets[-1][0] != start:
+            self._buckets.append((start, _Totals()))
+        self._buckets[-1][1].add(score, label, department)
+        self._running.add(score, label, department)
+
+    def summary(self, now: float) -> dict:
+        self._expire(now)
+        return self._running.summary()
+
+    def to_list(self) -> list:
+        return [[start, totals.to_dict()] for start, totals in self._buckets]
+
+    def restore(self, buckets: list, now: float):
+        """Adds serialized buckets (another worker's, or a snapshot) to this window."""
+        merged = {start: totals for start, totals in self._buckets}
+        for start, data in buckets:
+            totals = _Totals.from_dict(data)
+            if start in merged:
+                merged[start].merge(totals)
+            else:
+                merged[start] = totals
+            self._running.merge(totals)
+        self._buckets = deque(sorted(merged.items(), key=lambda item: item[0]))
+        self._expire(now)
+
+
+def _worker_id() -> str:
+    index = os.getenv("PARS_WORKER_INDEX")
+    return f"w{index}" if index is not None else f"pid{os.getpid()}"
+
+
+def _worker_alive(worker: str) -> bool:
+    if not worker.startswith("pid"):
+        return True  # index-based files belong to whichever process has that index
+    try:
+        os.kill(int(worker[3:]), 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, ValueError):
+        return True
+    return True
+
+
+class TriageStats:
+    def __init__(self, snapshot_path=STATS_SNAPSHOT_PATH):
+        self.snapshot_path = snapshot_path
+        self._lock = threading.Lock()
+        self._totals = _Totals()
+        self._by_department_label = Counter()
+        self._sources = Counter()
+        self._windows = {name: RollingWindow(*spec) for name, spec in WINDOWS.items()}
+        self._since = time.time()
+        self._dirty = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    def record(self, result: dict, department=None, source="predict"):
+        """O(1): called once per completed triage decision."""
+        score = float(result.get("risk_score") or 0.0)
+        label = result.get("risk_label") or "UNKNOWN"
+        department = department or "Unassigned"
+        now = time.time()
+        with self._lock:
+            self._totals.add(score, label, department)
+            self._by_department_label[f"{department}|{label}"] += 1
+            self._sources[source] += 1
+            for window in self._windows.values():
+                window.add(now, score, label, department)
+            self._dirty = True
+
+    def summary(self) -> dict:
+        """This worker's live counters merged with the other workers' latest snapshots."""
+        now = time.time()
+        with self._lock:
+            own = self._state()
+        others = self._other_worker_states()
+        if not others:
+            merged = self
+        else:
+            merged = TriageStats(snapshot_path=None)
+            for data in [own] + others:
+                merged._absorb(data, now)
+
+        with merged._lock:
+            by_department = {}
+            for key, count in merged._by_department_label.items():
+                department, label = key.split("|", 1)
+                by_department.setdefault(department, {})[label] = count
+            return {
+                "since": merged._since,
+                "workers": 1 + len(others),
+                "total": merged._totals.summary(),
+                "by_department_label": by_department,
+                "by_source": dict(merged._sources),
+                "windows": {name: window.summary(now) for name, window in merged._windows.items()},
+            }
+
+    def _state(self) -> dict:
+        # Called with the lock held
+        return {
+            "since": self._since,
+            "saved_at": time.time(),
+            "total": self._totals.to_dict(),
+            "by_department_label": dict(self._by_department_label),
+            "by_source": dict(self._sources),
+            "windows": {name: window.to_list() for name, window in self._windows.items()},
+        }
+
+    def _absorb(self, data: dict, now: float):
+        """Adds a serialized state (a snapshot file or another worker's counters) to this one."""
+        with self._lock:
+            self._totals.merge(_Totals.from_dict(data["total"]))
+            self._by_department_label.update(data["by_department_label"])
+            self._sources.update(data["by_source"])
+            self._since = min(self._since, data["since"])
+            for name, buckets in data.get("windows", {}).items():
+                if name in self._windows:
+                    self._windows[name].restore(buckets, now)
+
+    # ------------------- snapshots -------------------
+
+    def _worker_path(self, worker=None) -> str:
+        root, ext = os.path.splitext(self.snapshot_path)
+        return f"{root}.{worker or _worker_id()}{ext or '.json'}"
+
+    def _worker_files(self) -> dict:
+        root, ext = os.path.splitext(self.snapshot_path)
+        prefix = f"{root}."
+        files = {}
+        for path in glob.glob(f"{glob.escape(root)}.*{ext or '.json'}"):
+            worker = path[len(prefix):-len(ext or ".json")]
+            if worker and "." not in worker:
+                files[worker] = path
+        return files
+
+    @staticmethod
+    def _read(path: str):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[PARS] WARNING: Could not read stats snapshot {path}: {e}")
+            return None
+
+    def _other_worker_states(self) -> list:
+        if not self.snapshot_path:
+            return []
+        own = _worker_id()
+        states = []
+        for worker, path in self._worker_files().items():
+            if worker != own:
+                data = self._read(path)
+                if data is not None:
+                    states.append(data)
+        return states
+
+    def load(self) -> bool:
+        """Restores this worker's own snapshot and takes over files of workers that are gone."""
+        if not self.snapshot_path:
+            return False
+        own = _worker_id()
+        candidates = [(worker, path) for worker, path in self._worker_files().items()
+                      if worker == own or not _worker_alive(worker)]
+        if os.path.exists(self.snapshot_path):
+            candidates.append(("legacy", self.snapshot_path))  # single-file snapshot of older versions
+
+        restored = 0
+        now = time.time()
+        for worker, path in candidates:
+            # Rename first: only one starting worker can claim a given file
+            claimed = f"{path}.claimed-{uuid.uuid4().hex}"
+            try:
+                os.replace(path, claimed)
+            except OSError:
+                continue
+            data = self._read(claimed)
+            try:
+                if data is not None:
+                    self._absorb(data, now)
+                    restored += 1
+            except (KeyError, TypeError, ValueError) as e:
+                print(f"[PARS] WARNING: Could not restore stats snapshot {path}: {e}")
+            try:
+                os.remove(claimed)
+            except OSError:
+                pass
+
+        if not restored:
+            return False
+        with self._lock:
+            self._dirty = True
+        self.snapshot()
+        print(f"[PARS] Restored triage stats from {restored} snapshot(s) "
+              f"({self._totals.count} decisions since {time.ctime(self._since)}).")
+        return True
+
+    def snapshot(self) -> bool:
+        """Writes this worker's counters atomically (temp file + rename); skipped if nothing changed."""
+        if not self.snapshot_path:
+            return False
+        with self._lock:
+            if not self._dirty:
+                return False
+            data = self._state()
+            self._dirty = False
+
+        path = self._worker_path()
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"[PARS] Stats snapshot failed: {e}")
+            with self._lock:
+                self._dirty = True
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return False
+        return True
+
+    def start(self, interval=STATS_SNAPSHOT_SECONDS):
+        if not self.snapshot_path or self._thread is not None:
+            return
+
+        def run():
+            while not self._stop.wait(interval):
+                self.snapshot()
+
+        self._thread = threading.Thread(target=run, name="pars-stats-snapshot", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        self.snapshot()
+
+
+triage_stats = TriageStats()
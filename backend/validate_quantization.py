@@ -0,0 +1,108 @@
+"""
+PARS - Routing Quantization Check
+Compares department routing of the float32 sentence-transformer against its
+int8 dynamic-quantized copy (PARS_ROUTING_QUANTIZE=1 in dept_service).
+
+Each model encodes the department descriptions itself, then routes the
+verify_nlp.py cases and every distinct Chief_Complaint in patients_data.csv
+through the transformer stage (top-1 cosine similarity, no keyword cascade).
+Reports top-1 agreement, verify_nlp accuracy for both, per-complaint encode
+latency and serialized model size. Exits non-zero if agreement is below
+--min-agreement or the quantized model fails a verify_nlp case the float32
+model passes.
+
+Usage:
+  python validate_quantization.py
+  python validate_quantization.py --csv ../patients_data.csv --min-agreement 0.99
+"""
+
+import argparse
+import io
+import os
+import statistics
+import sys
+import time
+
+import pandas as pd
+import torch
+from sentence_transformers import SentenceTransformer, util
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from dept_service import DEPARTMENTS, MODEL_NAMES, _clean_name, quantize_model  # noqa: E402
+from verify_nlp import TEST_CASES  # noqa: E402
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def model_size_mb(model) -> float:
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell() / (1024 * 1024)
+
+
+def route_all(model, complaints: list):
+    """Top-1 department per complaint plus median single-complaint encode latency (ms)."""
+    dept_embeddings = model.encode(DEPARTMENTS, convert_to_tensor=True)
+    departments = []
+    latencies = []
+    for complaint in complaints:
+        start = time.perf_counter()
+        embedding = model.encode(complaint, convert_to_tensor=True)
+        latencies.append((time.perf_counter() - start) * 1000)
+        scores = util.cos_sim(embedding, dept_embeddings)[0]
+        departments.append(_clean_name(DEPARTMENTS[int(torch.argmax(scores))]))
+    return departments, statistics.median(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check int8 routing agreement against float32")
+    parser.add_argument("--csv", default=os.path.join(os.path.dirname(BASE_DIR), "patients_data.csv"))
+    parser.add_argument("--model", default=MODEL_NAMES[0])
+    parser.add_argument("--min-agreement", type=float, default=0.98)
+    args = parser.parse_args()
+
+    complaints = [c for c, _ in TEST_CASES]
+    if os.path.exists(args.csv):
+        csv_complaints = pd.read_csv(args.csv)["Chief_Complaint"].dropna().astype(str).unique().tolist()
+        complaints += [c for c in csv_complaints if c not in complaints]
+    else:
+        print(f"[PARS] WARNING: {args.csv} not found; checking verify_nlp cases only.")
+
+    fp32 = SentenceTransformer(args.model, device="cpu")
+    fp32.eval()
+    int8 = quantize_model(fp32)
+
+    print(f"Routing {len(complaints)} complaints with {args.model} (float32 vs int8 dynamic)...")
+    with torch.inference_mode():
+        fp32_depts, fp32_ms = route_all(fp32, complaints)
+        int8_depts, int8_ms = route_all(int8, complaints)
+
+    agree = sum(a == b for a, b in zip(fp32_depts, int8_depts))
+    agreement = agree / len(complaints)
+    expected = [e for _, e in TEST_CASES]
+    fp32_pass = [d == e for d, e in zip(fp32_depts, expected)]
+    int8_pass = [d == e for d, e in zip(int8_depts, expected)]
+    regressions = [TEST_CASES[i][0] for i, (a, b) in enumerate(zip(fp32_pass, int8_pass)) if a and not b]
+
+    print("-" * 40)
+    print(f"Top-1 agreement:        {agree}/{len(complaints)} ({agreement:.2%})")
+    print(f"verify_nlp (float32):   {sum(fp32_pass)}/{len(TEST_CASES)}")
+    print(f"verify_nlp (int8):      {sum(int8_pass)}/{len(TEST_CASES)}")
+    print(f"Encode latency (p50):   {fp32_ms:.2f} ms -> {int8_ms:.2f} ms")
+    print(f"Model size:             {model_size_mb(fp32):.1f} MB -> {model_size_mb(int8):.1f} MB")
+    for complaint, a, b in zip(complaints, fp32_depts, int8_depts):
+        if a != b:
+            print(f"  '{complaint}': {a} -> {b}")
+    print("-" * 40)
+
+    if agreement < args.min_agreement or regressions:
+        if regressions:
+            print(f"❌ int8 fails verify_nlp cases that float32 passes: {regressions}")
+        print(f"❌ Quantized routing does not meet the bar (min agreement {args.min_agreement:.0%}).")
+        sys.exit(1)
+    print("✅ Quantized routing matches; safe to set PARS_ROUTING_QUANTIZE=1.")
+
+
+if __name__ == "__main__":
+    main()
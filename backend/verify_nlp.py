@@ -5,35 +5,37 @@ import os
 # Set up path to import dept_service
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-try:
-    from dept_service import get_referral, get_department
-    
-    print("Testing NLP Department Mapping...")
+# (complaint, expected department); also used by validate_quantization.py
+TEST_CASES = [
+    ("severe chest pain", "Cardiology"),
+    ("I feel very dizzy and my head hurts", "Neurology"),
+    ("I can't stop vomiting", "Gastroenterology"),
+    ("hard to breathe", "Pulmonology"),
+    ("broke my leg", "Orthopedics"),
+    ("car crash severe bleeding", "Emergency_Trauma"),
+    ("skin rash all over", "Dermatology"),
+    ("ear pain", "ENT"),
+    ("pain when urinating", "Urology_Nephrology"),
+    ("feeling very depressed", "Psychiatry"),
+    ("swallowed poison", "Toxicology")
+]
+
+if __name__ == "__main__":
+    try:
+        from dept_service import get_referral, get_department
     
-    test_cases = [
-        ("severe chest pain", "Cardiology"),
-        ("I feel very dizzy and my head hurts", "Neurology"),
-        ("I can't stop vomiting", "Gastroenterology"),
-        ("hard to breathe", "Pulmonology"),
-        ("broke my leg", "Orthopedics"),
-        ("car crash severe bleeding", "Emergency_Trauma"),
-        ("skin rash all over", "Dermatology"),
-        ("ear pain", "ENT"),
-        ("pain when urinating", "Urology_Nephrology"),
-        ("feeling very depressed", "Psychiatry"),
-        ("swallowed poison", "Toxicology")
-    ]
+        print("Testing NLP Department Mapping...")
     
-    passed = 0
-    for complaint, expected in test_cases:
-        dept = get_department(complaint)
-        print(f"Complaint: '{complaint}' -> Dept: {dept} (Expected: {expected})")
-        if dept == expected:
-            passed += 1
-        else:
-            print(f"❌ MISMATCH for '{complaint}'")
+        passed = 0
+        for complaint, expected in TEST_CASES:
+            dept = get_department(complaint)
+            print(f"Complaint: '{complaint}' -> Dept: {dept} (Expected: {expected})")
+            if dept == expected:
+                passed += 1
+            else:
+                print(f"❌ MISMATCH for '{complaint}'")
 
-    print(f"\nPassed {passed}/{len(test_cases)} tests.")
+        print(f"\nPassed {passed}/{len(TEST_CASES)} tests.")
 
-except Exception as e:
-    print(f"❌ ERROR: {e}")
+    except Exception as e:
+        print(f"❌ ERROR: {e}")
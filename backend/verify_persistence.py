@@ -0,0 +1,76 @@
+"""
+Exercises the write-behind queue against the in-memory stand-in sink: a
+transient outage, a poison row (foreign key violation) inside a batch, an
+outage outlasting the attempt cap, and the retry queue draining on close.
+Needs no database.
+
+Usage:
+  python verify_persistence.py
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from persistence import MemorySink, WriteBehindQueue, rows_from_check_in  # noqa: E402
+
+VALID_USER = "11111111-1111-1111-1111-111111111111"
+RESULT = {"risk_score": 0.42, "risk_label": "MEDIUM", "details": "stable",
+          "referral": {"department": "General Medicine", "doctors": []}}
+
+
+def rows(i, user_id=VALID_USER):
+    patient, assignment = rows_from_check_in({"name": f"Patient {i}", "age": 40, "gender": "Female",
+                                              "symptoms": "cough"}, RESULT)
+    patient["user_id"] = user_id
+    return patient, assignment
+
+
+def main():
+    passed = True
+    dead_letters = os.path.join(tempfile.mkdtemp(), "dead_letters.jsonl")
+    sink = MemorySink(valid_user_ids={VALID_USER})
+    queue = WriteBehindQueue(sink, batch_size=8, flush_interval=60, max_backoff=0.01,
+                             max_attempts=3, dead_letter_path=dead_letters)
+
+    # Outage for the first two writes, and one row violating the user FK
+    sink.fail_next(2)
+    poison = rows("poison", user_id="00000000-0000-0000-0000-000000000000")
+    for i in range(7):
+        queue.enqueue(*rows(i))
+    queue.enqueue(*poison)
+    queue.close(timeout=5)
+
+    stats = queue.stats()
+    written = {p["id"] for p in sink.patients}
+    checks = {
+        "good rows written": len(written) == 7 and poison[0]["id"] not in written,
+        "poison row dead-lettered": stats["dead_lettered"] == 1,
+        "dead letter file": os.path.exists(dead_letters) and poison[0]["id"] in open(dead_letters).read(),
+        "nothing left buffered": stats["buffered"] == 0,
+        "assignments match patients": {a["patient_id"] for a in sink.assignments} == written,
+    }
+    # An outage longer than max_attempts must not lose valid rows
+    outage_sink = MemorySink(valid_user_ids={VALID_USER})
+    outage = WriteBehindQueue(outage_sink, batch_size=8, flush_interval=60, max_backoff=0.01, max_attempts=3)
+    outage_sink.fail_next(10)
+    for i in range(8):
+        outage.enqueue(*rows(i))
+    outage.close(timeout=5)
+    checks["outage retried whole, nothing dropped"] = (
+        len(outage_sink.patients) == 8 and outage.stats()["dead_lettered"] == 0 and outage_sink.writes == 1
+    )
+
+    for name, ok in checks.items():
+        print(f"{'✅' if ok else '❌'} {name}")
+        passed = passed and ok
+    print(f"Stats: {stats} ({sink.writes} writes, {sink.failed_writes} failed)")
+
+    if not passed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Distills the served triage network into a compact fast-path surrogate.
+
+The teacher is TriageModel from backend/ml_service.py, run exactly as it is
+served (same frame building and defaults). A linear model or shallow tree is
+fitted to its scores on patients_data.csv using raw request fields only, and
+its fidelity band is calibrated on one held-out split and reported on another,
+so the published fidelity is not measured on the rows that set the band. The
+result is written as
+triage_surrogate.json next to the network; TriageModel then answers from the
+surrogate whenever score +/- band stays inside one risk band.
+
+Usage:
+  python distill.py                                   # linear, backend/triage_surrogate.json
+  python distill.py --kind tree --max-depth 6
+  python distill.py --model-dir backend/models/v2     # distill a registry version
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import Ridge
+from sklearn.model_selection import train_test_split
+from sklearn.tree import DecisionTreeRegressor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+from ml_service import (  # noqa: E402
+    SURROGATE_FEATURES,
+    SURROGATE_FILE,
+    FastPathSurrogate,
+    TriageModel,
+    risk_label_for,
+    surrogate_features,
+)
+
+GENDERS = {"M": "Male", "F": "Female", "O": "Other"}
+
+
+def load_requests(csv_path: str) -> list:
+    """patients_data.csv rows converted to the PatientInput shape the API receives."""
+    df = pd.read_csv(csv_path)
+    records = []
+    for row in df.itertuples(index=False):
+        records.append({
+            "Age": int(row.Age),
+            "Gender": GENDERS.get(row.Gender, row.Gender),
+            "Heart_Rate": int(row.Heart_Rate),
+            "Systolic_BP": int(row.Systolic_BP),
+            "Diastolic_BP": int(row.Diastolic_BP),
+            "O2_Saturation": float(row.O2_Saturation),
+            "Temperature": float(row.Temp),
+            "Respiratory_Rate": int(row.Respiratory_Rate),
+            "Pain_Score": int(row.Pain_Score),
+            "GCS_Score": int(row.GCS_Score),
+            "Arrival_Mode": row.Arrival_Mode,
+            "Diabetes": bool(row.History_Diabetes),
+            "Hypertension": bool(row.History_Hypertension),
+            "Heart_Disease": bool(row.History_Heart_Disease),
+        })
+    return records
+
+
+def teacher_scores(teacher: TriageModel, records: list, batch_size=1024) -> np.ndarray:
+    scores = []
+    for start in range(0, len(records), batch_size):
+        frame = teacher.build_frame(records[start:start + batch_size])
+        prediction = teacher.model.predict(teacher.preprocessor.transform(frame), verbose=0)
+        scores.append(prediction[:, 0] if prediction.shape[-1] == 1 else prediction.max(axis=1))
+    return np.concatenate(scores)
+
+
+def fit_surrogate(kind: str, X: np.ndarray, y: np.ndarray, max_depth: int) -> dict:
+    if kind == "linear":
+        reg = Ridge(alpha=1.0).fit(X, y)
+        return {"kind": "linear", "intercept": float(reg.intercept_), "weights": [float(w) for w in reg.coef_]}
+
+    reg = DecisionTreeRegressor(max_depth=max_depth, min_samples_leaf=20, random_state=42).fit(X, y)
+    tree = reg.tree_
+    return {
+        "kind": "tree",
+        "tree": {
+            "left": tree.children_left.tolist(),
+            "right": tree.children_right.tolist(),
+            "feature": tree.feature.tolist(),
+            "threshold": tree.threshold.tolist(),
+            "value": tree.value.reshape(-1).tolist(),
+        },
+    }
+
+
+def evaluate(surrogate: FastPathSurrogate, records: list, teacher_y: np.ndarray, labels: set) -> dict:
+    scores = np.array([surrogate.score(r) for r in records])
+    errors = np.abs(scores - teacher_y)
+    teacher_labels = [risk_label_for(s) for s in teacher_y]
+
+    hits = agree = 0
+    for score, teacher_label in zip(scores, teacher_labels):
+        label = surrogate.confident_label(score)
+        if label in labels:
+            hits += 1
+            agree += label == teacher_label
+    return {
+        "mae": round(float(errors.mean()), 5),
+        "max_error": round(float(errors.max()), 5),
+        "label_agreement": round(float(np.mean([risk_label_for(s) == t for s, t in zip(scores, teacher_labels)])), 5),
+        "fast_path_labels": sorted(labels),
+        "fast_path_hit_rate": round(hits / len(records), 5),
+        "fast_path_label_agreement": round(agree / hits, 5) if hits else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distill the triage network into a fast-path surrogate")
+    parser.add_argument("--csv", default="patients_data.csv")
+    parser.add_argument("--model-dir", default="backend", help="Directory holding the network and preprocessor")
+    parser.add_argument("--kind", choices=["linear", "tree"], default="linear")
+    parser.add_argument("--max-depth", type=int, default=6)
+    parser.add_argument("--quantile", type=float, default=0.995,
+                        help="Fidelity band = this quantile of |surrogate - network| on the calibration split")
+    parser.add_argument("--labels", default="LOW", help="Bands to evaluate the fast path for")
+    args = parser.parse_args()
+
+    model_dir = os.path.abspath(args.model_dir)
+    teacher = TriageModel(os.path.join(model_dir, "triage_model_nn.keras"),
+                          os.path.join(model_dir, "preprocessor_nn.pkl"))
+
+    # Guardrail cases never reach the network (or the fast path), so leave them out
+    records = [r for r in load_requests(args.csv) if not teacher.critical_reasons(r)]
+    print(f"Scoring {len(records)} non-override records with the network...")
+    y = teacher_scores(teacher, records)
+    X = np.array([surrogate_features(r) for r in records])
+
+    # 60/20/20: fit, calibrate the band, evaluate with that band
+    idx_train, idx_rest = train_test_split(np.arange(len(records)), test_size=0.4, random_state=42)
+    idx_calib, idx_eval = train_test_split(idx_rest, test_size=0.5, random_state=42)
+    spec = fit_surrogate(args.kind, X[idx_train], y[idx_train], args.max_depth)
+
+    spec["band"] = 0.0
+    probe = FastPathSurrogate(spec)
+    calibration = [records[i] for i in idx_calib]
+    residuals = np.abs(np.array([probe.score(r) for r in calibration]) - y[idx_calib])
+    spec["band"] = round(float(np.quantile(residuals, args.quantile)), 5)
+
+    labels = {l.strip().upper() for l in args.labels.split(",") if l.strip()}
+    spec["features"] = SURROGATE_FEATURES
+    spec["band_quantile"] = args.quantile
+    held_out = [records[i] for i in idx_eval]
+    spec["fidelity"] = evaluate(FastPathSurrogate(spec), held_out, y[idx_eval], labels)
+
+    out_path = os.path.join(model_dir, SURROGATE_FILE)
+    with open(out_path, "w") as f:
+        json.dump(spec, f, indent=2)
+
+    print("-" * 40)
+    print(f"Surrogate ({args.kind}) fidelity on the evaluation split ({len(held_out)} rows):")
+    for key, value in spec["fidelity"].items():
+        print(f"  {key}: {value}")
+    print(f"  band (q={args.quantile}): ±{spec['band']}")
+    print("-" * 40)
+    print(f"✅ Surrogate saved as '{out_path}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+Warm-start incremental retraining for the triage network.
+
+Instead of retraining from scratch over all of patients_data.csv, this loads
+the current triage_model_nn.keras and its fitted preprocessor, fine-tunes the
+existing weights for a few epochs on new labelled records only, and promotes
+the result only if it passes a held-out regression check:
+
+  * MAE on the historic held-out split (train.py's 80/20 split) may not get
+    worse than the current model's by more than --tolerance, and
+  * MAE on a held-out slice of the new records may not get worse at all.
+
+The preprocessor is reused unchanged so the input space stays identical. New
+records can be in the training CSV layout (patients_data.csv columns) or an
+export of the `patients` table (snake_case columns written by the API). Rows
+are turned into network inputs by TriageModel.build_frame, exactly as served.
+
+The label must be a clinician-confirmed outcome column named with --target.
+The `patients.risk_score` column is the model's own past output and is
+refused, since training on it would only reinforce the current model. Rows
+that never reflected the network are dropped: guardrail SAFETY OVERRIDE
+results (fixed scores) and self check-ins (placeholder vitals).
+A small replay sample of historic rows is mixed in to limit forgetting, so
+the cost scales with the number of new records, not the history.
+
+Passing models are written in the model registry layout and can be activated
+with POST /admin/models/<version>/activate.
+
+Usage:
+  python retrain.py --new exports/patients_2026-10-17.csv --target confirmed_risk_score
+  python retrain.py --new new.csv --target Risk_Score --epochs 3
+  python retrain.py --new new.csv --target confirmed_risk_score --version nightly-20261018 --model-dir backend/models/v2
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+from ml_service import TriageModel  # noqa: E402
+from model_registry import MODEL_DIR, MODEL_FILE, PREPROCESSOR_FILE  # noqa: E402
+from persistence import SELF_CHECK_IN_VITALS  # noqa: E402
+from triage_queue import OVERRIDE_MARKER  # noqa: E402
+
+# `patients` table columns -> PatientInput fields
+PATIENTS_COLUMNS = {
+    "age": "Age",
+    "gender": "Gender",
+    "heart_rate": "Heart_Rate",
+    "systolic_bp": "Systolic_BP",
+    "diastolic_bp": "Diastolic_BP",
+    "o2_saturation": "O2_Saturation",
+    "temperature": "Temperature",
+    "respiratory_rate": "Respiratory_Rate",
+    "pain_score": "Pain_Score",
+    "gcs_score": "GCS_Score",
+    "arrival_mode": "Arrival_Mode",
+    "diabetes": "Diabetes",
+    "hypertension": "Hypertension",
+    "heart_disease": "Heart_Disease",
+}
+# Filled with the API defaults when absent
+OPTIONAL_FIELDS = {"Arrival_Mode", "Diabetes", "Hypertension", "Heart_Disease"}
+# Columns holding the model's own predictions; never valid labels
+MODEL_OUTPUT_COLUMNS = {"risk_score", "risk_label"}
+# Training CSV columns that differ from PatientInput
+TRAINING_COLUMNS = {
+    "Temp": "Temperature",
+    "History_Diabetes": "Diabetes",
+    "History_Hypertension": "Hypertension",
+    "History_Heart_Disease": "Heart_Disease",
+}
+
+
+def _as_bool(series: pd.Series) -> pd.Series:
+    if series.dtype == object:
+        return series.astype(str).str.strip().str.lower().isin(["true", "t", "1", "yes"])
+    return series.fillna(0).astype(bool)
+
+
+def _model_fed_rows(df: pd.DataFrame) -> pd.Series:
+    """False for guardrail overrides and self check-ins in a `patients` export."""
+    keep = pd.Series(True, index=df.index)
+    if "explanation" in df.columns:
+        keep &= ~df["explanation"].fillna("").astype(str).str.contains(OVERRIDE_MARKER, regex=False)
+    placeholder = [c for c in SELF_CHECK_IN_VITALS if c in df.columns]
+    if placeholder:
+        is_check_in = pd.Series(True, index=df.index)
+        for column in placeholder:
+            is_check_in &= df[column] == SELF_CHECK_IN_VITALS[column]
+        keep &= ~is_check_in
+    return keep
+
+
+def load_new_records(paths: list, target: str):
+    """Returns (records, y) from training-layout CSVs or `patients` table exports."""
+    if target in MODEL_OUTPUT_COLUMNS:
+        raise ValueError(f"'{target}' is the model's own output; pass a clinician-confirmed label column")
+    records, targets = [], []
+    for path in paths:
+        df = pd.read_csv(path)
+        column = target
+        if "heart_rate" in df.columns:
+            before = len(df)
+            df = df[_model_fed_rows(df)]
+            if len(df) < before:
+                print(f"Skipped {before - len(df)} guardrail-override / self check-in rows from {path}")
+            df = df.rename(columns=PATIENTS_COLUMNS)
+        else:
+            df = df.rename(columns=TRAINING_COLUMNS)
+        if column not in df.columns:
+            raise ValueError(f"{path}: label column '{column}' not found")
+
+        fields = list(PATIENTS_COLUMNS.values())
+        required = [f for f in fields if f not in OPTIONAL_FIELDS]
+        missing = [f for f in required if f not in df.columns]
+        if missing:
+            raise ValueError(f"{path}: missing columns {missing}")
+        df = df.dropna(subset=[column] + required)
+        for flag in ("Diabetes", "Hypertension", "Heart_Disease"):
+            df[flag] = _as_bool(df[flag]) if flag in df.columns else False
+        if "Arrival_Mode" not in df.columns:
+            df["Arrival_Mode"] = "Walk-in"
+        df["Arrival_Mode"] = df["Arrival_Mode"].fillna("Walk-in")
+        extra = [c for c in ("BMI",) if c in df.columns]
+
+        records.extend(df[fields + extra].to_dict("records"))
+        targets.append(df[column].astype(float).to_numpy())
+        print(f"Loaded {len(df)} labelled records from {path} (label: {column})")
+    return records, np.concatenate(targets) if targets else np.array([])
+
+
+def historic_split(csv_path: str):
+    """train.py's 80/20 split of the historic data, as raw training-layout frames."""
+    from sklearn.model_selection import train_test_split
+    from train import load_dataset
+
+    X, y = load_dataset(csv_path)
+    return train_test_split(X, y, test_size=0.2, random_state=42)
+
+
+def _dense(matrix):
+    return matrix.toarray() if hasattr(matrix, "toarray") else np.asarray(matrix)
+
+
+def mae(model, X, y) -> float:
+    prediction = model.predict(X, verbose=0)[:, 0]
+    return float(np.mean(np.abs(prediction - np.asarray(y))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm-start fine-tuning of the triage network on new records")
+    parser.add_argument("--new", action="append", required=True, help="CSV of new labelled records (repeatable)")
+    parser.add_argument("--target", required=True,
+                        help="Clinician-confirmed label column (e.g. Risk_Score in training CSVs); "
+                             "the model's own risk_score is refused")
+    parser.add_argument("--model-dir", default="backend", help="Directory holding the current network and preprocessor")
+    parser.add_argument("--history", default="patients_data.csv", help="Historic data for the regression check and replay")
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--learning-rate", type=float, default=1e-4)
+    parser.add_argument("--replay", type=float, default=1.0,
+                        help="Historic rows mixed in, as a multiple of the new training rows (0 disables)")
+    parser.add_argument("--new-holdout", type=float, default=0.2, help="Fraction of new records held out")
+    parser.add_argument("--tolerance", type=float, default=0.02,
+                        help="Allowed relative MAE increase on the historic held-out split")
+    parser.add_argument("--version", default=time.strftime("incr-%Y%m%d-%H%M%S"))
+    parser.add_argument("--registry-dir", default=MODEL_DIR)
+    parser.add_argument("--force", action="store_true", help="Write the model even if the regression check fails")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    import tensorflow as tf
+
+    model_dir = os.path.abspath(args.model_dir)
+    current = TriageModel(os.path.join(model_dir, MODEL_FILE), os.path.join(model_dir, PREPROCESSOR_FILE))
+    preprocessor = current.preprocessor
+
+    records, y_new = load_new_records(args.new, args.target)
+    if len(records) < 10:
+        sys.exit(f"Only {len(records)} labelled records; need at least 10 to fine-tune and check")
+
+    rng = np.random.default_rng(args.seed)
+    order = rng.permutation(len(records))
+    n_holdout = max(2, int(len(records) * args.new_holdout))
+    holdout_idx, train_idx = order[:n_holdout], order[n_holdout:]
+
+    X_new = _dense(preprocessor.transform(current.build_frame(records))).astype(np.float32)
+    X_train, y_train = X_new[train_idx], y_new[train_idx]
+    X_new_holdout, y_new_holdout = X_new[holdout_idx], y_new[holdout_idx]
+
+    hist_train, hist_test, y_hist_train, y_hist_test = historic_split(args.history)
+    X_hist_test = _dense(preprocessor.transform(hist_test)).astype(np.float32)
+
+    if args.replay > 0:
+        n_replay = min(len(hist_train), int(len(train_idx) * args.replay))
+        replay = rng.choice(len(hist_train), size=n_replay, replace=False)
+        X_replay = _dense(preprocessor.transform(hist_train.iloc[replay])).astype(np.float32)
+        X_train = np.vstack([X_train, X_replay])
+        y_train = np.concatenate([y_train, np.asarray(y_hist_train)[replay]])
+        print(f"Mixing in {n_replay} historic replay rows.")
+
+    baseline = {
+        "historic_mae": mae(current.model, X_hist_test, y_hist_test),
+        "new_mae": mae(current.model, X_new_holdout, y_new_holdout),
+    }
+
+    # Warm start: a fresh copy of the current weights, small learning rate
+    tf.keras.utils.set_random_seed(args.seed)
+    candidate = tf.keras.models.clone_model(current.model)
+    candidate.set_weights(current.model.get_weights())
+    candidate.compile(
+        optimizer=tf.keras.optimizers.Adam(learning_rate=args.learning_rate),
+        loss="mean_squared_error",
+        metrics=["mae"],
+    )
+
+    print(f"\nFine-tuning on {len(X_train)} rows for {args.epochs} epochs...")
+    start = time.perf_counter()
+    candidate.fit(X_train, y_train, epochs=args.epochs, batch_size=args.batch_size, shuffle=True, verbose=1)
+    train_seconds = time.perf_counter() - start
+
+    result = {
+        "historic_mae": mae(candidate, X_hist_test, y_hist_test),
+        "new_mae": mae(candidate, X_new_holdout, y_new_holdout),
+    }
+    checks = {
+        "historic": result["historic_mae"] <= baseline["historic_mae"] * (1 + args.tolerance),
+        "new": result["new_mae"] <= baseline["new_mae"],
+    }
+    passed = all(checks.values())
+
+    print("-" * 40)
+    print(f"{'':<22}{'current':>10}{'candidate':>12}")
+    print(f"{'MAE historic hold-out':<22}{baseline['historic_mae']:>10.4f}{result['historic_mae']:>12.4f}")
+    print(f"{'MAE new hold-out':<22}{baseline['new_mae']:>10.4f}{result['new_mae']:>12.4f}")
+    print(f"Regression check: {'PASSED' if passed else 'FAILED'} {checks}")
+    print("-" * 40)
+
+    if not passed and not args.force:
+        print("Candidate not written. Use --force to keep it anyway.")
+        sys.exit(1)
+
+    version_dir = os.path.join(args.registry_dir, args.version)
+    os.makedirs(version_dir, exist_ok=True)
+    candidate.save(os.path.join(version_dir, MODEL_FILE))
+    joblib.dump(preprocessor, os.path.join(version_dir, PREPROCESSOR_FILE))
+    with open(os.path.join(version_dir, "retrain_report.json"), "w") as f:
+        json.dump({
+            "base_model_dir": model_dir,
+            "new_files": args.new,
+            "new_records": len(records),
+            "train_rows": int(len(X_train)),
+            "epochs": args.epochs,
+            "learning_rate": args.learning_rate,
+            "train_seconds": round(train_seconds, 2),
+            "baseline": baseline,
+            "candidate": result,
+            "checks": checks,
+            "forced": not passed,
+        }, f, indent=2)
+
+    print(f"✅ Saved version '{args.version}' to {version_dir}")
+    print(f"   Activate with: POST /admin/models/{args.version}/activate")
+    print(f"   (re-run distill.py --model-dir {version_dir} to give it a fast-path surrogate)")
+
+
+if __name__ == "__main__":
+    main()
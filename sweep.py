@@ -0,0 +1,255 @@
+"""
+Hyperparameter sweep for the triage network in train.py.
+
+Preprocesses patients_data.csv once, writes the scaled arrays to a scratch
+directory, and trains candidate architectures in parallel worker processes
+that memory-map those arrays. Results are ranked by validation MAE and reported
+with parameter count and single-row inference latency, so smaller models that
+keep accuracy are easy to spot.
+
+The test split is train.py's 20% hold-out and is never seen during the
+sweep: candidates are ranked on a validation set carved out of the training
+part (--val-fraction), and only the winning configuration is retrained and
+scored on the test split, so its test MAE is an unbiased estimate.
+
+Usage:
+  python sweep.py --search grid --workers 4
+  python sweep.py --search random --trials 24 --widths 16,32,64,128 --depths 1,2,3,4
+  python sweep.py --save-best backend/models/sweep-best    # loadable by the model registry
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import joblib
+import numpy as np
+
+# Per-worker arrays, set by _init_worker
+_DATA = {}
+# Trial workers never load the test split
+TRIAL_ARRAYS = ("X_train", "X_val", "y_train", "y_val")
+ALL_ARRAYS = TRIAL_ARRAYS + ("X_test", "y_test")
+
+
+def _dense(matrix):
+    return matrix.toarray() if hasattr(matrix, "toarray") else np.asarray(matrix)
+
+
+def prepare_dataset(csv_path: str, out_dir: str, val_fraction: float, seed: int):
+    """
+    Fits the preprocessor once (train.py's split, so the exported preprocessor
+    matches) and stores train / validation / test as .npy files for the workers.
+    """
+    from sklearn.model_selection import train_test_split
+    from train import load_dataset, split_and_scale
+
+    X, y = load_dataset(csv_path)
+    preprocessor, X_train, X_test, y_train, y_test = split_and_scale(X, y)
+    X_train, X_val, y_train, y_val = train_test_split(
+        _dense(X_train), np.asarray(y_train), test_size=val_fraction, random_state=seed
+    )
+    arrays = {
+        "X_train": X_train.astype(np.float32),
+        "X_val": X_val.astype(np.float32),
+        "X_test": _dense(X_test).astype(np.float32),
+        "y_train": y_train.astype(np.float32),
+        "y_val": y_val.astype(np.float32),
+        "y_test": np.asarray(y_test, dtype=np.float32),
+    }
+    for name, array in arrays.items():
+        np.save(os.path.join(out_dir, f"{name}.npy"), array)
+    return preprocessor, arrays["X_train"].shape
+
+
+def _init_worker(data_dir: str, threads: int, names=TRIAL_ARRAYS):
+    # One or two threads per worker so parallel trials don't oversubscribe the cores
+    os.environ["TF_CPP_MIN_LOG_LEVEL"] = "2"
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(threads)
+
+    for name in names:
+        _DATA[name] = np.load(os.path.join(data_dir, f"{name}.npy"), mmap_mode="r")
+
+
+def build_grid(widths, depths, dropouts, batch_sizes):
+    return [
+        {"width": w, "depth": d, "dropout": p, "batch_size": b}
+        for w, d, p, b in itertools.product(widths, depths, dropouts, batch_sizes)
+    ]
+
+
+def build_random(widths, depths, dropouts, batch_sizes, trials, seed):
+    grid = build_grid(widths, depths, dropouts, batch_sizes)
+    rng = random.Random(seed)
+    return rng.sample(grid, min(trials, len(grid)))
+
+
+def hidden_layers(config):
+    """Uniform-width ReLU stack; train.py's DEFAULT_LAYERS is the reference point."""
+    return [(config["width"], "relu", config["dropout"])] * config["depth"]
+
+
+def run_trial(config, epochs, patience, latency_runs, save_path=None, evaluate_test=False):
+    """Trains one configuration; metrics are on the validation set (plus the test set if asked)."""
+    import tensorflow as tf
+    from tensorflow.keras import callbacks
+    from sklearn.metrics import mean_absolute_error, r2_score
+    from train import build_model
+
+    X_train, X_val = _DATA["X_train"], _DATA["X_val"]
+    y_train, y_val = _DATA["y_train"], _DATA["y_val"]
+
+    tf.keras.utils.set_random_seed(config.get("seed", 42))
+    model = build_model(X_train.shape[1], hidden_layers(config))
+
+    early_stopping = callbacks.EarlyStopping(monitor="val_loss", patience=patience, restore_best_weights=True)
+    start = time.perf_counter()
+    history = model.fit(
+        np.asarray(X_train), np.asarray(y_train),
+        epochs=epochs,
+        batch_size=config["batch_size"],
+        validation_split=0.05,
+        callbacks=[early_stopping],
+        verbose=0,
+    )
+    train_seconds = time.perf_counter() - start
+
+    y_pred = model.predict(np.asarray(X_val), verbose=0)[:, 0]
+
+    # Served latency: one row through model.predict, as TriageModel does
+    row = np.asarray(X_val[:1])
+    model.predict(row, verbose=0)
+    samples = []
+    for _ in range(latency_runs):
+        t0 = time.perf_counter()
+        model.predict(row, verbose=0)
+        samples.append((time.perf_counter() - t0) * 1000)
+
+    if save_path:
+        model.save(save_path)
+
+    result = {
+        **config,
+        "val_mae": round(float(mean_absolute_error(y_val, y_pred)), 5),
+        "val_r2": round(float(r2_score(y_val, y_pred)), 5),
+        "params": int(model.count_params()),
+        "latency_ms": round(float(np.median(samples)), 4),
+        "epochs_run": len(history.history["loss"]),
+        "train_seconds": round(train_seconds, 2),
+    }
+    if evaluate_test:
+        y_test_pred = model.predict(np.asarray(_DATA["X_test"]), verbose=0)[:, 0]
+        result["test_mae"] = round(float(mean_absolute_error(_DATA["y_test"], y_test_pred)), 5)
+        result["test_r2"] = round(float(r2_score(_DATA["y_test"], y_test_pred)), 5)
+    return result
+
+
+def _ints(value):
+    return [int(v) for v in value.split(",")]
+
+
+def _floats(value):
+    return [float(v) for v in value.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel hyperparameter sweep for the triage network")
+    parser.add_argument("--csv", default="patients_data.csv")
+    parser.add_argument("--search", choices=["grid", "random"], default="grid")
+    parser.add_argument("--trials", type=int, default=20, help="Random search only")
+    parser.add_argument("--widths", type=_ints, default=[16, 32, 64])
+    parser.add_argument("--depths", type=_ints, default=[1, 2, 3, 5])
+    parser.add_argument("--dropouts", type=_floats, default=[0.0, 0.2])
+    parser.add_argument("--batch-sizes", type=_ints, default=[16, 64])
+    parser.add_argument("--epochs", type=int, default=100)
+    parser.add_argument("--patience", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--threads-per-worker", type=int, default=1)
+    parser.add_argument("--latency-runs", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--val-fraction", type=float, default=0.15,
+                        help="Share of the training split held out for ranking configurations")
+    parser.add_argument("--output", default="sweep_results.json")
+    parser.add_argument("--save-best", help="Directory to save the best model + preprocessor into")
+    args = parser.parse_args()
+
+    if args.search == "grid":
+        configs = build_grid(args.widths, args.depths, args.dropouts, args.batch_sizes)
+    else:
+        configs = build_random(args.widths, args.depths, args.dropouts, args.batch_sizes, args.trials, args.seed)
+    for config in configs:
+        config["seed"] = args.seed
+
+    with tempfile.TemporaryDirectory(prefix="pars-sweep-") as data_dir:
+        preprocessor, shape = prepare_dataset(args.csv, data_dir, args.val_fraction, args.seed)
+        print(f"Prepared {shape[0]} training rows x {shape[1]} features "
+              f"({args.val_fraction:.0%} of the training split held out for validation); "
+              f"running {len(configs)} trials on {args.workers} workers.")
+
+        results = []
+        # spawn, not fork: TensorFlow is not fork-safe
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=args.workers,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(data_dir, args.threads_per_worker),
+        ) as pool:
+            futures = {
+                pool.submit(run_trial, config, args.epochs, args.patience, args.latency_runs): config
+                for config in configs
+            }
+            for future in as_completed(futures):
+                config = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"Trial {config} failed: {e}")
+                    continue
+                results.append(result)
+                print(f"  w={result['width']:<4} d={result['depth']} p={result['dropout']:<4} "
+                      f"bs={result['batch_size']:<4} val MAE={result['val_mae']:.4f} val R2={result['val_r2']:.4f} "
+                      f"params={result['params']:<6} latency={result['latency_ms']:.3f} ms")
+
+        results.sort(key=lambda r: (r["val_mae"], r["latency_ms"], r["params"]))
+
+        winner = None
+        if results:
+            # The test split is touched exactly once, by the selected configuration
+            best = {k: results[0][k] for k in ("width", "depth", "dropout", "batch_size", "seed")}
+            print(f"Retraining best config {best} for the test evaluation...")
+            save_path = None
+            if args.save_best:
+                os.makedirs(args.save_best, exist_ok=True)
+                save_path = os.path.join(args.save_best, "triage_model_nn.keras")
+            _init_worker(data_dir, os.cpu_count() or 1, ALL_ARRAYS)
+            winner = run_trial(best, args.epochs, args.patience, 1, save_path=save_path, evaluate_test=True)
+            if args.save_best:
+                joblib.dump(preprocessor, os.path.join(args.save_best, "preprocessor_nn.pkl"))
+                print(f"✅ Saved best model and preprocessor to {args.save_best}")
+
+    print("-" * 40)
+    print("Top configurations (by validation MAE):")
+    for rank, r in enumerate(results[:10], start=1):
+        print(f"{rank:>2}. w={r['width']} d={r['depth']} p={r['dropout']} bs={r['batch_size']} "
+              f"val MAE={r['val_mae']:.4f} val R2={r['val_r2']:.4f} params={r['params']} "
+              f"latency={r['latency_ms']:.3f} ms")
+    if winner:
+        print(f"Selected configuration on the test split: MAE={winner['test_mae']:.4f} R2={winner['test_r2']:.4f}")
+
+    with open(args.output, "w") as f:
+        json.dump({"search": args.search, "val_fraction": args.val_fraction, "results": results,
+                   "winner": winner}, f, indent=2)
+    print(f"✅ Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()